@@ -1,23 +1,19 @@
 from fastapi import Depends, HTTPException, Request
-from app.core.config import JWT_SECRET, JWT_ALGORITHM
-import jwt
 from jwt.exceptions import PyJWTError
-from app.db.session import get_db_connection
+from app.utils.security import decode_jwt_cached
+from app.db.session import db_connection
 
-def get_db():
-    conn = get_db_connection()
-    try:
+async def get_db():
+    async with db_connection() as conn:
         yield conn
-    finally:
-        conn.close()
 
-def get_current_user(request: Request):
+async def get_current_user(request: Request):
     auth = request.headers.get("Authorization")
     if not auth or not auth.startswith("Bearer "):
         raise HTTPException(status_code=403, detail="未登入系統")
     token = auth.split(" ")[1]
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        payload = decode_jwt_cached(token)
         return payload
     except PyJWTError:
         raise HTTPException(status_code=403, detail="Token 驗證失敗")
@@ -1,22 +1,73 @@
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Query, HTTPException, Request, Response
 from fastapi.responses import JSONResponse
 from typing import Optional
-from app.crud.attraction import get_attractions, fetch_mrts, fetch_attraction_detail
-from app.schemas.attraction import AttractionListResponse, MRTListResponse
+from app.core.config import FAST_JSON
+from app.crud.attraction import (
+    get_attractions, get_attractions_after, load_mrt_ranking, fetch_attraction_detail, data_version,
+    entry_version, encode_attractions, nearby_attractions,
+)
+from app.utils.http_cache import make_etag, body_etag, content_etag, etag_matches, cache_headers, not_modified
+from app.utils.fast_json import JSON_MEDIA_TYPE, list_body, data_body
+from app.schemas.attraction import AttractionListResponse, AttractionNearbyResponse, MRTListResponse
 from app.schemas.attraction import AttractionDetailResponse
 
 router = APIRouter()
 
 @router.get("/attractions", response_model=AttractionListResponse)
-def get_attractions_endpoint(page: int = Query(0), keyword: Optional[str] = Query(None)):
+async def get_attractions_endpoint(
+    request: Request,
+    response: Response,
+    page: int = Query(0),
+    keyword: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="帶入（可為空字串）即改用 keyset 分頁，nextPage 回傳下一頁 cursor"),
+):
     try:
-        recs, next_page = get_attractions(page, keyword)
+        # 有記憶體快照時，以資料版本號 + 查詢參數組成 ETag，命中時不必查詢也不必序列化
+        version = data_version()
+        etag = make_etag("attractions", version, page, keyword, cursor) if version else None
+        if etag and etag_matches(request, etag):
+            return not_modified(etag)
+        if cursor is not None:
+            try:
+                recs, next_page = await get_attractions_after(cursor, keyword)
+            except ValueError as e:
+                return JSONResponse(status_code=400, content={"error": True, "message": str(e)})
+        else:
+            recs, next_page = await get_attractions(page, keyword)
         if not recs:
             return JSONResponse(status_code=400, content={
                 "error": True,
                 "message": "所查詢的頁面不存在"
             })
-        return {"nextPage": next_page, "data": recs}
+        if FAST_JSON:
+            content = list_body(next_page, encode_attractions(recs))
+            etag = etag or content_etag(content)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+            return Response(content, media_type=JSON_MEDIA_TYPE, headers=cache_headers(etag))
+        body = {"nextPage": next_page, "data": recs}
+        etag = etag or body_etag(body)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        response.headers.update(cache_headers(etag))
+        return body
+    except Exception as e:
+        return JSONResponse(status_code=500, content={
+            "error": True,
+            "message": f"伺服器內部錯誤：{e}"
+        })
+@router.get("/attractions/nearby", response_model=AttractionNearbyResponse)
+async def get_nearby_attractions_endpoint(
+    lat: float = Query(..., ge=-90, le=90, description="緯度"),
+    lng: float = Query(..., ge=-180, le=180, description="經度"),
+    radius: float = Query(1000, gt=0, le=50000, description="搜尋半徑（公尺）"),
+    limit: int = Query(12, ge=1, le=100),
+):
+    try:
+        recs = await nearby_attractions(lat, lng, radius, limit)
+        if FAST_JSON:
+            return Response(data_body(b"[" + b",".join(encode_attractions(recs)) + b"]"), media_type=JSON_MEDIA_TYPE)
+        return {"data": recs}
     except Exception as e:
         return JSONResponse(status_code=500, content={
             "error": True,
@@ -30,15 +81,31 @@ def get_attractions_endpoint(page: int = Query(0), keyword: Optional[str] = Quer
         500: {"description": "伺服器內部錯誤",   "content": {"application/json": {}}},
         },
     )
-def get_attraction_detail(attraction_id: int):
+async def get_attraction_detail(attraction_id: int, request: Request, response: Response):
     try:
-        record = fetch_attraction_detail(attraction_id)
+        # 優先使用單一景點的版本號，增量匯入後只有內容變動的景點需要重新下載
+        version = entry_version(attraction_id) or data_version()
+        etag = make_etag("attraction", version, attraction_id) if version else None
+        if etag and etag_matches(request, etag):
+            return not_modified(etag)
+        record = await fetch_attraction_detail(attraction_id)
         if record is None:
             raise HTTPException(
                 status_code=400,
                 detail={"error": True, "message": "景點編號不正確"}
             )
-        return {"data": record}
+        if FAST_JSON:
+            content = data_body(encode_attractions([record])[0])
+            etag = etag or content_etag(content)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+            return Response(content, media_type=JSON_MEDIA_TYPE, headers=cache_headers(etag))
+        body = {"data": record}
+        etag = etag or body_etag(body)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        response.headers.update(cache_headers(etag))
+        return body
     except HTTPException as http_exc:
         return JSONResponse(status_code=http_exc.status_code, content=http_exc.detail)
     except Exception as e:
@@ -49,10 +116,16 @@ def get_attraction_detail(attraction_id: int):
 
 
 @router.get("/mrts", response_model=MRTListResponse)
-def get_mrts_endpoint():
+async def get_mrts_endpoint(request: Request, response: Response):
     try:
-        mrt_list = fetch_mrts()
-        return {"data": mrt_list}
+        ranking = await load_mrt_ranking()
+        etag = make_etag("mrts", ranking.version)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        if FAST_JSON:
+            return Response(ranking.encoded, media_type=JSON_MEDIA_TYPE, headers=cache_headers(etag))
+        response.headers.update(cache_headers(etag))
+        return {"data": list(ranking.stations)}
     except Exception as e:
         return JSONResponse(status_code=500, content={
             "error": True,
@@ -1,11 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
 
 from app.api.deps import get_current_user
-from app.core.database import get_db
-from app.schemas.booking import BookingModel, BookingOkResponse, BookingGetResponse
-from app.crud.booking import get_booking_for_user, upsert_booking, delete_booking_for_user
+from app.core.database import get_db, run_orm
+from app.schemas.booking import (
+    BookingModel, BookingOkResponse, BookingGetResponse,
+    CartGetResponse, CartAddRequest, CartRemoveRequest, CartRemoveResponse,
+)
+from app.crud.booking import (
+    get_booking_for_user, upsert_booking, delete_booking_for_user,
+    get_cart_for_user, add_cart_items, remove_cart_items,
+)
 
 router = APIRouter(tags=["booking"])
 
@@ -14,11 +21,11 @@ router = APIRouter(tags=["booking"])
     response_model=BookingGetResponse,
     responses={403: {"description": "未登入系統，拒絕存取"}}
 )
-def get_booking(
+async def get_booking(
     user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    res = get_booking_for_user(user["id"], db)
+    res = await run_orm(db, get_booking_for_user, user["id"])
     if res.get("status") != "success":
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, detail="後端錯誤")
     return {"data": res["data"]}
@@ -33,22 +40,28 @@ def get_booking(
         500: {"description": "伺服器內部錯誤"},
     },
 )
-def create_booking(
+async def create_booking(
     booking: BookingModel,
     user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     try:
-        upsert_booking(
+        await run_orm(
+            db,
+            upsert_booking,
             user_id=user["id"],
             attraction_id=booking.attractionId,
             date=booking.date,
             time=booking.time,
             price=booking.price,
-            db=db
         )
         return {"ok": True}
 
+    except IntegrityError:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"error": True, "message": "景點不存在"},
+        )
     except ValueError as e:
         return JSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -66,9 +79,80 @@ def create_booking(
     response_model=BookingOkResponse,
     responses={403: {"description": "未登入系統，拒絕存取"}}
 )
-def delete_booking(
+async def delete_booking(
     user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    delete_booking_for_user(user["id"], db)
+    await run_orm(db, delete_booking_for_user, user["id"])
     return {"ok": True}
+
+
+@router.get(
+    "/cart",
+    response_model=CartGetResponse,
+    responses={403: {"description": "未登入系統，拒絕存取"}}
+)
+async def get_cart(
+    user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    res = await run_orm(db, get_cart_for_user, user["id"])
+    if res.get("status") != "success":
+        raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, detail="後端錯誤")
+    return {"data": res["data"]}
+
+
+@router.post(
+    "/cart",
+    response_model=BookingOkResponse,
+    responses={
+        400: {"description": "建立失敗，輸入不正確或其他原因"},
+        403: {"description": "未登入系統，拒絕存取"},
+        500: {"description": "伺服器內部錯誤"},
+    },
+)
+async def add_to_cart(
+    body: CartAddRequest,
+    user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    items = [
+        {"attraction_id": b.attractionId, "date": b.date, "time": b.time, "price": b.price}
+        for b in body.items
+    ]
+    try:
+        await run_orm(db, add_cart_items, user["id"], items)
+        return {"ok": True}
+
+    except IntegrityError:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"error": True, "message": "景點不存在"},
+        )
+    except Exception as e:
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            content={"error": True, "message": f"伺服器內部錯誤：{e}"},
+        )
+
+
+@router.delete(
+    "/cart",
+    response_model=CartRemoveResponse,
+    responses={
+        403: {"description": "未登入系統，拒絕存取"},
+        500: {"description": "伺服器內部錯誤"},
+    },
+)
+async def remove_from_cart(
+    body: CartRemoveRequest,
+    user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    res = await run_orm(db, remove_cart_items, user["id"], body.ids)
+    if "error" in res:
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            content={"error": True, "message": res["error"]},
+        )
+    return {"ok": True, "deleted": res["deleted"]}
@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Request, Response
+from fastapi.responses import JSONResponse
+from app.crud.attraction import fetch_attraction_detail
+from app.utils.http_cache import make_etag, etag_matches, not_modified
+from app.utils.images import IMAGE_SIZES, ImageUpstreamError, get_image_proxy
+
+router = APIRouter()
+
+# 同一個 (景點, 第幾張, 尺寸) 的內容只會在重新匯入資料時改變，以 ETag 重新驗證
+IMAGE_CACHE_CONTROL = "public, max-age=2592000"
+
+
+@router.get(
+    "/image/{attraction_id}/{index}/{size}",
+    response_class=Response,
+    responses={
+        200: {"content": {"image/webp": {}}, "description": "WebP 縮圖"},
+        404: {"description": "圖片不存在"},
+        502: {"description": "無法取得原始圖片"},
+    },
+)
+async def get_image(attraction_id: int, index: int, size: str, request: Request):
+    if size not in IMAGE_SIZES:
+        return JSONResponse(status_code=404, content={"error": True, "message": f"不支援的尺寸：{size}"})
+    record = await fetch_attraction_detail(attraction_id)
+    if record is None or not 0 <= index < len(record["images"]):
+        return JSONResponse(status_code=404, content={"error": True, "message": "圖片不存在"})
+
+    url = record["images"][index]
+    etag = make_etag("image", url, size)
+    if etag_matches(request, etag):
+        return not_modified(etag, IMAGE_CACHE_CONTROL)
+    try:
+        proxy = await get_image_proxy()
+        data = await proxy.get(url, size)
+    except ImageUpstreamError as e:
+        return JSONResponse(status_code=502, content={"error": True, "message": str(e)})
+    return Response(
+        content=data,
+        media_type="image/webp",
+        headers={"ETag": etag, "Cache-Control": IMAGE_CACHE_CONTROL},
+    )
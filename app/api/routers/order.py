@@ -1,46 +1,84 @@
-from fastapi import APIRouter, Depends
-from app.crud.order import create_order, fetch_order
+import logging
+from fastapi import APIRouter, Depends, Query, status
+from fastapi.responses import JSONResponse
+from app.crud.order import create_order, fetch_order, fetch_orders_for_user
 from app.schemas.order import (
     OrderRequest,
     OrderCreateResponse,
     OrderGetResponse,
     OrderGetData,
+    OrderListResponse,
+    OrderSummary,
     OrderContact,
     TripInfo,
     AttractionInfo,
 )
 from app.api.deps import get_current_user
+from app.utils.images import image_url
+from app.utils.payment_queue import PaymentQueueFull
+from app.utils.tappay import TapPayConnectError
 
 router = APIRouter(tags=["order"])
 
-@router.post("/order", response_model=OrderCreateResponse)
-def create_order_endpoint(
+
+def _trip_from_row(row) -> TripInfo:
+    attraction = AttractionInfo(
+        id=row["attraction_id"],
+        name=row["attraction_name"],
+        address=row["attraction_address"],
+        image=image_url(row["attraction_id"], row["attraction_image"])
+    )
+    return TripInfo(
+        attraction=attraction,
+        date=row["date"],
+        time=row["time"]
+    )
+
+
+@router.post(
+    "/order",
+    response_model=OrderCreateResponse,
+    responses={
+        500: {"description": "訂單建立失敗（尚未付款）"},
+        502: {"description": "無法連線至付款服務（未扣款）"},
+        503: {"description": "付款處理繁忙，請稍後再試"},
+    },
+)
+async def create_order_endpoint(
     body: OrderRequest,
     user=Depends(get_current_user)
 ):
-    order_no, pay_result = create_order(user["id"], body)
+    try:
+        order_no, pay_result = await create_order(user["id"], body)
+    except PaymentQueueFull as e:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"error": True, "message": str(e)},
+        )
+    except TapPayConnectError:
+        return JSONResponse(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            content={"error": True, "message": "無法連線至付款服務，本次未扣款，請稍後再試"},
+        )
+    except Exception as e:
+        # 送出付款前的錯誤（配號、寫入訂單等），付款後的錯誤已由 create_order 轉為 {"unknown": True}
+        logging.error("建立訂單失敗：%s", e)
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            content={"error": True, "message": "訂單建立失敗，本次未扣款，請稍後再試"},
+        )
     return {"data": {"number": order_no, "payment": pay_result}}
 
 @router.get("/order/{orderNumber}", response_model=OrderGetResponse)
-def get_order_endpoint(
+async def get_order_endpoint(
     orderNumber: str,
     user=Depends(get_current_user)
 ):
-    row = fetch_order(orderNumber, user["id"])
+    row = await fetch_order(orderNumber, user["id"])
     if not row:
         return {"data": None}
 
-    attraction = AttractionInfo(
-        id=row["attraction_id"],
-        name=row["attraction_name"],
-        address=row["attraction_address"],
-        image=row["attraction_image"]
-    )
-    trip = TripInfo(
-        attraction=attraction,
-        date=row["date"],
-        time=row["time"]
-    )
+    trip = _trip_from_row(row)
     contact = OrderContact(
         name=row["contact_name"],
         email=row["contact_email"],
@@ -54,3 +92,26 @@ def get_order_endpoint(
         status=row["status"]
     )
     return {"data": data}
+
+@router.get(
+    "/orders",
+    response_model=OrderListResponse,
+    responses={400: {"description": "cursor 格式不正確"}},
+)
+async def list_orders_endpoint(
+    cursor: str = Query("", description="上一頁回傳的 nextPage，留空為第一頁"),
+    limit: int = Query(10, ge=1, le=50),
+    user=Depends(get_current_user)
+):
+    try:
+        rows, next_page = await fetch_orders_for_user(user["id"], cursor, limit)
+    except ValueError as e:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"error": True, "message": str(e)},
+        )
+    data = [
+        OrderSummary(number=row["number"], price=row["price"], trip=_trip_from_row(row), status=row["status"])
+        for row in rows
+    ]
+    return {"nextPage": next_page, "data": data}
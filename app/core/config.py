@@ -15,11 +15,66 @@ DB_CHARSET = os.getenv("DB_CHARSET", "utf8mb4")
 # JWT
 JWT_SECRET = os.getenv("JWT_SECRET")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM")
+# 已驗證 token 的快取筆數，0 代表停用
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE") or 10000)
 
 # connection pool
 DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))         
 DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))  
 DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))  
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE") or 3600)
+DB_POOL_PING_INTERVAL = int(os.getenv("DB_POOL_PING_INTERVAL") or 30)
+
+# 非同步模式：改用 aiomysql 連線池與 SQLAlchemy AsyncSession，等待資料庫時不佔用工作執行緒
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+
+# 密碼雜湊（bcrypt）行程池：worker 數與允許排隊的上限，超過上限的登入/註冊直接回 503。
+# 每個 uvicorn worker 各有一個行程池，預設把 CPU 核心平分給 WEB_CONCURRENCY 個 worker，避免行程數超過核心數
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY") or 1)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS") or max(1, (os.cpu_count() or 2) // max(1, WEB_CONCURRENCY)))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE") or PASSWORD_HASH_WORKERS * 16)
+
+# 訂單編號：每次向資料庫預留的流水號數量，1 代表逐號配發（編號連續）
+ORDER_NUMBER_BLOCK_SIZE = int(os.getenv("ORDER_NUMBER_BLOCK_SIZE") or 1)
+
+# 景點目錄：啟動時一次載入至記憶體，之後的瀏覽請求不再查詢資料庫
+CATALOG_IN_MEMORY = os.getenv("CATALOG_IN_MEMORY", "false").lower() in ("1", "true", "yes")
+
+# 關鍵字搜尋：啟動時建立 n-gram 倒排索引，取代 LIKE '%kw%' 全表掃描
+SEARCH_INDEX = os.getenv("SEARCH_INDEX", "false").lower() in ("1", "true", "yes")
+SEARCH_INCLUDE_DESCRIPTION = os.getenv("SEARCH_INCLUDE_DESCRIPTION", "false").lower() in ("1", "true", "yes")
+
+# 附近景點：啟動時建立座標網格索引，取代逐筆計算距離的 SQL 查詢
+GEO_INDEX = os.getenv("GEO_INDEX", "false").lower() in ("1", "true", "yes")
+
+# 景點 API（/api/attractions、/api/attraction/{id}、/api/mrts）回應的 Cache-Control；
+# 搭配 ETag，過期後瀏覽器與 CDN 以 If-None-Match 重新驗證
+API_CACHE_CONTROL = os.getenv("API_CACHE_CONTROL") or "public, max-age=60"
+
+# 前端靜態檔：true 時改由 app/scripts/build_static.py 的輸出目錄提供（預先壓縮、雜湊檔名）
+STATIC_DIST = os.getenv("STATIC_DIST", "false").lower() in ("1", "true", "yes")
+STATIC_DIST_DIR = os.getenv("STATIC_DIST_DIR") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "static_dist"
+)
+
+# 頁面 HTML 常駐記憶體；開發時設為 true，修改 HTML 後不必重啟即生效
+PAGES_HOT_RELOAD = os.getenv("PAGES_HOT_RELOAD", "false").lower() in ("1", "true", "yes")
+
+# 景點圖片縮圖代理：true 時預定與訂單回應的圖片改指向 /api/image/...
+IMAGE_PROXY = os.getenv("IMAGE_PROXY", "false").lower() in ("1", "true", "yes")
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "image_cache"
+)
+IMAGE_CACHE_MAX_MB = int(os.getenv("IMAGE_CACHE_MAX_MB") or 512)
+# 設定時改從此目錄讀取原圖（依網址檔名對應），不連線遠端，供測試與離線開發使用
+IMAGE_UPSTREAM_DIR = os.getenv("IMAGE_UPSTREAM_DIR") or ""
+IMAGE_FETCH_TIMEOUT = float(os.getenv("IMAGE_FETCH_TIMEOUT") or 10)
+
+# 景點 API 以 orjson 直接組出回應內容，略過 response_model 的重複驗證（OpenAPI 文件不變）
+FAST_JSON = os.getenv("FAST_JSON", "false").lower() in ("1", "true", "yes")
+
+# /metrics 端點（Prometheus 文字格式）：請求延遲分佈、CRUD 耗時、TapPay 呼叫與連線池狀態
+METRICS = os.getenv("METRICS", "false").lower() in ("1", "true", "yes")
 
 logging.getLogger("sqlalchemy.pool").setLevel(logging.DEBUG)
 logging.getLogger("sqlalchemy.pool").addHandler(logging.StreamHandler())
@@ -27,7 +82,18 @@ logging.getLogger("sqlalchemy.pool").addHandler(logging.StreamHandler())
 # TapPay
 TAPPAY_PARTNER_KEY = os.getenv("TAPPAY_PARTNER_KEY")
 TAPPAY_MERCHANT_ID = os.getenv("TAPPAY_MERCHANT_ID")
-TAPPAY_ENDPOINT = "https://sandbox.tappaysdk.com/tpc/payment/pay-by-prime"
+TAPPAY_ENDPOINT = os.getenv("TAPPAY_ENDPOINT") or "https://sandbox.tappaysdk.com/tpc/payment/pay-by-prime"
+TAPPAY_CONNECT_TIMEOUT = float(os.getenv("TAPPAY_CONNECT_TIMEOUT") or 3)
+TAPPAY_READ_TIMEOUT = float(os.getenv("TAPPAY_READ_TIMEOUT") or 20)
+TAPPAY_MAX_CONNECTIONS = int(os.getenv("TAPPAY_MAX_CONNECTIONS") or 20)
+TAPPAY_MAX_CONCURRENCY = int(os.getenv("TAPPAY_MAX_CONCURRENCY") or 50)
+TAPPAY_MAX_RETRIES = int(os.getenv("TAPPAY_MAX_RETRIES") or 2)
+
+# 付款工作佇列：固定數量的 worker 呼叫 TapPay，排隊數超過上限時拒絕新的結帳
+PAYMENT_WORKERS = int(os.getenv("PAYMENT_WORKERS") or TAPPAY_MAX_CONCURRENCY)
+PAYMENT_QUEUE_SIZE = int(os.getenv("PAYMENT_QUEUE_SIZE") or 200)
+# 結帳 API 不等付款完成即回傳訂單編號，由前端輪詢 /api/order/{orderNumber}
+ORDER_ASYNC_PAYMENT = os.getenv("ORDER_ASYNC_PAYMENT", "false").lower() in ("1", "true", "yes")
 
 if not TAPPAY_PARTNER_KEY or not TAPPAY_MERCHANT_ID:
     logging.error(" 無法讀取 TapPay 設定，請確認 .env 是否正確")
@@ -1,9 +1,14 @@
+import time
+import logging
+import threading
 from sqlalchemy import create_engine
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
+from fastapi.concurrency import run_in_threadpool
 from app.core.config import (
-    DB_USER, DB_PASSWORD, DB_HOST, DB_NAME, 
-    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT
+    DB_USER, DB_PASSWORD, DB_HOST, DB_NAME, DB_ASYNC,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, METRICS,
 )
 
 SQLALCHEMY_DATABASE_URL = (
@@ -17,20 +22,104 @@ engine = create_engine(
     pool_size=DB_POOL_SIZE,
     max_overflow=DB_MAX_OVERFLOW,
     pool_timeout=DB_POOL_TIMEOUT,
-    pool_pre_ping=True,      
+    pool_pre_ping=True,
 )
 
 SessionLocal = sessionmaker(
-    autocommit=False, 
-    autoflush=False, 
+    autocommit=False,
+    autoflush=False,
     bind=engine
 )
 
+# DB_ASYNC 模式：同樣的連線池參數，改走 aiomysql 驅動
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async_engine = create_async_engine(
+        f"mysql+aiomysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}",
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_pre_ping=True,
+    )
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+
 Base = declarative_base()
 
-def get_db():
+async def get_db():
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
     db: Session = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
+        await run_in_threadpool(db.close)
+
+
+# ORM 借出連線的統計（欄位與 app.db.session 的 pool_stats 相同），供 /metrics 使用；
+# 同步模式下由多個工作執行緒同時更新，以 lock 保護
+_orm_stats = {"acquired_total": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0}
+_orm_stats_lock = threading.Lock()
+
+
+def _record_checkout(start: float):
+    if not METRICS:
+        return
+    elapsed = time.perf_counter() - start
+    with _orm_stats_lock:
+        _orm_stats["acquired_total"] += 1
+        _orm_stats["wait_seconds_total"] += elapsed
+        _orm_stats["wait_seconds_max"] = max(_orm_stats["wait_seconds_max"], elapsed)
+
+
+def orm_pool_stats() -> dict:
+    pool = async_engine.sync_engine.pool if async_engine is not None else engine.pool
+    return {
+        "size": pool.size(),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "open": pool.checkedin() + pool.checkedout(),
+        "idle": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(0, pool.overflow()),
+        **_copy_orm_stats(),
+    }
+
+
+def _copy_orm_stats() -> dict:
+    with _orm_stats_lock:
+        return dict(_orm_stats)
+
+
+async def run_orm(db, fn, *args, **kwargs):
+    """
+    以 get_db 取得的 session 執行同步的 ORM 函式（函式以 db= 接收 Session）。
+    DB_ASYNC 模式透過 AsyncSession.run_sync 在事件迴圈上以非同步 I/O 執行，
+    否則丟到工作執行緒執行。執行前先借出連線並記錄等待時間（含 pre-ping），
+    借出失敗時記錄錯誤，再交由 ORM 函式自行處理（函式內的查詢會再次嘗試連線）。
+    """
+    if AsyncSessionLocal is not None:
+        start = time.perf_counter()
+        try:
+            await db.connection()
+            _record_checkout(start)
+        except SQLAlchemyError as e:
+            logging.warning("ORM 借出資料庫連線失敗（%s）：%s", getattr(fn, "__name__", fn), e)
+        return await db.run_sync(lambda session: fn(*args, db=session, **kwargs))
+
+    def call():
+        start = time.perf_counter()
+        try:
+            db.connection()
+            _record_checkout(start)
+        except SQLAlchemyError as e:
+            logging.warning("ORM 借出資料庫連線失敗（%s）：%s", getattr(fn, "__name__", fn), e)
+        return fn(*args, db=db, **kwargs)
+    return await run_in_threadpool(call)
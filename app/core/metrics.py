@@ -0,0 +1,286 @@
+"""
+Prometheus 文字格式的執行期指標：請求延遲分佈、進行中的請求數、各 CRUD 函式耗時、TapPay 呼叫，
+以及連線池、付款佇列、密碼雜湊行程池等狀態。
+
+計數器與分佈在請求路徑上只做一次 bisect 與加法；連線池等狀態由既有的 stats() 在 /metrics 被抓取時才讀取。
+METRICS 關閉時不掛 middleware、不註冊 /metrics，timed_crud 也原樣回傳函式。
+"""
+import time
+import bisect
+import inspect
+import logging
+import functools
+import threading
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from app.core.config import METRICS
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 秒；涵蓋記憶體快取命中（毫秒以下）到慢查詢、外部付款
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TAPPAY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 20.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence, extra: Sequence[Tuple[str, str]] = ()) -> str:
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple, object] = {}
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in items]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][i] += 1
+            entry[1] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(k, (list(counts), total)) for k, (counts, total) in self._values.items()]
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, [('le', _number(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """抓取時才呼叫 fn 取值（fn 回傳 {標籤值 tuple: 數值}），平時沒有任何成本"""
+
+    def __init__(self, name: str, help: str, kind: str, labelnames: Sequence[str],
+                 fn: Callable[[], Dict[Tuple, float]]):
+        super().__init__(name, help, labelnames)
+        self.kind = kind
+        self.fn = fn
+
+    def samples(self) -> List[str]:
+        try:
+            values = self.fn()
+        except Exception as e:
+            logging.warning("讀取指標 %s 失敗：%s", self.name, e)
+            return []
+        return [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in values.items()]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for m in list(self._metrics.values()):
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            lines.extend(m.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUESTS = registry.register(Counter(
+    "http_requests_total", "HTTP 請求數", ("method", "route", "status")))
+HTTP_DURATION = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP 請求處理時間（秒）", ("method", "route")))
+HTTP_IN_FLIGHT = registry.register(Gauge(
+    "http_requests_in_flight", "處理中的 HTTP 請求數"))
+CRUD_DURATION = registry.register(Histogram(
+    "crud_duration_seconds", "CRUD 函式執行時間（秒，含等待連線）", ("function",)))
+CRUD_ERRORS = registry.register(Counter(
+    "crud_errors_total", "CRUD 函式拋出例外的次數", ("function",)))
+TAPPAY_DURATION = registry.register(Histogram(
+    "tappay_request_duration_seconds", "每次呼叫 TapPay 的時間（秒，重試分別計算）", buckets=TAPPAY_BUCKETS))
+TAPPAY_ERRORS = registry.register(Counter(
+    "tappay_errors_total", "呼叫 TapPay 失敗的次數", ("kind",)))
+TAPPAY_RESULTS = registry.register(Counter(
+    "tappay_payments_total", "TapPay 回應的付款結果", ("result",)))
+
+
+def timed_crud(fn):
+    """記錄 CRUD 函式的執行時間與例外次數；METRICS 關閉時原樣回傳"""
+    if not METRICS:
+        return fn
+    name = f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            except Exception:
+                CRUD_ERRORS.inc(name)
+                raise
+            finally:
+                CRUD_DURATION.observe(time.perf_counter() - start, name)
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            CRUD_ERRORS.inc(name)
+            raise
+        finally:
+            CRUD_DURATION.observe(time.perf_counter() - start, name)
+    return wrapper
+
+
+def _route_label(scope) -> str:
+    """以路由樣板（/api/attraction/{attraction_id}）作為標籤，避免每個 id 各成一組；掛載的靜態目錄以掛載路徑表示"""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if "endpoint" in scope:
+        return scope.get("root_path") or "/"
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """純 ASGI middleware：記錄每個請求的路由、狀態碼與處理時間"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = _route_label(scope)
+            HTTP_DURATION.observe(time.perf_counter() - start, scope["method"], route)
+            HTTP_REQUESTS.inc(scope["method"], route, str(status))
+
+
+def _stats_metrics(prefix: str, label: str, sources: Callable[[], Dict[str, dict]],
+                   fields: Iterable[Tuple[str, str, str, str]]):
+    """把多個 stats() dict 的同名欄位轉成以 label 區分的指標；fields 為 (欄位, 指標名稱後綴, 類型, 說明)"""
+    for field, suffix, kind, help in fields:
+        def collect(field=field):
+            return {(source,): stats[field] for source, stats in sources().items() if field in stats}
+        registry.register(CallbackMetric(f"{prefix}_{suffix}", help, kind, (label,), collect))
+
+
+def install_collectors():
+    """註冊連線池、付款佇列、密碼雜湊與 JWT 快取的狀態指標（抓取時讀取各自的 stats()）"""
+    from app.core.database import orm_pool_stats
+    from app.db.session import pool_stats, async_pool_stats
+    from app.utils.payment_queue import payment_queue_stats
+    from app.utils.security import hash_stats, token_cache
+    from app.core.config import DB_ASYNC
+
+    def pools():
+        stats = {"sqlalchemy": orm_pool_stats()}
+        if DB_ASYNC:
+            stats["aiomysql"] = async_pool_stats()
+        else:
+            stats["pymysql"] = pool_stats()
+        return stats
+
+    _stats_metrics("db_pool", "pool", pools, [
+        ("size", "size", "gauge", "連線池常駐連線數"),
+        ("open", "open", "gauge", "已開啟的連線數"),
+        ("checked_out", "checked_out", "gauge", "借出中的連線數"),
+        ("overflow", "overflow", "gauge", "超出常駐數的臨時連線數"),
+        ("waiting", "waiting", "gauge", "等待借出連線的請求數"),
+        ("acquired_total", "acquired_total", "counter", "借出連線的次數"),
+        ("timeouts_total", "timeouts_total", "counter", "等待連線逾時的次數"),
+        ("wait_seconds_total", "wait_seconds_total", "counter", "等待借出連線的累計時間（秒）"),
+        ("wait_seconds_max", "wait_seconds_max", "gauge", "單次等待借出連線的最長時間（秒）"),
+    ])
+
+    _stats_metrics("worker", "pool", lambda: {"payment": payment_queue_stats(), "password_hash": hash_stats()}, [
+        ("workers", "count", "gauge", "worker 數量"),
+        ("queued", "queued", "gauge", "排隊中的工作數"),
+        ("pending", "pending", "gauge", "排隊與執行中的工作數"),
+        ("rejected_total", "rejected_total", "counter", "佇列已滿而拒絕的工作數"),
+        ("completed_total", "completed_total", "counter", "成功完成的工作數"),
+        ("errors_total", "errors_total", "counter", "拋出例外或被取消的工作數"),
+        ("seconds_total", "seconds_total", "counter", "工作累計耗時（秒，含排隊）"),
+    ])
+
+    _stats_metrics("cache", "cache", lambda: {"jwt": token_cache.stats()}, [
+        ("size", "entries", "gauge", "快取項目數"),
+        ("hits", "hits_total", "counter", "快取命中次數"),
+        ("misses", "misses_total", "counter", "快取未命中次數"),
+    ])
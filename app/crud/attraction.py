@@ -1,31 +1,96 @@
 import json
-import re
+import base64
 import logging
+import orjson
 from typing import Optional, Tuple, List, Dict
-from app.db.session import get_db_connection
+from fastapi.concurrency import run_in_threadpool
+from app.db.session import db_connection
+from app.core.metrics import timed_crud
+from app.core.config import CATALOG_IN_MEMORY, SEARCH_INDEX, SEARCH_INCLUDE_DESCRIPTION, GEO_INDEX
+from app.crud.catalog import (
+    Catalog, MrtRanking,
+    get_catalog, set_catalog, get_mrt_ranking, set_mrt_ranking,
+)
+from app.crud.search import SearchIndex, get_search_index, set_search_index
+from app.crud.geo import GeoIndex, EARTH_RADIUS_M, get_geo_index, set_geo_index
 
 logging.basicConfig(level=logging.INFO)
 
 
-def _parse_image_field(raw_field: Optional[str]) -> List[str]:
-    """兼容 JSON 陣列字串 或 純文字網址串"""
-    if not raw_field:
+def _load_images(raw) -> List[str]:
+    """images 在寫入時已正規化為 JSON 陣列（見 migration 003），讀取時直接解碼，不再做任何容錯解析"""
+    if not raw:
         return []
-    raw_str = raw_field.strip()
-    if raw_str.startswith('[') and raw_str.endswith(']'):
+    return json.loads(raw) if isinstance(raw, (str, bytes)) else raw
+
+
+def _row_to_attraction(r: Dict) -> Dict:
+    urls = _load_images(r.get('images'))
+
+    try:
+        lat = float(r.get('latitude', 0))
+    except (TypeError, ValueError):
+        lat = 0.0
+    try:
+        lng = float(r.get('longitude', 0))
+    except (TypeError, ValueError):
+        lng = 0.0
+
+    return {
+        'id': r.get('id'),
+        'name': r.get('name'),
+        'category': r.get('category'),
+        'description': r.get('description'),
+        'address': r.get('address'),
+        'transport': r.get('transport'),
+        'mrt': r.get('mrt'),
+        'lat': lat,
+        'lng': lng,
+        'images': urls
+    }
+
+
+@timed_crud
+async def _fetch_by_ids(ids: List[int]) -> List[Dict]:
+    """依傳入順序取回景點（搜尋索引排序後的結果）"""
+    if not ids:
+        return []
+    catalog = get_catalog()
+    if catalog is not None:
+        return [catalog.by_id[i].to_dict() for i in ids if i in catalog.by_id]
+
+    async with db_connection() as conn, conn.cursor() as cur:
+        placeholders = ", ".join(["%s"] * len(ids))
+        await cur.execute(f"""
+            SELECT a.*, m.mrt
+            FROM attractions a
+            LEFT JOIN attraction_mrt m ON a.attraction_mrt_id=m.id
+            WHERE a.id IN ({placeholders})
+        """, ids)
+        by_id = {r['id']: r for r in await cur.fetchall()}
+    return [_row_to_attraction(by_id[i]) for i in ids if i in by_id]
+
+
+@timed_crud
+async def get_attractions(page: int = 0, keyword: Optional[str] = None) -> Tuple[List[Dict], Optional[int]]:
+    index = get_search_index()
+    if keyword and index is not None:
+        ids, has_more = index.page(keyword, page * 12, 12)
         try:
-            return json.loads(raw_str)
-        except json.JSONDecodeError:
-            logging.warning("Invalid JSON in image field, fallback to regex extraction")
-    return re.findall(r'https?://[^\s]+?\.(?:jpg|jpeg|png|gif)', raw_str, flags=re.IGNORECASE)
+            recs = await _fetch_by_ids(ids)
+        except Exception as e:
+            logging.error(f"get_attractions error: {e}")
+            return [], None
+        return recs, page + 1 if has_more else None
 
+    catalog = get_catalog()
+    if catalog is not None:
+        return catalog.page(page, keyword)
 
-def get_attractions(page: int = 0, keyword: Optional[str] = None) -> Tuple[List[Dict], Optional[int]]:
     per_page = 12
     offset = page * per_page
-    conn = get_db_connection()
     try:
-        with conn.cursor() as cur:
+        async with db_connection() as conn, conn.cursor() as cur:
             logging.info(f"Query page={page}, keyword={keyword}")
             if keyword:
                 sql = """
@@ -33,51 +98,28 @@ def get_attractions(page: int = 0, keyword: Optional[str] = None) -> Tuple[List[
                     FROM attractions a
                     LEFT JOIN attraction_mrt m ON a.attraction_mrt_id=m.id
                     WHERE a.name LIKE %s OR m.mrt LIKE %s
+                    ORDER BY a.id
                     LIMIT %s OFFSET %s
                 """
-                cur.execute(sql, (f"%{keyword}%", f"%{keyword}%", per_page + 1, offset))
+                await cur.execute(sql, (f"%{keyword}%", f"%{keyword}%", per_page + 1, offset))
             else:
                 sql = """
                     SELECT a.*, m.mrt
                     FROM attractions a
                     LEFT JOIN attraction_mrt m ON a.attraction_mrt_id=m.id
+                    ORDER BY a.id
                     LIMIT %s OFFSET %s
                 """
-                cur.execute(sql, (per_page + 1, offset))
+                await cur.execute(sql, (per_page + 1, offset))
 
-            rows = cur.fetchall()
+            rows = await cur.fetchall()
             if not rows:
                 return [], None
 
             next_page = page + 1 if len(rows) > per_page else None
             rows = rows[:per_page]
 
-            out: List[Dict] = []
-            for r in rows:
-                raw_imgs = r.get('images') or r.get('file') or ''
-                urls = _parse_image_field(raw_imgs)
-
-                try:
-                    lat = float(r.get('latitude', 0))
-                except (TypeError, ValueError):
-                    lat = 0.0
-                try:
-                    lng = float(r.get('longitude', 0))
-                except (TypeError, ValueError):
-                    lng = 0.0
-
-                out.append({
-                    'id': r.get('id'),
-                    'name': r.get('name'),
-                    'category': r.get('category'),
-                    'description': r.get('description'),
-                    'address': r.get('address'),
-                    'transport': r.get('transport'),
-                    'mrt': r.get('mrt'),
-                    'lat': lat,
-                    'lng': lng,
-                    'images': urls
-                })
+            out: List[Dict] = [_row_to_attraction(r) for r in rows]
 
             return out, next_page
 
@@ -85,14 +127,138 @@ def get_attractions(page: int = 0, keyword: Optional[str] = None) -> Tuple[List[
         logging.error(f"get_attractions error: {e}")
         return [], None
 
-    finally:
-        conn.close()
 
+def encode_attractions(recs: List[Dict]) -> List[bytes]:
+    """景點的 JSON 編碼：記憶體快照中的景點直接取用預先編碼的結果，其餘以 orjson 即時編碼"""
+    catalog = get_catalog()
+    cached = catalog.encoded if catalog is not None else {}
+    return [cached.get(r['id']) or orjson.dumps(r) for r in recs]
+
+
+def encode_cursor(*key: int, kind: str = "a") -> str:
+    """
+    將上一頁最後一筆的排序鍵編成不透明的 cursor 字串。
+    kind="a" 為依 id 排序的瀏覽；kind="r" 為搜尋索引依 (-分數, id) 排序的結果。
+    """
+    raw = ":".join([kind, *map(str, key)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, kind: str = "a") -> Tuple[int, ...]:
+    """空字串代表第一頁（回傳空 tuple）；格式錯誤時拋出 ValueError"""
+    if not cursor:
+        return ()
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        prefix, *key = raw.split(":")
+        if prefix != kind or not key:
+            raise ValueError
+        return tuple(int(k) for k in key)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("cursor 格式不正確")
+
+
+@timed_crud
+async def get_attractions_after(cursor: str = "", keyword: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Keyset 分頁：以主鍵 id 排序，從 cursor 記錄的 id 之後直接 seek，
+    不論翻到第幾頁都只需讀取 per_page + 1 筆。cursor 不正確時拋出 ValueError。
+    """
+    index = get_search_index()
+    if keyword and index is not None:
+        after = decode_cursor(cursor, kind="r") or None
+        ids, next_key = index.page_after(keyword, after, 12)
+        try:
+            recs = await _fetch_by_ids(ids)
+        except Exception as e:
+            logging.error(f"get_attractions_after error: {e}")
+            return [], None
+        return recs, encode_cursor(*next_key, kind="r") if next_key else None
+
+    last_id = (decode_cursor(cursor) or (0,))[0]
+    catalog = get_catalog()
+    if catalog is not None:
+        recs, next_id = catalog.page_after(last_id, keyword)
+        return recs, encode_cursor(next_id) if next_id is not None else None
+
+    per_page = 12
+    try:
+        async with db_connection() as conn, conn.cursor() as cur:
+            if keyword:
+                sql = """
+                    SELECT a.*, m.mrt
+                    FROM attractions a
+                    LEFT JOIN attraction_mrt m ON a.attraction_mrt_id=m.id
+                    WHERE a.id > %s AND (a.name LIKE %s OR m.mrt LIKE %s)
+                    ORDER BY a.id
+                    LIMIT %s
+                """
+                await cur.execute(sql, (last_id, f"%{keyword}%", f"%{keyword}%", per_page + 1))
+            else:
+                sql = """
+                    SELECT a.*, m.mrt
+                    FROM attractions a
+                    LEFT JOIN attraction_mrt m ON a.attraction_mrt_id=m.id
+                    WHERE a.id > %s
+                    ORDER BY a.id
+                    LIMIT %s
+                """
+                await cur.execute(sql, (last_id, per_page + 1))
+
+            rows = await cur.fetchall()
+            if not rows:
+                return [], None
+
+            has_more = len(rows) > per_page
+            rows = rows[:per_page]
+            next_cursor = encode_cursor(rows[-1]['id']) if has_more else None
+            return [_row_to_attraction(r) for r in rows], next_cursor
+
+    except Exception as e:
+        logging.error(f"get_attractions_after error: {e}")
+        return [], None
+
+
+# 未啟用 GEO_INDEX 時的做法：逐筆計算 haversine 距離後排序（需掃描整張表）
+NEARBY_SQL = """
+    SELECT a.*, m.mrt, d.distance
+    FROM (
+        SELECT id, %s * 2 * ASIN(SQRT(
+            POW(SIN(RADIANS(latitude - %s) / 2), 2)
+            + COS(RADIANS(%s)) * COS(RADIANS(latitude)) * POW(SIN(RADIANS(longitude - %s) / 2), 2)
+        )) AS distance
+        FROM attractions
+        WHERE latitude IS NOT NULL AND longitude IS NOT NULL AND latitude <> 0 AND longitude <> 0
+    ) d
+    JOIN attractions a ON a.id = d.id
+    LEFT JOIN attraction_mrt m ON a.attraction_mrt_id=m.id
+    WHERE d.distance <= %s
+    ORDER BY d.distance, a.id
+    LIMIT %s
+"""
+
+
+@timed_crud
+async def nearby_attractions(lat: float, lng: float, radius: float, limit: int) -> List[Dict]:
+    """半徑 radius 公尺內距離最近的景點，依距離排序；有座標索引時不需查詢資料庫的距離計算"""
+    index = get_geo_index()
+    if index is not None:
+        ids = [attraction_id for attraction_id, _ in index.nearby(lat, lng, radius, limit)]
+        return await _fetch_by_ids(ids)
+
+    async with db_connection() as conn, conn.cursor() as cur:
+        await cur.execute(NEARBY_SQL, (EARTH_RADIUS_M, lat, lat, lng, radius, limit))
+        return [_row_to_attraction(r) for r in await cur.fetchall()]
+
+
+@timed_crud
+async def fetch_attraction_detail(attraction_id: int) -> Optional[Dict]:
+    catalog = get_catalog()
+    if catalog is not None:
+        return catalog.detail(attraction_id)
 
-def fetch_attraction_detail(attraction_id: int) -> Optional[Dict]:
-    conn = get_db_connection()
     try:
-        with conn.cursor() as cur:
+        async with db_connection() as conn, conn.cursor() as cur:
             sql = """
                 SELECT
                 a.id, a.name, a.category, a.description,
@@ -104,12 +270,12 @@ def fetch_attraction_detail(attraction_id: int) -> Optional[Dict]:
                 WHERE a.id = %s
             """
 
-            cur.execute(sql, (attraction_id,))
-            row = cur.fetchone()
+            await cur.execute(sql, (attraction_id,))
+            row = await cur.fetchone()
             if not row:
                 return None
 
-        images = _parse_image_field(row.pop('raw_images', ''))
+        images = _load_images(row.pop('raw_images', None))
         try:
             lat = float(row.pop('latitude', 0))
         except (TypeError, ValueError):
@@ -125,26 +291,91 @@ def fetch_attraction_detail(attraction_id: int) -> Optional[Dict]:
         logging.error(f"fetch_attraction_detail error: {e}")
         return None
 
-    finally:
-        conn.close()
+
+@timed_crud
+async def _query_mrt_ranking() -> MrtRanking:
+    async with db_connection() as conn, conn.cursor() as cur:
+        # 以 m.id 作為同數量時的次要排序，讓結果（與其版本號）在重新計算後保持穩定
+        sql = """
+            SELECT m.mrt, COUNT(*) as count
+            FROM attraction_mrt m
+            LEFT JOIN attractions a ON a.attraction_mrt_id = m.id
+            GROUP BY m.id, m.mrt
+            ORDER BY count DESC, m.id
+        """
+        await cur.execute(sql)
+        results = await cur.fetchall()
+        return MrtRanking(row['mrt'] for row in results)
 
 
-def fetch_mrts() -> List[str]:
-    conn = get_db_connection()
+async def load_mrt_ranking() -> MrtRanking:
+    """
+    取得物化的捷運站排行；第一次呼叫時才查詢資料庫，之後直接使用記憶體中的結果，
+    直到 reload_catalog() 重新計算。失敗時拋出例外，且不會快取失敗結果。
+    """
+    ranking = get_mrt_ranking()
+    if ranking is None:
+        ranking = await _query_mrt_ranking()
+        set_mrt_ranking(ranking)
+    return ranking
+
+
+async def fetch_mrts() -> List[str]:
     try:
-        with conn.cursor() as cur:
-            sql = """
-                SELECT m.mrt, COUNT(*) as count
-                FROM attraction_mrt m
-                LEFT JOIN attractions a ON a.attraction_mrt_id = m.id
-                GROUP BY m.mrt
-                ORDER BY count DESC
-            """
-            cur.execute(sql)
-            results = cur.fetchall()
-            return [row['mrt'] for row in results]
+        return list((await load_mrt_ranking()).stations)
     except Exception as e:
         logging.error(f"fetch_mrts error: {e}")
         return []
-    finally:
-        conn.close()
+
+
+@timed_crud
+async def fetch_all_attractions() -> List[Dict]:
+    """一次讀出全部景點（供記憶體目錄快照使用），失敗時直接拋出例外"""
+    async with db_connection() as conn, conn.cursor() as cur:
+        await cur.execute("""
+            SELECT a.*, m.mrt
+            FROM attractions a
+            LEFT JOIN attraction_mrt m ON a.attraction_mrt_id=m.id
+            ORDER BY a.id
+        """)
+        return [_row_to_attraction(r) for r in await cur.fetchall()]
+
+
+def data_version() -> Optional[str]:
+    """
+    記憶體快照的版本號，只有 CATALOG_IN_MEMORY 時才有值：此時景點 API 的內容全部來自快照，不查資料庫就能判斷是否變動。
+    只啟用 SEARCH_INDEX 或 GEO_INDEX 時回應內容仍讀自資料庫，回傳 None，由呼叫端改以內容雜湊作為 ETag。
+    """
+    catalog = get_catalog()
+    return catalog.version if catalog is not None else None
+
+
+def entry_version(attraction_id: int) -> Optional[str]:
+    """單一景點的版本號（僅 CATALOG_IN_MEMORY 時有值），只在該景點內容變動時改變"""
+    catalog = get_catalog()
+    return catalog.entry_versions.get(attraction_id) if catalog is not None else None
+
+
+async def reload_catalog() -> None:
+    """
+    重新從資料庫讀取景點，重建所有常駐記憶體的衍生結構（捷運站排行、景點快照、搜尋索引、座標索引）並原子性地替換。
+    import_data 重新匯入資料後呼叫（或對服務送出 SIGHUP）。
+    """
+    set_mrt_ranking(await _query_mrt_ranking())
+    if not (CATALOG_IN_MEMORY or SEARCH_INDEX or GEO_INDEX):
+        return
+    records = await fetch_all_attractions()
+    catalog = await run_in_threadpool(Catalog, records) if CATALOG_IN_MEMORY else None
+    index = await run_in_threadpool(
+        SearchIndex, records, include_description=SEARCH_INCLUDE_DESCRIPTION
+    ) if SEARCH_INDEX else None
+    geo = await run_in_threadpool(GeoIndex, records) if GEO_INDEX else None
+    # 全部建好後才一起替換，讓快照與索引不會在中途不一致
+    if CATALOG_IN_MEMORY:
+        set_catalog(catalog)
+    if SEARCH_INDEX:
+        set_search_index(index)
+        logging.info("Attraction search index built: %d entries", len(records))
+    if GEO_INDEX:
+        set_geo_index(geo)
+        logging.info("Attraction geo index built: %d points", len(geo))
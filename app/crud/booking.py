@@ -1,73 +1,148 @@
+from typing import Dict, List
+from sqlalchemy import func
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy.exc import SQLAlchemyError
-from app.db.models import Booking
-
-
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from app.db.models import Booking, Attraction
+from app.utils.images import image_url
+from app.core.metrics import timed_crud
+
+# 單筆預定（/api/booking）固定使用的 slot，購物車項目為 NULL（migration 008）
+SINGLE_BOOKING_SLOT = 0
+MYSQL_DEADLOCK = 1213
+DEADLOCK_RETRIES = 3
+
+
+# 單筆預定改期時原地更新、id 不變，「最近一筆」以 updated_at 為準
+_NEWEST_FIRST = (Booking.updated_at.desc(), Booking.id.desc())
+
+
+def _cart_query(user_id: int, db: Session, newest_first: bool = False):
+    """使用者購物車的預定與景點資料，一次 JOIN 查詢取回（依加入順序，newest_first 時依最近寫入由新到舊）"""
+    return (
+        db.query(Booking)
+        .options(joinedload(Booking.attraction).load_only(
+            Attraction.id, Attraction.name, Attraction.address, Attraction.primary_image
+        ))
+        .filter(Booking.user_id == user_id)
+        .order_by(*_NEWEST_FIRST if newest_first else (Booking.id,))
+    )
+
+
+def _booking_to_dict(booking: Booking) -> Dict:
+    return {
+        "id": booking.id,
+        "attraction": {
+            "id": booking.attraction.id,
+            "name": booking.attraction.name,
+            "address": booking.attraction.address,
+            "image": image_url(booking.attraction.id, booking.attraction.primary_image),
+        },
+        "date": booking.date,
+        "time": booking.time,
+        "price": booking.price,
+    }
+
+
+@timed_crud
 def get_booking_for_user(user_id: int, db: Session):
     """
     取得指定使用者的預定資訊，包含景點詳細資料。
+    購物車有多筆時回傳最近寫入（加入或改期）的一筆（相容單筆預定的 /api/booking）。
     """
     try:
-        booking = (
-            db.query(Booking)
-            .options(joinedload(Booking.attraction))
-            .filter(Booking.user_id == user_id)
-            .first()
-        )
-
-        if booking:
-            data = {
-                "id": booking.id,
-                "attraction": {
-                    "id": booking.attraction.id,
-                    "name": booking.attraction.name,
-                    "address": booking.attraction.address,
-                    "image": booking.attraction.images[0] if isinstance(booking.attraction.images, list) and booking.attraction.images else None,
+        booking = _cart_query(user_id, db, newest_first=True).first()
+        data = _booking_to_dict(booking) if booking else None
+        return {"data": data, "status": "success"}
 
+    except SQLAlchemyError as e:
+        print(f"[DB ERROR] get_booking_for_user: {e}")
+        return {"error": "Database error", "status": "failed"}
 
-                },
-                "date": booking.date,
-                "time": booking.time,
-                "price": booking.price,
-            }
-        else:
-            data = None
 
+@timed_crud
+def get_cart_for_user(user_id: int, db: Session):
+    """
+    取得指定使用者購物車中的所有預定，包含景點詳細資料。
+    """
+    try:
+        data = [_booking_to_dict(b) for b in _cart_query(user_id, db).all()]
         return {"data": data, "status": "success"}
 
     except SQLAlchemyError as e:
-        print(f"[DB ERROR] get_booking_for_user: {e}")
+        print(f"[DB ERROR] get_cart_for_user: {e}")
         return {"error": "Database error", "status": "failed"}
 
 
-def upsert_booking(user_id: int, attraction_id: int, date: str, time: str, price: float, db: Session):
+def _insert_items(user_id: int, items: List[Dict]):
+    """寫入多筆購物車預定的單一 INSERT ... ON DUPLICATE KEY UPDATE 陳述式"""
+    stmt = mysql_insert(Booking.__table__).values([
+        {
+            "user_id": user_id,
+            "attraction_id": item["attraction_id"],
+            "date": item["date"],
+            "time": item["time"],
+            "price": item["price"],
+        }
+        for item in items
+    ])
+    return stmt.on_duplicate_key_update(price=stmt.inserted.price)
+
+
+def _execute_with_retry(build, db: Session):
+    """執行單一寫入陳述式並 commit；遇到死結（1213）時整個交易已被 MySQL 回滾，重試至多 DEADLOCK_RETRIES 次"""
+    for attempt in range(DEADLOCK_RETRIES):
+        try:
+            result = db.execute(build())
+            db.commit()
+            return result
+        except OperationalError as e:
+            db.rollback()
+            if getattr(e.orig, "args", (None,))[0] != MYSQL_DEADLOCK or attempt == DEADLOCK_RETRIES - 1:
+                raise
+
+
+@timed_crud
+def add_cart_items(user_id: int, items: List[Dict], db: Session) -> int:
     """
-    新增或更新使用者的預定資訊。
+    將多筆預定加入購物車：以單一 INSERT ... ON DUPLICATE KEY UPDATE 寫入，
+    同一 (景點, 日期, 時段) 已存在時只更新價格，不會因並行請求產生重複資料。
+    items 的每一筆需有 attraction_id、date、time、price。
     """
     try:
-        booking = (
-            db.query(Booking)
-            .filter(Booking.user_id == user_id, Booking.attraction_id == attraction_id)
-            .first()
-        )
+        return _execute_with_retry(lambda: _insert_items(user_id, items), db).rowcount
 
-        if booking:
-            booking.date = date
-            booking.time = time
-            booking.price = price
-        else:
-            booking = Booking(
-                user_id=user_id,
-                attraction_id=attraction_id,
-                date=date,
-                time=time,
-                price=price,
-            )
-            db.add(booking)
+    except SQLAlchemyError as e:
+        db.rollback()
+        print(f"[DB ERROR] add_cart_items: {e}")
+        raise
 
-        db.commit()
-        db.refresh(booking)
-        return booking
+
+@timed_crud
+def upsert_booking(user_id: int, attraction_id: int, date: str, time: str, price: float, db: Session):
+    """
+    新增或更新使用者的預定資訊（單筆預定的 /api/booking）。
+    與原本「每個景點一筆」的行為一致：該景點已有單筆預定時直接改成這次的日期、時段與價格。
+    以 slot 固定為 SINGLE_BOOKING_SLOT 的單一 INSERT ... ON DUPLICATE KEY UPDATE 完成，
+    不先 DELETE，並行請求不會因 gap lock 互相死結。
+    若購物車中已有相同 (景點, 日期, 時段) 的項目，衝突會先落在 uq_bookings_item，只更新該項目。
+    """
+    def build():
+        stmt = mysql_insert(Booking.__table__).values(
+            user_id=user_id,
+            attraction_id=attraction_id,
+            date=date,
+            time=time,
+            price=price,
+            slot=SINGLE_BOOKING_SLOT,
+        )
+        return stmt.on_duplicate_key_update(
+            date=stmt.inserted.date, time=stmt.inserted.time, price=stmt.inserted.price,
+            updated_at=func.now(6),
+        )
+
+    try:
+        return _execute_with_retry(build, db).rowcount
 
     except SQLAlchemyError as e:
         db.rollback()
@@ -75,12 +150,42 @@ def upsert_booking(user_id: int, attraction_id: int, date: str, time: str, price
         raise
 
 
+@timed_crud
+def remove_cart_items(user_id: int, booking_ids: List[int], db: Session):
+    """
+    從購物車移除多筆預定（只會刪除屬於該使用者的預定）。
+    """
+    try:
+        rows_deleted = (
+            db.query(Booking)
+            .filter(Booking.user_id == user_id, Booking.id.in_(booking_ids))
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        return {"deleted": rows_deleted}
+
+    except SQLAlchemyError as e:
+        db.rollback()
+        print(f"[DB ERROR] remove_cart_items: {e}")
+        return {"error": "Database error during deletion"}
+
+
+@timed_crud
 def delete_booking_for_user(user_id: int, db: Session):
     """
-    刪除指定使用者的預定資訊。
+    刪除指定使用者的預定資訊：只刪除 /api/booking 目前顯示的那一筆（最近寫入的預定），
+    購物車中的其他預定保留，整批移除請用 remove_cart_items。
     """
     try:
-        rows_deleted = db.query(Booking).filter(Booking.user_id == user_id).delete()
+        latest = (
+            db.query(Booking.id)
+            .filter(Booking.user_id == user_id)
+            .order_by(*_NEWEST_FIRST)
+            .first()
+        )
+        rows_deleted = 0
+        if latest is not None:
+            rows_deleted = db.query(Booking).filter(Booking.id == latest.id).delete()
         db.commit()
 
         if rows_deleted == 0:
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import logging
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import orjson
+
+from app.core.config import FAST_JSON
+
+PER_PAGE = 12
+
+
+def record_version(record: Dict) -> str:
+    """單一景點的內容雜湊；增量匯入只改到少數景點時，其他景點的版本號維持不變"""
+    return hashlib.sha1(json.dumps(record, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+class CatalogEntry:
+    """單一景點的唯讀紀錄，使用 __slots__ 以降低常駐記憶體"""
+    __slots__ = (
+        "id", "name", "category", "description", "address",
+        "transport", "mrt", "lat", "lng", "images",
+    )
+
+    def __init__(self, record: Dict):
+        self.id = record["id"]
+        self.name = record["name"]
+        self.category = record["category"]
+        self.description = record["description"]
+        self.address = record["address"]
+        self.transport = record["transport"]
+        self.mrt = record["mrt"]
+        self.lat = record["lat"]
+        self.lng = record["lng"]
+        self.images = tuple(record["images"])
+
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.id,
+            'name': self.name,
+            'category': self.category,
+            'description': self.description,
+            'address': self.address,
+            'transport': self.transport,
+            'mrt': self.mrt,
+            'lat': self.lat,
+            'lng': self.lng,
+            'images': list(self.images),
+        }
+
+
+class Catalog:
+    """
+    景點目錄快照：啟動時一次載入，之後分頁、關鍵字過濾與詳細資料查詢皆在記憶體中完成。
+    快照建立後不再修改，重新匯入資料時以新快照整個替換。
+    """
+    __slots__ = ("entries", "ids", "by_id", "version", "entry_versions", "encoded", "_haystacks")
+
+    def __init__(self, records: Iterable[Dict]):
+        entries = sorted((CatalogEntry(r) for r in records), key=lambda e: e.id)
+        self.entries: Tuple[CatalogEntry, ...] = tuple(entries)
+        self.ids: Tuple[int, ...] = tuple(e.id for e in entries)
+        self.by_id: Dict[int, CatalogEntry] = {e.id: e for e in entries}
+        # 與 MySQL 預設 collation 一致：關鍵字比對不分大小寫
+        self._haystacks: Tuple[Tuple[str, str], ...] = tuple(
+            ((e.name or '').casefold(), (e.mrt or '').casefold()) for e in entries
+        )
+        self.entry_versions: Dict[int, str] = {e.id: record_version(e.to_dict()) for e in entries}
+        # 每筆景點預先編碼好的 JSON，FAST_JSON 模式直接串接成回應內容；未開啟時不建立，避免快照記憶體加倍
+        self.encoded: Dict[int, bytes] = {e.id: orjson.dumps(e.to_dict()) for e in entries} if FAST_JSON else {}
+        digest = hashlib.sha1()
+        for e in entries:
+            digest.update(self.entry_versions[e.id].encode('ascii'))
+        self.version = digest.hexdigest()[:16]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _match(self, keyword: str, start: int = 0, limit: Optional[int] = None) -> List[CatalogEntry]:
+        kw = keyword.casefold()
+        out: List[CatalogEntry] = []
+        for i in range(start, len(self.entries)):
+            name, mrt = self._haystacks[i]
+            if kw in name or kw in mrt:
+                out.append(self.entries[i])
+                if limit is not None and len(out) >= limit:
+                    break
+        return out
+
+    def page(self, page: int = 0, keyword: Optional[str] = None) -> Tuple[List[Dict], Optional[int]]:
+        if page < 0:
+            return [], None
+        pool = self._match(keyword) if keyword else self.entries
+        offset = page * PER_PAGE
+        rows = pool[offset:offset + PER_PAGE + 1]
+        if not rows:
+            return [], None
+        next_page = page + 1 if len(rows) > PER_PAGE else None
+        return [e.to_dict() for e in rows[:PER_PAGE]], next_page
+
+    def page_after(self, last_id: int, keyword: Optional[str] = None) -> Tuple[List[Dict], Optional[int]]:
+        """回傳 id 大於 last_id 的下一頁，以及下一頁的起點 id（沒有下一頁時為 None）"""
+        start = bisect_right(self.ids, last_id)
+        if keyword:
+            rows = self._match(keyword, start, PER_PAGE + 1)
+        else:
+            rows = self.entries[start:start + PER_PAGE + 1]
+        if not rows:
+            return [], None
+        has_more = len(rows) > PER_PAGE
+        rows = rows[:PER_PAGE]
+        return [e.to_dict() for e in rows], rows[-1].id if has_more else None
+
+    def detail(self, attraction_id: int) -> Optional[Dict]:
+        entry = self.by_id.get(attraction_id)
+        return entry.to_dict() if entry else None
+
+
+class MrtRanking:
+    """依景點數量排序的捷運站清單（/api/mrts 的結果），資料變動時才重新計算"""
+    __slots__ = ("stations", "version", "encoded")
+
+    def __init__(self, stations: Iterable[str]):
+        self.stations: Tuple[str, ...] = tuple(stations)
+        self.version = hashlib.sha1(
+            json.dumps(self.stations, ensure_ascii=False).encode('utf-8')
+        ).hexdigest()[:16]
+        self.encoded: Optional[bytes] = orjson.dumps({"data": self.stations}) if FAST_JSON else None
+
+
+_catalog: Optional[Catalog] = None
+_mrt_ranking: Optional[MrtRanking] = None
+
+
+def get_catalog() -> Optional[Catalog]:
+    """目前生效的快照；未啟用記憶體目錄模式時為 None"""
+    return _catalog
+
+
+def set_catalog(catalog: Optional[Catalog]) -> None:
+    global _catalog
+    previous = _catalog
+    _catalog = catalog
+    if catalog is not None:
+        logging.info(
+            "Attraction catalog loaded: %d entries, version=%s (previous=%s)",
+            len(catalog), catalog.version, previous.version if previous else None,
+        )
+
+
+def get_mrt_ranking() -> Optional[MrtRanking]:
+    return _mrt_ranking
+
+
+def set_mrt_ranking(ranking: Optional[MrtRanking]) -> None:
+    global _mrt_ranking
+    _mrt_ranking = ranking
+    if ranking is not None:
+        logging.info("MRT ranking materialized: %d stations, version=%s", len(ranking.stations), ranking.version)
@@ -0,0 +1,116 @@
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371008.8
+# 網格邊長（度）：約 1.1 公里，附近查詢常用的半徑只需掃描少數幾格
+CELL_DEG = 0.01
+
+
+def haversine(lat: float, lng: float, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """以向量化的 haversine 公式計算一點到多點的大圓距離（公尺），輸入皆為弧度"""
+    dlat = lats - lat
+    dlng = lngs - lng
+    a = np.sin(dlat / 2) ** 2 + math.cos(lat) * np.cos(lats) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GeoIndex:
+    """
+    景點座標的均勻網格索引：依 (緯度格, 經度格) 排序存放，每格對應一段連續區間。
+    查詢時只取與搜尋範圍外框重疊的格子作為候選，再以 NumPy 一次算出距離並排序。
+    沒有座標（或座標為 0）的景點不列入。
+    """
+
+    def __init__(self, records: Iterable[Dict], cell_deg: float = CELL_DEG):
+        points = [
+            (r['id'], r['lat'], r['lng']) for r in records
+            if r.get('lat') and r.get('lng') and -90 <= r['lat'] <= 90 and -180 <= r['lng'] <= 180
+        ]
+        self.cell_deg = cell_deg
+        ids = np.array([p[0] for p in points], dtype=np.int64)
+        lat_deg = np.array([p[1] for p in points], dtype=np.float64)
+        lng_deg = np.array([p[2] for p in points], dtype=np.float64)
+        rows = np.floor(lat_deg / cell_deg).astype(np.int64)
+        cols = np.floor(lng_deg / cell_deg).astype(np.int64)
+        order = np.lexsort((ids, cols, rows))
+        self.ids = ids[order]
+        self.lats = np.radians(lat_deg[order])
+        self.lngs = np.radians(lng_deg[order])
+        self._cells: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        rows, cols = rows[order], cols[order]
+        if len(order):
+            boundaries = np.flatnonzero((np.diff(rows) != 0) | (np.diff(cols) != 0)) + 1
+            starts = np.concatenate(([0], boundaries))
+            ends = np.concatenate((boundaries, [len(order)]))
+            for s, e in zip(starts.tolist(), ends.tolist()):
+                self._cells[(int(rows[s]), int(cols[s]))] = (s, e)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _candidates(self, lat: float, lng: float, radius_m: float) -> np.ndarray:
+        dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+        # 越接近極區，同樣距離跨越的經度越多；極區附近直接涵蓋所有經度
+        cos_lat = math.cos(math.radians(min(abs(lat) + dlat, 90.0)))
+        dlng = 180.0 if cos_lat < 1e-6 else min(180.0, dlat / cos_lat)
+        r0, r1 = math.floor((lat - dlat) / self.cell_deg), math.floor((lat + dlat) / self.cell_deg)
+        c0, c1 = math.floor((lng - dlng) / self.cell_deg), math.floor((lng + dlng) / self.cell_deg)
+        if (r1 - r0 + 1) * (c1 - c0 + 1) > len(self._cells):
+            # 搜尋範圍涵蓋的格子比實際有資料的格子還多時，逐一檢查有資料的格子較快
+            spans = [
+                span for (r, c), span in self._cells.items()
+                if r0 <= r <= r1 and _lng_cell_in_range(c, c0, c1, self.cell_deg)
+            ]
+        else:
+            spans = []
+            for r in range(r0, r1 + 1):
+                for c in range(c0, c1 + 1):
+                    span = self._cells.get((r, _wrap_lng_cell(c, self.cell_deg)))
+                    if span:
+                        spans.append(span)
+        if not spans:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([np.arange(s, e) for s, e in spans])
+
+    def nearby(self, lat: float, lng: float, radius_m: float, limit: int) -> List[Tuple[int, float]]:
+        """回傳半徑內距離最近的 limit 筆 (景點 id, 距離公尺)，依距離、id 排序"""
+        idx = self._candidates(lat, lng, radius_m)
+        if not len(idx):
+            return []
+        dist = haversine(math.radians(lat), math.radians(lng), self.lats[idx], self.lngs[idx])
+        mask = dist <= radius_m
+        idx, dist = idx[mask], dist[mask]
+        if len(idx) > limit:
+            top = np.argpartition(dist, limit - 1)[:limit]
+            idx, dist = idx[top], dist[top]
+        order = np.lexsort((self.ids[idx], dist))
+        return [(int(self.ids[i]), float(d)) for i, d in zip(idx[order], dist[order])]
+
+
+def _wrap_lng_cell(c: int, cell_deg: float) -> int:
+    """經度格子跨越 ±180 度時換算回有效範圍"""
+    per_turn = round(360 / cell_deg)
+    half = per_turn // 2
+    return (c + half) % per_turn - half
+
+
+def _lng_cell_in_range(c: int, c0: int, c1: int, cell_deg: float) -> bool:
+    per_turn = round(360 / cell_deg)
+    if c1 - c0 + 1 >= per_turn:
+        return True
+    return (c - c0) % per_turn <= c1 - c0
+
+
+_index: Optional[GeoIndex] = None
+
+
+def get_geo_index() -> Optional[GeoIndex]:
+    """目前生效的座標索引；未啟用時為 None"""
+    return _index
+
+
+def set_geo_index(index: Optional[GeoIndex]) -> None:
+    global _index
+    _index = index
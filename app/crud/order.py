@@ -1,30 +1,73 @@
+import re
 import random
-import pymysql
+import asyncio
 import logging
-import requests
-from app.db.session import get_db_connection
-from app.core.config import TAPPAY_PARTNER_KEY, TAPPAY_MERCHANT_ID, TAPPAY_ENDPOINT
-from datetime import datetime
-
-def generate_order_number(conn):
-    date_prefix = datetime.now().strftime("%Y%m%d")
-    
-    with conn.cursor() as cursor:
-        cursor.execute(
-            "SELECT MAX(CAST(SUBSTRING_INDEX(order_number, '-', -1) AS UNSIGNED)) AS max_order FROM orders WHERE order_number LIKE %s",
-            (f"{date_prefix}-%",)
+from app.db.session import db_connection
+from app.core.metrics import timed_crud
+from app.core.config import TAPPAY_PARTNER_KEY, TAPPAY_MERCHANT_ID, ORDER_ASYNC_PAYMENT
+from app.utils.tappay import TapPayConnectError, TapPayError, get_tappay_client
+from app.utils.payment_queue import PaymentQueueFull, get_payment_queue
+from app.crud.order_number import allocator
+
+async def generate_order_number() -> str:
+    """配發當日不重複的 YYYYMMDD-NNNN 訂單編號（見 app.crud.order_number）"""
+    return await allocator.allocate()
+
+
+# orders.status：0 已付款、1 付款失敗（與既有資料相同），2 已建立、等待付款結果，
+# 3 付款結果不明（例如讀取逾時，可能已扣款），保留購物車並待人工對帳，不可視為失敗讓使用者重新付款
+ORDER_PAID = 0
+ORDER_UNPAID = 1
+ORDER_PENDING = 2
+ORDER_UNKNOWN = 3
+
+
+@timed_crud
+async def insert_pending_order(order_no: str, user_id: int, body):
+    """第一段短交易：寫入處理中的訂單後立即 commit 並歸還連線"""
+    async with db_connection() as conn, conn.cursor() as c:
+        await c.execute(
+            """
+            INSERT INTO orders
+            (order_number, user_id, price, attraction_id, date, time,
+             contact_name, contact_email, contact_phone, status)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """,
+            (
+                order_no,
+                user_id,
+                body.order.price,
+                body.order.trip.attraction.id,
+                body.order.trip.date,
+                body.order.trip.time,
+                body.order.contact.name,
+                body.order.contact.email,
+                body.order.contact.phone,
+                ORDER_PENDING
+            )
         )
-        result = cursor.fetchone()
-        
-        # 確保結果包含 max_order
-        seq_id = result['max_order'] + 1 if result['max_order'] is not None else 1
-    
-    return f"{date_prefix}-{seq_id:04d}"
+        await conn.commit()
+
+
+@timed_crud
+async def finalize_order(order_no: str, user_id: int, trip, status: int):
+    """第二段短交易：寫入付款結果，付款成功時從購物車移除這次結帳的行程"""
+    async with db_connection() as conn, conn.cursor() as c:
+        await c.execute(
+            "UPDATE orders SET status = %s WHERE order_number = %s AND status = %s",
+            (status, order_no, ORDER_PENDING)
+        )
+        if status == ORDER_PAID:
+            # 只移除這次結帳的行程，購物車中的其他預定保留
+            await c.execute(
+                "DELETE FROM bookings WHERE user_id = %s AND attraction_id = %s AND date = %s AND time = %s",
+                (user_id, trip.attraction.id, trip.date, trip.time)
+            )
+        await conn.commit()
 
 
-def create_order(user_id: int, body):
-    conn = get_db_connection()
-    order_no = generate_order_number(conn)  # 使用資料庫生成的訂單編號
+async def pay_order(order_no: str, user_id: int, body) -> dict:
+    """付款 worker 執行的工作：呼叫 TapPay（不佔用資料庫連線），再寫回結果"""
     payload = {
         "prime": body.prime,
         "partner_key": TAPPAY_PARTNER_KEY,
@@ -39,54 +82,83 @@ def create_order(user_id: int, body):
         },
         "remember": True
     }
-    headers = {
-        "Content-Type": "application/json",
-        "x-api-key": TAPPAY_PARTNER_KEY
-    }
 
     try:
-        r = requests.post(TAPPAY_ENDPOINT, headers=headers, json=payload)
-        result = r.json()
+        result = await get_tappay_client().pay_by_prime(payload)
+    except TapPayConnectError as e:
+        # 請求沒有送達 TapPay，確定沒有扣款
+        logging.error("TapPay 連線失敗（訂單 %s）：%s", order_no, e)
+        await _finalize_or_log(order_no, user_id, body.order.trip, ORDER_UNPAID)
+        raise
     except Exception as e:
-        logging.error("TapPay 呼叫失敗：%s", e)
+        # 讀取逾時、回應不完整等：TapPay 可能已扣款，不能記為失敗
+        logging.error("TapPay 付款結果不明（訂單 %s），需人工對帳：%s", order_no, e)
+        await _finalize_or_log(order_no, user_id, body.order.trip, ORDER_UNKNOWN)
         raise
 
+    await _finalize_or_log(
+        order_no, user_id, body.order.trip,
+        ORDER_PAID if result.get("status") == 0 else ORDER_UNPAID
+    )
+    return result
+
+
+async def _finalize_or_log(order_no: str, user_id: int, trip, status: int):
+    """寫回付款結果失敗時訂單會停在處理中，記下付款結果供人工對帳後再拋出"""
     try:
-        with conn.cursor() as c:
-            c.execute(
-                """
-                INSERT INTO orders
-                (order_number, user_id, price, attraction_id, date, time,
-                 contact_name, contact_email, contact_phone, status)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """,
-                (
-                    order_no,
-                    user_id,
-                    body.order.price,
-                    body.order.trip.attraction.id,
-                    body.order.trip.date,
-                    body.order.trip.time,
-                    body.order.contact.name,
-                    body.order.contact.email,
-                    body.order.contact.phone,
-                    0 if result.get("status") == 0 else 1
-                )
-            )
-            c.execute("DELETE FROM bookings WHERE user_id = %s", (user_id,))
-            conn.commit()
-    finally:
-        conn.close()
+        await finalize_order(order_no, user_id, trip, status)
+    except Exception as e:
+        logging.error("寫入付款結果失敗（訂單 %s，應為 status=%s），需人工對帳：%s", order_no, status, e)
+        raise
 
-    return order_no, result
 
+def _log_payment_failure(future):
+    if not future.cancelled() and future.exception() is not None:
+        logging.error("背景付款失敗：%s", future.exception())
 
-def fetch_order(order_number: str, user_id: int):
-    conn = get_db_connection()
+
+async def create_order(user_id: int, body, wait: bool = not ORDER_ASYNC_PAYMENT):
+    """
+    分段結帳：配號與寫入處理中訂單各為獨立短交易，付款交給付款佇列的 worker，
+    呼叫 TapPay 的期間不持有任何資料庫連線。wait 為 False 時不等付款結果，
+    回傳 {"pending": True}，付款結果由 /api/order/{orderNumber} 的 status 取得。
+    付款結果不明（可能已扣款），或已送出付款但寫回結果失敗時回傳 {"unknown": True}，
+    讓前端帶著訂單編號前往結果頁，而不是提示重新付款。
+    確定沒有扣款的 TapPayConnectError 與付款前的錯誤（配號、寫入訂單）照常拋出。
+    """
+    queue = get_payment_queue()
+    if queue.full():
+        raise PaymentQueueFull("付款處理繁忙，請稍後再試")
+
+    order_no = await generate_order_number()
+    await insert_pending_order(order_no, user_id, body)
+    try:
+        future = queue.submit(pay_order, order_no, user_id, body)
+    except PaymentQueueFull:
+        await finalize_order(order_no, user_id, body.order.trip, ORDER_UNPAID)
+        raise
+
+    if not wait:
+        future.add_done_callback(_log_payment_failure)
+        return order_no, {"pending": True}
     try:
-        with conn.cursor(pymysql.cursors.DictCursor) as c:
+        return order_no, await asyncio.shield(future)
+    except TapPayConnectError:
+        raise
+    except TapPayError:
+        return order_no, {"unknown": True}
+    except Exception as e:
+        # 付款已送出，但寫回結果時失敗（例如資料庫錯誤）：訂單停在處理中，付款結果已記錄在日誌待人工對帳
+        logging.error("訂單 %s 付款後處理失敗：%s", order_no, e)
+        return order_no, {"unknown": True}
+
+
+@timed_crud
+async def fetch_order(order_number: str, user_id: int):
+    async with db_connection() as conn:
+        async with conn.cursor() as c:
 
-            c.execute(
+            await c.execute(
                 """
                 SELECT 
                     o.order_number AS number,
@@ -100,13 +172,64 @@ def fetch_order(order_number: str, user_id: int):
                     a.id AS attraction_id,
                     a.name AS attraction_name,
                     a.address AS attraction_address,
-                    JSON_UNQUOTE(JSON_EXTRACT(a.images, '$[0]')) AS attraction_image
+                    a.primary_image AS attraction_image
                 FROM orders o
                 JOIN attractions a ON o.attraction_id = a.id
                 WHERE o.order_number = %s AND o.user_id = %s
                 """,
                 (order_number, user_id)
             )
-            return c.fetchone()
-    finally:
-        conn.close()
+            return await c.fetchone()
+
+
+# 流水號最多 10 位數（order_sequences.seq 為 INT UNSIGNED），order_key 才不會溢位到日期的位數
+ORDER_NUMBER_RE = re.compile(r"^\d{8}-\d{4,10}$")
+
+
+def order_key(order_number: str) -> int:
+    """與 orders.order_key（migration 007）相同的數值排序鍵：日期 * 10^10 + 流水號"""
+    day, seq = order_number.split("-")
+    return int(day) * 10 ** 10 + int(seq)
+
+
+ORDER_HISTORY_SQL = """
+    SELECT
+        o.order_number AS number,
+        o.price,
+        o.date,
+        o.time,
+        o.status,
+        a.id AS attraction_id,
+        a.name AS attraction_name,
+        a.address AS attraction_address,
+        a.primary_image AS attraction_image
+    FROM orders o
+    JOIN attractions a ON o.attraction_id = a.id
+    WHERE o.user_id = %s {before}
+    ORDER BY o.order_key DESC
+    LIMIT %s
+"""
+
+
+@timed_crud
+async def fetch_orders_for_user(user_id: int, cursor: str = "", limit: int = 10):
+    """
+    使用者的訂單紀錄，新到舊排序。以 (user_id, order_key) keyset 分頁：
+    cursor 為上一頁最後一筆的訂單編號，換算成 order_key 後直接 seek，不論翻到第幾頁成本都相同。
+    不直接比較訂單編號字串：流水號超過 9999 後位數變多，字串順序與時間順序不一致。
+    回傳 (訂單列表, 下一頁 cursor 或 None)。
+    """
+    if cursor and not ORDER_NUMBER_RE.match(cursor):
+        raise ValueError("cursor 格式不正確")
+    async with db_connection() as conn, conn.cursor() as c:
+        if cursor:
+            sql = ORDER_HISTORY_SQL.format(before="AND o.order_key < %s")
+            await c.execute(sql, (user_id, order_key(cursor), limit + 1))
+        else:
+            sql = ORDER_HISTORY_SQL.format(before="")
+            await c.execute(sql, (user_id, limit + 1))
+        rows = await c.fetchall()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return rows, rows[-1]["number"] if has_more else None
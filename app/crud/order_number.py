@@ -0,0 +1,69 @@
+import logging
+import threading
+from datetime import datetime
+from typing import Optional
+
+from app.db.session import db_connection
+from app.core.metrics import timed_crud
+from app.core.config import ORDER_NUMBER_BLOCK_SIZE
+
+# 以 LAST_INSERT_ID(expr) 讓同一個陳述式完成「遞增並取回新值」，整個配號只鎖住當天這一列
+RESERVE_SQL = """
+    INSERT INTO order_sequences (day, seq) VALUES (%s, LAST_INSERT_ID(%s))
+    ON DUPLICATE KEY UPDATE seq = LAST_INSERT_ID(seq + %s)
+"""
+
+
+@timed_crud
+async def reserve_sequence(day: str, count: int) -> int:
+    """
+    為 day 原子性地預留 count 個流水號，回傳區段的最後一號。
+    使用獨立的短交易並立即 commit，不會把計數列的鎖帶進呼叫端的交易。
+    """
+    async with db_connection() as conn, conn.cursor() as cur:
+        await cur.execute(RESERVE_SQL, (day, count, count))
+        await cur.execute("SELECT LAST_INSERT_ID() AS seq")
+        row = await cur.fetchone()
+        await conn.commit()
+    return int(row["seq"])
+
+
+class OrderNumberAllocator:
+    """
+    配發 YYYYMMDD-NNNN 訂單編號。block_size 為 1 時每張訂單做一次原子遞增，編號連續；
+    大於 1 時每個 worker 一次預留一段流水號，在記憶體中發完才再回資料庫，
+    編號保證不重複，但跨 worker 不保證依時間遞增，重啟時未用完的號碼會跳號。
+    """
+
+    def __init__(self, block_size: int = 1):
+        self.block_size = max(1, block_size)
+        self._lock = threading.Lock()
+        self._day: Optional[str] = None
+        self._next = 0
+        self._end = -1
+
+    def _take(self, day: str) -> Optional[int]:
+        with self._lock:
+            if self._day == day and self._next <= self._end:
+                seq = self._next
+                self._next += 1
+                return seq
+        return None
+
+    async def allocate(self, day: Optional[str] = None) -> str:
+        day = day or datetime.now().strftime("%Y%m%d")
+        seq = self._take(day)
+        if seq is None:
+            end = await reserve_sequence(day, self.block_size)
+            seq = end - self.block_size + 1
+            if self.block_size > 1:
+                with self._lock:
+                    # 其他協程可能同時預留了新區段：保留仍可用的那段，另一段剩下的號碼捨棄（只會跳號不會重複）
+                    if self._day != day or self._next > self._end:
+                        self._day, self._next, self._end = day, seq + 1, end
+                    else:
+                        logging.debug("Discarding order number block %s-%s", seq + 1, end)
+        return f"{day}-{seq:04d}"
+
+
+allocator = OrderNumberAllocator(ORDER_NUMBER_BLOCK_SIZE)
@@ -0,0 +1,121 @@
+import unicodedata
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 各欄位命中時的權重：景點名稱 > 捷運站 > 分類 > 介紹
+FIELD_WEIGHTS = (("name", 4), ("mrt", 3), ("category", 2), ("description", 1))
+MAX_GRAM = 3
+
+
+def normalize(text: Optional[str]) -> str:
+    """全形轉半形、不分大小寫並移除空白，中英文查詢皆以此為準"""
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKC', text).casefold()
+    return ''.join(ch for ch in text if not ch.isspace())
+
+
+def _grams(text: str, n: int) -> Iterable[str]:
+    return (text[i:i + n] for i in range(len(text) - n + 1))
+
+
+class SearchIndex:
+    """
+    景點關鍵字搜尋用的字元 n-gram 倒排索引（1~3 字元），適用於沒有斷詞邊界的繁體中文。
+    查詢時取關鍵字的 n-gram 交集得到候選，再確認各欄位確實包含關鍵字並依欄位權重排序。
+    """
+
+    def __init__(self, records: Iterable[Dict], include_description: bool = False):
+        fields = [f for f, _ in FIELD_WEIGHTS if include_description or f != "description"]
+        self.fields: Tuple[str, ...] = tuple(fields)
+        self.ids: List[int] = []
+        self.texts: List[Tuple[str, ...]] = []
+        postings: Dict[str, List[int]] = {}
+        for doc, r in enumerate(sorted(records, key=lambda r: r['id'])):
+            texts = tuple(normalize(r.get(f)) for f in fields)
+            self.ids.append(r['id'])
+            self.texts.append(texts)
+            grams = set()
+            for text in texts:
+                for n in range(1, MAX_GRAM + 1):
+                    grams.update(_grams(text, n))
+            for g in grams:
+                postings.setdefault(g, []).append(doc)
+        self.postings: Dict[str, Tuple[int, ...]] = {g: tuple(docs) for g, docs in postings.items()}
+        self._weights = tuple(w for f, w in FIELD_WEIGHTS if f in self.fields)
+        self._ranked = lru_cache(maxsize=256)(self._rank)
+
+    def _candidates(self, query: str) -> Iterable[int]:
+        n = min(MAX_GRAM, len(query))
+        lists = []
+        for g in set(_grams(query, n)):
+            docs = self.postings.get(g)
+            if not docs:
+                return ()
+            lists.append(docs)
+        lists.sort(key=len)
+        result = set(lists[0])
+        for docs in lists[1:]:
+            result.intersection_update(docs)
+            if not result:
+                break
+        return result
+
+    def _score(self, doc: int, query: str) -> int:
+        score = 0
+        for text, weight in zip(self.texts[doc], self._weights):
+            if query not in text:
+                continue
+            score += weight
+            if text == query:
+                score += 2 * weight
+            elif text.startswith(query):
+                score += weight
+        return score
+
+    def _rank(self, query: str) -> Tuple[Tuple[int, int], ...]:
+        """回傳依 (-分數, id) 排序的結果鍵"""
+        scored = []
+        for doc in self._candidates(query):
+            score = self._score(doc, query)
+            if score:
+                scored.append((-score, self.ids[doc]))
+        scored.sort()
+        return tuple(scored)
+
+    def search(self, keyword: str) -> Tuple[Tuple[int, int], ...]:
+        query = normalize(keyword)
+        if not query:
+            return ()
+        return self._ranked(query)
+
+    def page(self, keyword: str, offset: int, limit: int) -> Tuple[List[int], bool]:
+        # 與 Catalog.page 相同：負的頁碼視為沒有資料，避免負數切片從結尾取回結果
+        if offset < 0:
+            return [], False
+        ranked = self.search(keyword)
+        rows = ranked[offset:offset + limit + 1]
+        return [attraction_id for _, attraction_id in rows[:limit]], len(rows) > limit
+
+    def page_after(self, keyword: str, after: Optional[Tuple[int, int]], limit: int) -> Tuple[List[int], Optional[Tuple[int, int]]]:
+        """以 (-分數, id) 為鍵的 keyset 分頁，回傳本頁 id 與下一頁起點鍵"""
+        ranked = self.search(keyword)
+        start = bisect_right(ranked, after) if after is not None else 0
+        rows = ranked[start:start + limit + 1]
+        if len(rows) > limit:
+            return [attraction_id for _, attraction_id in rows[:limit]], rows[limit - 1]
+        return [attraction_id for _, attraction_id in rows], None
+
+
+_index: Optional[SearchIndex] = None
+
+
+def get_search_index() -> Optional[SearchIndex]:
+    """目前生效的搜尋索引；未啟用時為 None"""
+    return _index
+
+
+def set_search_index(index: Optional[SearchIndex]) -> None:
+    global _index
+    _index = index
@@ -1,68 +1,77 @@
-import bcrypt, jwt
-from app.db.session import get_db_connection
+import jwt
+import pymysql
+from app.db.session import db_connection
+from app.core.metrics import timed_crud
+from app.utils.security import JWT_TTL, HashQueueFull, hash_password_async, verify_password_async
 from app.core.config import JWT_SECRET, JWT_ALGORITHM
-from datetime import datetime, timedelta
+from datetime import datetime
 from app.schemas.user import UserCreate
 import logging
 
-def create_user(user: UserCreate):
-    connection = get_db_connection()
+@timed_crud
+async def create_user(user: UserCreate):
     try:
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT * FROM users WHERE email = %s", (user.email,))
-            if cursor.fetchone():
+        async with db_connection() as connection, connection.cursor() as cursor:
+            await cursor.execute("SELECT * FROM users WHERE email = %s", (user.email,))
+            if await cursor.fetchone():
                 return False, "Email 已重複註冊", None
 
-            hashed_password = bcrypt.hashpw(user.password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-
-            cursor.execute(
-                "INSERT INTO users (name, email, password_hash) VALUES (%s, %s, %s)",
-                (user.name, user.email, hashed_password)
-            )
-            connection.commit()
+        # bcrypt 交給密碼雜湊行程池，雜湊期間不佔住資料庫連線
+        hashed_password = await hash_password_async(user.password)
 
+        async with db_connection() as connection, connection.cursor() as cursor:
+            try:
+                await cursor.execute(
+                    "INSERT INTO users (name, email, password_hash) VALUES (%s, %s, %s)",
+                    (user.name, user.email, hashed_password)
+                )
+            except pymysql.err.IntegrityError:
+                # 雜湊期間另一個請求已用同一個 email 註冊完成，由 idx_users_email 唯一鍵擋下（migration 006）
+                return False, "Email 已重複註冊", None
+            await connection.commit()
             user_id = cursor.lastrowid
-            payload = {
-                "id": user_id,
-                "name": user.name,
-                "email": user.email,
-                "exp": datetime.utcnow() + timedelta(days=7)
-            }
-            token = jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
-            return True, None, token
+        payload = {
+            "id": user_id,
+            "name": user.name,
+            "email": user.email,
+            "exp": datetime.utcnow() + JWT_TTL
+        }
+        token = jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+
+        return True, None, token
+    except HashQueueFull:
+        raise
     except Exception as e:
         logging.error("註冊時發生錯誤：%s", e)
         return False, "伺服器內部錯誤", None
-    finally:
-        connection.close()
 
 
 
 
-def authenticate_user(email, password):
-    conn = get_db_connection()
+@timed_crud
+async def authenticate_user(email, password):
     try:
-        with conn.cursor() as c:
-            c.execute("SELECT * FROM users WHERE email=%s", (email,))
-            user = c.fetchone()
-            if not user:
-                return None, "User not found"  # 如果沒有找到使用者，回傳 "User not found"
-            if not bcrypt.checkpw(password.encode(), user["password_hash"].encode()):
-                return None, "Invalid credentials"  # 如果密碼不匹配，回傳 "Invalid credentials"
-            payload = {
-                "id": user["id"],
-                "name": user["name"],
-                "email": user["email"],
-                "exp": datetime.utcnow() + timedelta(days=7)
-            }
-            token = jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
-            return token, None
+        async with db_connection() as conn, conn.cursor() as c:
+            await c.execute("SELECT * FROM users WHERE email=%s", (email,))
+            user = await c.fetchone()
+        if not user:
+            return None, "User not found"  # 如果沒有找到使用者，回傳 "User not found"
+        if not await verify_password_async(password, user["password_hash"]):
+            return None, "Invalid credentials"  # 如果密碼不匹配，回傳 "Invalid credentials"
+        payload = {
+            "id": user["id"],
+            "name": user["name"],
+            "email": user["email"],
+            "exp": datetime.utcnow() + JWT_TTL
+        }
+        token = jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+        return token, None
+    except HashQueueFull:
+        raise
     except Exception as e:
         logging.error("登入時發生錯誤：%s", e)
         return None, "伺服器內部錯誤"
-    finally:
-        conn.close()
 
 
 
@@ -0,0 +1,14 @@
+-- 前置條件：orders 資料表須已存在（migrations 只調整既有 schema，不負責建立 users/bookings/orders）
+-- 每日訂單流水號計數器：配號只需對當日這一列做一次原子更新，不再掃描當天所有訂單
+CREATE TABLE IF NOT EXISTS order_sequences (
+    day CHAR(8) PRIMARY KEY,
+    seq INT UNSIGNED NOT NULL
+);
+
+-- 以既有訂單的最大流水號初始化，確保上線當天不會配出重複的編號
+INSERT INTO order_sequences (day, seq)
+SELECT SUBSTRING_INDEX(order_number, '-', 1) AS day,
+       MAX(CAST(SUBSTRING_INDEX(order_number, '-', -1) AS UNSIGNED)) AS seq
+FROM orders
+GROUP BY SUBSTRING_INDEX(order_number, '-', 1)
+ON DUPLICATE KEY UPDATE seq = GREATEST(order_sequences.seq, VALUES(seq));
@@ -0,0 +1,14 @@
+-- 增量匯入：每筆景點保存來源內容的雜湊，比對後只寫入有變動的資料
+ALTER TABLE attractions ADD COLUMN content_hash CHAR(40) NULL;
+
+-- 每次增量匯入的異動紀錄（新增/更新/刪除），供下游快取依景點精準失效
+CREATE TABLE IF NOT EXISTS attraction_changes (
+    id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    run_id CHAR(32) NOT NULL,
+    attraction_id INT NULL,
+    name VARCHAR(255) NOT NULL,
+    change_type ENUM('insert', 'update', 'delete') NOT NULL,
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_attraction_changes_run (run_id),
+    INDEX idx_attraction_changes_time (changed_at)
+);
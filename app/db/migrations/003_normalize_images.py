@@ -0,0 +1,26 @@
+"""
+將 attractions.images 統一為標準 JSON 陣列（見 import_data.canonical_images），
+並新增由 images 第一張圖自動產生的 primary_image 欄位，讀取端不必再解析或 JSON_EXTRACT。
+"""
+import json
+
+from app.scripts.import_data import canonical_images
+
+
+def upgrade(cursor):
+    cursor.execute("SELECT id, images FROM attractions")
+    updates = []
+    for row in cursor.fetchall():
+        images = canonical_images(row["images"])
+        try:
+            current = json.loads(row["images"]) if row["images"] else None
+        except (TypeError, ValueError):
+            current = None
+        if current != images:
+            updates.append((json.dumps(images), row["id"]))
+    cursor.executemany("UPDATE attractions SET images = %s WHERE id = %s", updates)
+    cursor.execute("""
+        ALTER TABLE attractions
+        ADD COLUMN primary_image VARCHAR(1024)
+        GENERATED ALWAYS AS (JSON_UNQUOTE(JSON_EXTRACT(images, '$[0]'))) STORED
+    """)
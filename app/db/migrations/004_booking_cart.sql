@@ -0,0 +1,14 @@
+-- 購物車：同一使用者可保存多筆預定，以 (使用者, 景點, 日期, 時段) 為唯一鍵，
+-- 寫入改為單一 INSERT ... ON DUPLICATE KEY UPDATE，不再先查詢再新增或更新
+ALTER TABLE bookings MODIFY COLUMN time VARCHAR(16);
+
+-- 先移除重複的預定（保留 id 最大的一筆），否則無法建立唯一鍵
+DELETE b FROM bookings b
+JOIN bookings newer
+  ON newer.user_id = b.user_id
+ AND newer.attraction_id = b.attraction_id
+ AND newer.date <=> b.date
+ AND newer.time <=> b.time
+ AND newer.id > b.id;
+
+ALTER TABLE bookings ADD UNIQUE KEY uq_bookings_item (user_id, attraction_id, date, time);
@@ -0,0 +1,6 @@
+-- 訂單查詢（/api/orders）：依 (user_id, order_number) keyset 分頁，
+-- 索引同時帶上列表需要的欄位，翻頁只需掃描索引的一段範圍，不必回表讀取訂單資料
+ALTER TABLE orders MODIFY COLUMN time VARCHAR(16);
+
+ALTER TABLE orders
+ADD INDEX idx_orders_user_history (user_id, order_number, status, price, attraction_id, date, time);
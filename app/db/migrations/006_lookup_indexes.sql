@@ -0,0 +1,30 @@
+-- 註冊與登入都以 email 查詢使用者；以唯一鍵保證並行註冊不會建立同一個 email 的兩個帳號
+-- 先合併重複的帳號（保留 id 最小、最早註冊的一筆），其訂單與預定改指向保留的帳號，否則無法建立唯一鍵
+UPDATE orders o
+JOIN users dup ON dup.id = o.user_id
+JOIN (SELECT email, MIN(id) AS keep_id FROM users GROUP BY email HAVING COUNT(*) > 1) k
+  ON k.email = dup.email AND dup.id <> k.keep_id
+SET o.user_id = k.keep_id;
+
+-- 保留的帳號已有相同行程的預定時無法改指向（違反 uq_bookings_item），這些重複的預定直接刪除
+UPDATE IGNORE bookings b
+JOIN users dup ON dup.id = b.user_id
+JOIN (SELECT email, MIN(id) AS keep_id FROM users GROUP BY email HAVING COUNT(*) > 1) k
+  ON k.email = dup.email AND dup.id <> k.keep_id
+SET b.user_id = k.keep_id;
+
+DELETE b FROM bookings b
+JOIN users dup ON dup.id = b.user_id
+JOIN users keeper ON keeper.email = dup.email AND keeper.id < dup.id;
+
+DELETE dup FROM users dup
+JOIN users keeper
+  ON keeper.email = dup.email
+ AND keeper.id < dup.id;
+
+ALTER TABLE users ADD UNIQUE KEY idx_users_email (email);
+
+-- 付款完成後只以訂單編號更新狀態，不帶 user_id，用不到 idx_orders_user_history
+ALTER TABLE orders ADD INDEX idx_orders_order_number (order_number);
+
+-- bookings 依 (user_id, attraction_id, ...) 的查詢與刪除已由 004 的 uq_bookings_item 涵蓋，不需另建索引
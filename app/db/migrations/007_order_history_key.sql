@@ -0,0 +1,13 @@
+-- 訂單編號的流水號位數不固定（超過 9999 後為 5 位數以上），以字串排序時 -10000 會排在 -2000 之前；
+-- 改以「日期 * 10^10 + 流水號」的數值作為 /api/orders 的排序與 keyset 分頁鍵
+-- （流水號來自 order_sequences.seq，為 INT UNSIGNED，最多 10 位數，不會與日期重疊）
+ALTER TABLE orders
+ADD COLUMN order_key BIGINT UNSIGNED
+    GENERATED ALWAYS AS (
+        CAST(SUBSTRING_INDEX(order_number, '-', 1) AS UNSIGNED) * 10000000000
+        + CAST(SUBSTRING_INDEX(order_number, '-', -1) AS UNSIGNED)
+    ) STORED;
+
+ALTER TABLE orders
+DROP INDEX idx_orders_user_history,
+ADD INDEX idx_orders_user_history (user_id, order_key, order_number, status, price, attraction_id, date, time);
@@ -0,0 +1,9 @@
+-- 單筆預定（/api/booking）維持「每個景點一筆」：這類預定的 slot 固定為 0，購物車項目為 NULL。
+-- (user_id, attraction_id, slot) 唯一鍵讓 upsert_booking 只需一個 INSERT ... ON DUPLICATE KEY UPDATE，
+-- 不必先 DELETE（空範圍的 DELETE 在 REPEATABLE READ 下會取得 gap lock，並行時容易互相死結）。
+-- NULL 在唯一鍵中彼此不相等，購物車項目不受此限制。需在 004 之後建立，衝突時先比對 uq_bookings_item。
+-- 原地更新不會改變 id，/api/booking 改以 updated_at 判斷最近一次預定
+ALTER TABLE bookings
+ADD COLUMN slot SMALLINT NULL,
+ADD COLUMN updated_at DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+ADD UNIQUE KEY uq_bookings_slot (user_id, attraction_id, slot);
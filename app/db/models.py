@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey, JSON, Date
+from sqlalchemy import Column, Integer, SmallInteger, String, Text, Float, ForeignKey, JSON, Date, Computed, UniqueConstraint, text
 from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.mysql import DATETIME
 from app.core.database import Base 
 
 class MRT(Base):
@@ -19,16 +20,27 @@ class Attraction(Base):
     latitude = Column(Float)
     longitude = Column(Float)
     images = Column(JSON)
+    # 由資料庫依 images 第一張圖自動產生（migration 003）
+    primary_image = Column(String(1024), Computed("JSON_UNQUOTE(JSON_EXTRACT(images, '$[0]'))", persisted=True))
     attraction_mrt_id = Column(Integer, ForeignKey("attraction_mrt.id"))
     mrt = relationship("MRT", back_populates="attractions")
 
 class Booking(Base):
     __tablename__ = "bookings"
+    # 購物車中每個 (使用者, 景點, 日期, 時段) 只有一筆（migration 004）；
+    # 單筆預定的 slot 固定為 0，每個景點只有一筆（migration 008），購物車項目的 slot 為 NULL
+    __table_args__ = (
+        UniqueConstraint("user_id", "attraction_id", "date", "time", name="uq_bookings_item"),
+        UniqueConstraint("user_id", "attraction_id", "slot", name="uq_bookings_slot"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, index=True)
     attraction_id = Column(Integer, ForeignKey("attractions.id"))
     date = Column(Date)
-    time = Column(String)
+    time = Column(String(16))
     price = Column(Integer)
+    slot = Column(SmallInteger, nullable=True)
+    # 單筆預定原地更新時一併更新，/api/booking 依此取最近一次預定（migration 008）
+    updated_at = Column(DATETIME(fsp=6), nullable=False, server_default=text("CURRENT_TIMESTAMP(6)"))
 
     attraction = relationship("Attraction") 
\ No newline at end of file
@@ -1,10 +1,26 @@
-import pymysql
-from app.core.config import DB_HOST, DB_USER, DB_PASSWORD, DB_NAME, DB_CHARSET
+import time
+import asyncio
 import logging
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Optional
 
-def get_db_connection():
+import pymysql
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import (
+    DB_HOST, DB_USER, DB_PASSWORD, DB_NAME, DB_CHARSET, DB_ASYNC,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PING_INTERVAL,
+)
+
+
+class PoolTimeout(Exception):
+    """等待連線超過 DB_POOL_TIMEOUT 秒仍無可用連線"""
+
+
+def _connect():
     try:
-        conn = pymysql.connect(
+        return pymysql.connect(
             host=DB_HOST,
             user=DB_USER,
             password=DB_PASSWORD,
@@ -12,7 +28,342 @@ def get_db_connection():
             charset=DB_CHARSET,
             cursorclass=pymysql.cursors.DictCursor
         )
-        return conn
     except Exception as e:
         logging.error("無法連接資料庫：%s", e)
         raise
+
+
+class PooledConnection:
+    """
+    借出的 pymysql 連線。用法與原本的連線相同，close() 時歸還連線池而非真正斷線，
+    歸還前會 rollback 未提交的交易，避免下一個借用者讀到舊的 snapshot。
+    """
+
+    def __init__(self, pool: "ConnectionPool", raw, created_at: float):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+
+    def __getattr__(self, name):
+        raw = self.__dict__.get("_raw")
+        if raw is None:
+            raise pymysql.err.InterfaceError("連線已歸還連線池")
+        return getattr(raw, name)
+
+    def close(self):
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool._release(raw, self._created_at)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ConnectionPool:
+    """
+    有上限的 pymysql 連線池：常駐 size 條，尖峰時最多再多開 max_overflow 條，
+    全部借出時等待至多 timeout 秒。閒置超過 ping_interval 秒的連線借出前會先 ping，
+    存活超過 recycle 秒的連線會被汰換。
+    """
+
+    def __init__(self, size: int, max_overflow: int, timeout: float,
+                 recycle: float = 3600, ping_interval: float = 30, connect=_connect):
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_interval = ping_interval
+        self._connect = connect
+        self._idle = deque()  # (raw, created_at, released_at)
+        self._total = 0
+        self._cond = threading.Condition()
+        # 統計數據
+        self._waiting = 0
+        self._acquired = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def acquire(self) -> PooledConnection:
+        start = time.monotonic()
+        deadline = start + self.timeout
+        with self._cond:
+            self._waiting += 1
+            try:
+                while not self._idle and self._total >= self.size + self.max_overflow:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(f"等待資料庫連線逾時（{self.timeout} 秒）")
+                    self._cond.wait(remaining)
+                entry = self._idle.pop() if self._idle else None
+                if entry is None:
+                    self._total += 1
+            finally:
+                self._waiting -= 1
+            waited = time.monotonic() - start
+            self._acquired += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+
+        try:
+            if entry is not None:
+                raw, created_at = self._check(*entry)
+            else:
+                raw, created_at = self._connect(), time.monotonic()
+        except Exception:
+            with self._cond:
+                self._total -= 1
+                self._cond.notify()
+            raise
+        return PooledConnection(self, raw, created_at)
+
+    def _check(self, raw, created_at: float, released_at: float):
+        """借出前的健康檢查，失效或過舊的連線換成新連線"""
+        now = time.monotonic()
+        if now - created_at > self.recycle:
+            self._close_quietly(raw)
+            return self._connect(), now
+        if now - released_at > self.ping_interval:
+            try:
+                raw.ping(reconnect=False)
+            except Exception:
+                logging.warning("資料庫連線已失效，重新建立連線")
+                self._close_quietly(raw)
+                return self._connect(), now
+        return raw, created_at
+
+    def _release(self, raw, created_at: float):
+        try:
+            raw.rollback()
+            healthy = raw.open
+        except Exception:
+            healthy = False
+        with self._cond:
+            if healthy and self._total <= self.size:
+                self._idle.append((raw, created_at, time.monotonic()))
+                raw = None
+            else:
+                self._total -= 1
+            self._cond.notify()
+        if raw is not None:
+            self._close_quietly(raw)
+
+    @staticmethod
+    def _close_quietly(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def dispose(self):
+        """關閉所有閒置連線（借出中的連線歸還時才會關閉）"""
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._total -= len(idle)
+        for raw, _, _ in idle:
+            self._close_quietly(raw)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "size": self.size,
+                "max_overflow": self.max_overflow,
+                "open": self._total,
+                "idle": len(self._idle),
+                "checked_out": self._total - len(self._idle),
+                "overflow": max(0, self._total - self.size),
+                "waiting": self._waiting,
+                "acquired_total": self._acquired,
+                "timeouts_total": self._timeouts,
+                "wait_seconds_total": self._wait_total,
+                "wait_seconds_max": self._wait_max,
+            }
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    size=DB_POOL_SIZE,
+                    max_overflow=DB_MAX_OVERFLOW,
+                    timeout=DB_POOL_TIMEOUT,
+                    recycle=DB_POOL_RECYCLE,
+                    ping_interval=DB_POOL_PING_INTERVAL,
+                )
+    return _pool
+
+
+def set_pool(pool: Optional[ConnectionPool]) -> None:
+    """替換目前的同步連線池（工具腳本以自訂 connect 的連線池執行 CRUD 時使用）"""
+    global _pool
+    with _pool_lock:
+        _pool = pool
+
+
+def get_db_connection():
+    """從連線池借出連線，使用完畢呼叫 close() 即歸還"""
+    return get_pool().acquire()
+
+
+def pool_stats() -> dict:
+    return get_pool().stats()
+
+
+class _ThreadedCursor:
+    """包裝 pymysql cursor，查詢丟到工作執行緒執行；介面與 aiomysql cursor 相同"""
+
+    def __init__(self, cur):
+        self._cur = cur
+
+    @property
+    def lastrowid(self):
+        return self._cur.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cur.rowcount
+
+    async def execute(self, query, args=None):
+        return await run_in_threadpool(self._cur.execute, query, args)
+
+    async def executemany(self, query, args):
+        return await run_in_threadpool(self._cur.executemany, query, args)
+
+    # 預設 cursor 會把結果整批讀進記憶體，fetch 不會再碰到網路
+    async def fetchone(self):
+        return self._cur.fetchone()
+
+    async def fetchall(self):
+        return self._cur.fetchall()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self._cur.close()
+
+
+class _ThreadedConnection:
+    def __init__(self, conn: PooledConnection):
+        self._conn = conn
+
+    def cursor(self):
+        return _ThreadedCursor(self._conn.cursor())
+
+    async def commit(self):
+        await run_in_threadpool(self._conn.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self._conn.rollback)
+
+
+_async_pool = None
+_async_stats = {"acquired_total": 0, "timeouts_total": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0}
+
+
+async def init_async_pool():
+    """DB_ASYNC 模式下於啟動時建立 aiomysql 連線池"""
+    global _async_pool
+    if _async_pool is not None:
+        return _async_pool
+    import aiomysql
+    _async_pool = await aiomysql.create_pool(
+        minsize=DB_POOL_SIZE,
+        maxsize=DB_POOL_SIZE + DB_MAX_OVERFLOW,
+        pool_recycle=DB_POOL_RECYCLE,
+        host=DB_HOST,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        db=DB_NAME,
+        charset=DB_CHARSET,
+        cursorclass=aiomysql.DictCursor,
+        autocommit=False,
+    )
+    return _async_pool
+
+
+async def close_async_pool():
+    global _async_pool
+    pool, _async_pool = _async_pool, None
+    if pool is not None:
+        pool.close()
+        await pool.wait_closed()
+
+
+def _release_abandoned(pool, acquire: asyncio.Future):
+    """逾時或被取消後才取得的連線沒有人會用到，直接歸還連線池"""
+    if not acquire.cancelled() and acquire.exception() is None:
+        pool.release(acquire.result())
+
+
+async def _acquire_async():
+    pool = await init_async_pool()
+    start = time.monotonic()
+    # acquire 以 shield 保護：逾時或請求被取消時，若連線剛好已取得（或稍後才取得），
+    # 由 _release_abandoned 歸還，避免連線池逐漸被漏掉的連線耗盡
+    acquire = asyncio.ensure_future(pool.acquire())
+    try:
+        conn = await asyncio.wait_for(asyncio.shield(acquire), DB_POOL_TIMEOUT)
+    except BaseException as e:
+        acquire.add_done_callback(lambda fut: _release_abandoned(pool, fut))
+        acquire.cancel()
+        if isinstance(e, asyncio.TimeoutError):
+            _async_stats["timeouts_total"] += 1
+            raise PoolTimeout(f"等待資料庫連線逾時（{DB_POOL_TIMEOUT} 秒）")
+        raise
+    waited = time.monotonic() - start
+    _async_stats["acquired_total"] += 1
+    _async_stats["wait_seconds_total"] += waited
+    _async_stats["wait_seconds_max"] = max(_async_stats["wait_seconds_max"], waited)
+    return pool, conn
+
+
+@asynccontextmanager
+async def db_connection():
+    """
+    非同步取得連線：
+        async with db_connection() as conn, conn.cursor() as cur:
+            await cur.execute(...)
+    DB_ASYNC 開啟時使用 aiomysql 連線池，等待資料庫時不佔用任何執行緒；
+    否則使用 pymysql 連線池，查詢交由工作執行緒執行。
+    """
+    if DB_ASYNC:
+        pool, conn = await _acquire_async()
+        try:
+            yield conn
+        finally:
+            # aiomysql 會直接關閉仍在交易中的連線，歸還前先 rollback 才能重複使用
+            try:
+                await conn.rollback()
+            except Exception:
+                conn.close()
+            pool.release(conn)
+    else:
+        conn = await run_in_threadpool(get_db_connection)
+        try:
+            yield _ThreadedConnection(conn)
+        finally:
+            await run_in_threadpool(conn.close)
+
+
+def async_pool_stats() -> dict:
+    if _async_pool is None:
+        return {}
+    return {
+        "size": _async_pool.minsize,
+        "max_overflow": _async_pool.maxsize - _async_pool.minsize,
+        "open": _async_pool.size,
+        "idle": _async_pool.freesize,
+        "checked_out": _async_pool.size - _async_pool.freesize,
+        **_async_stats,
+    }
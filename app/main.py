@@ -1,40 +1,121 @@
 import os
+import signal
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from fastapi import Request
+from fastapi import Request, Response
 from app.api.routers.user import router as user_router
 from app.api.routers.attraction import router as attractions_router
 from app.api.routers.booking import router as booking_router
 from app.api.routers.order import router as order_router
+from app.api.routers.image import router as image_router
+from app.core.config import (
+    CATALOG_IN_MEMORY, SEARCH_INDEX, GEO_INDEX, DB_ASYNC, STATIC_DIST, STATIC_DIST_DIR, PAGES_HOT_RELOAD, METRICS,
+    IMAGE_PROXY,
+)
+from app.core.metrics import CONTENT_TYPE, MetricsMiddleware, install_collectors, registry
+from app.core.database import async_engine
+from app.crud.attraction import reload_catalog
+from app.db.session import get_pool, init_async_pool, close_async_pool
+from app.utils.tappay import close_tappay_client
+from app.utils.payment_queue import close_payment_queue
+from app.utils.images import get_image_proxy, close_image_proxy
+from app.utils.security import warm_hash_pool, shutdown_hash_pool
+from app.utils.static_files import PrecompressedStaticFiles
+from app.utils.pages import PageCache
 
-app = FastAPI()
+
+def _install_catalog_reload_signal():
+    """收到 SIGHUP 時重新載入捷運站排行、景點快照與各項索引，載入期間照常以舊結果服務"""
+    if not hasattr(signal, "SIGHUP"):
+        return
+    loop = asyncio.get_running_loop()
+
+    def _reload():
+        task = loop.create_task(reload_catalog())
+        task.add_done_callback(
+            lambda t: t.exception() and logging.error("景點快照重新載入失敗：%s", t.exception())
+        )
+
+    try:
+        loop.add_signal_handler(signal.SIGHUP, _reload)
+    except (NotImplementedError, RuntimeError):
+        logging.warning("無法註冊 SIGHUP，景點快照僅能透過 reload_catalog() 重新載入")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await asyncio.get_running_loop().run_in_executor(None, warm_hash_pool)
+    if DB_ASYNC:
+        await init_async_pool()
+    if CATALOG_IN_MEMORY or SEARCH_INDEX or GEO_INDEX:
+        await reload_catalog()
+    if IMAGE_PROXY:
+        # 啟動時先重建縮圖快取的索引，第一個縮圖請求不必等待走訪快取目錄
+        await get_image_proxy()
+    _install_catalog_reload_signal()
+    yield
+    await close_payment_queue()
+    await close_tappay_client()
+    await close_image_proxy()
+    shutdown_hash_pool()
+    if DB_ASYNC:
+        await close_async_pool()
+        await async_engine.dispose()
+    get_pool().dispose()
+
+
+app = FastAPI(lifespan=lifespan)
+
+if METRICS:
+    app.add_middleware(MetricsMiddleware)
+    install_collectors()
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return Response(registry.render(), media_type=CONTENT_TYPE)
 
 
 app.include_router(user_router, prefix="/api", tags=["user"])
 app.include_router(attractions_router, prefix="/api", tags=["attraction"])
 app.include_router(booking_router, prefix="/api", tags=["booking"])
 app.include_router(order_router, prefix="/api", tags=["order"])
+app.include_router(image_router, prefix="/api", tags=["image"])
 
 base_dir = os.path.dirname(os.path.abspath(__file__))  
 static_dir = os.path.join(base_dir, "..", "static")  
 image_dir = os.path.join(static_dir, "image")
 
-app.mount("/static", StaticFiles(directory=static_dir), name="static")
-app.mount("/image", StaticFiles(directory=image_dir), name="image")
+if STATIC_DIST:
+    # 頁面也改用建置輸出中已改寫引用路徑的 HTML
+    static_dir = STATIC_DIST_DIR
+    image_dir = os.path.join(static_dir, "image")
+    app.mount("/static", PrecompressedStaticFiles(directory=static_dir), name="static")
+    app.mount("/image", PrecompressedStaticFiles(directory=image_dir), name="image")
+else:
+    app.mount("/static", StaticFiles(directory=static_dir), name="static")
+    app.mount("/image", StaticFiles(directory=image_dir), name="image")
+
+pages = PageCache(
+    static_dir,
+    ["index.html", "attraction.html", "booking.html", "thankyou.html"],
+    hot_reload=PAGES_HOT_RELOAD,
+)
 
 @app.get("/", include_in_schema=False)
 async def index(request: Request):
-    return FileResponse(os.path.join(static_dir, "index.html"))
+    return pages.response("index.html", request)
 
 @app.get("/attraction/{id}", include_in_schema=False)
 async def attraction_page(request: Request, id: int):
-    return FileResponse(os.path.join(static_dir, "attraction.html"))
+    return pages.response("attraction.html", request)
 
 @app.get("/booking", include_in_schema=False)
 async def booking_page(request: Request):
-    return FileResponse(os.path.join(static_dir, "booking.html"))
+    return pages.response("booking.html", request)
 
 @app.get("/thankyou", include_in_schema=False)
 async def thankyou_page(request: Request):
-    return FileResponse(os.path.join(static_dir, "thankyou.html"))
+    return pages.response("thankyou.html", request)
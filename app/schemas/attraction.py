@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Union
 
 class Attraction(BaseModel):
     id: int
@@ -14,7 +14,12 @@ class Attraction(BaseModel):
     images: List[str]
 
 class AttractionListResponse(BaseModel):
-    nextPage: Optional[int]
+    # 以 page 查詢時為下一頁頁碼；以 cursor 查詢時為下一頁的不透明 cursor 字串
+    nextPage: Optional[Union[int, str]]
+    data: List[Attraction]
+
+class AttractionNearbyResponse(BaseModel):
+    # 依距離由近到遠排序
     data: List[Attraction]
 
 class MRTListResponse(BaseModel):
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import date
 
 class BookingModel(BaseModel):
@@ -25,3 +25,22 @@ class BookingGetResponse(BaseModel):
 
 class BookingOkResponse(BaseModel):
     ok: bool
+
+# 單次批次加入或移除的上限
+CART_BATCH_MAX = 50
+
+class CartItem(BookingData):
+    id: int
+
+class CartGetResponse(BaseModel):
+    data: List[CartItem]
+
+class CartAddRequest(BaseModel):
+    items: List[BookingModel] = Field(..., min_length=1, max_length=CART_BATCH_MAX)
+
+class CartRemoveRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=CART_BATCH_MAX)
+
+class CartRemoveResponse(BaseModel):
+    ok: bool
+    deleted: int
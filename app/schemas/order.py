@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from datetime import date
 
 class OrderContact(BaseModel):
@@ -43,3 +43,14 @@ class OrderGetData(BaseModel):
 
 class OrderGetResponse(BaseModel):
     data: Optional[OrderGetData]
+
+class OrderSummary(BaseModel):
+    number: str
+    price: int
+    trip: TripInfo
+    status: int
+
+class OrderListResponse(BaseModel):
+    # 下一頁的 cursor（上一頁最後一筆的訂單編號），沒有下一頁時為 null
+    nextPage: Optional[str]
+    data: List[OrderSummary]
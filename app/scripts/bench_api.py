@@ -0,0 +1,304 @@
+"""
+API 端對端基準測試：多個虛擬使用者依權重反覆執行瀏覽、搜尋、景點頁、登入、預定與結帳，
+統計各路由的 requests/sec 與 p50/p95/p99，結果可存成 JSON，並與先前的結果比較作為回歸門檻。
+
+預設在同一個行程內以 httpx.ASGITransport 直接呼叫 app.main:app（會執行 lifespan），
+TapPay 改接 app.scripts.tappay_stub 的模擬服務，不會連到 sandbox。
+資料庫需先匯入景點資料並套用 migration（python -m app.scripts.import_data、python -m app.scripts.migrate）。
+
+    python -m app.scripts.bench_api --users 20 --duration 30 --out baseline.json
+    python -m app.scripts.bench_api --users 20 --duration 30 --compare baseline.json --max-regression 0.1
+    python -m app.scripts.bench_api --url http://127.0.0.1:8000     # 對已啟動的伺服器（TAPPAY_ENDPOINT 需指向 tappay_stub）
+"""
+import json
+import time
+import random
+import asyncio
+import argparse
+import subprocess
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+import httpx
+
+# 各情境的預設權重（每次迭代依權重抽一個情境執行）
+SCENARIOS = {
+    "browse": 40,
+    "search": 20,
+    "detail": 25,
+    "login": 5,
+    "booking": 7,
+    "checkout": 3,
+}
+BENCH_PASSWORD = "bench-password"
+
+
+class Recorder:
+    """依路由收集每個請求的延遲與錯誤數"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.enabled = False
+
+    async def request(self, client: httpx.AsyncClient, route: str, method: str, url: str, **kwargs) -> httpx.Response:
+        start = time.perf_counter()
+        try:
+            r = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            r = None
+        elapsed = time.perf_counter() - start
+        if self.enabled:
+            self.latencies.setdefault(route, []).append(elapsed)
+            if r is None or r.status_code >= 400:
+                self.errors[route] = self.errors.get(route, 0) + 1
+        return r
+
+
+def percentile(samples: List[float], q: float) -> float:
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def summarize(rec: Recorder, elapsed: float) -> Dict[str, Dict]:
+    routes = {}
+    for route, samples in sorted(rec.latencies.items()):
+        samples = sorted(samples)
+        routes[route] = {
+            "count": len(samples),
+            "errors": rec.errors.get(route, 0),
+            "rps": len(samples) / elapsed,
+            "mean_ms": sum(samples) / len(samples) * 1e3,
+            "p50_ms": percentile(samples, 0.50) * 1e3,
+            "p95_ms": percentile(samples, 0.95) * 1e3,
+            "p99_ms": percentile(samples, 0.99) * 1e3,
+        }
+    return routes
+
+
+class Context:
+    """setup 階段取得的資料：景點 id 與名稱、可用的頁數與搜尋關鍵字"""
+
+    def __init__(self, attractions: List[Dict], pages: int, keywords: List[str]):
+        self.attractions = attractions
+        self.pages = pages
+        self.keywords = keywords
+
+
+async def setup(client: httpx.AsyncClient) -> Context:
+    attractions, page = [], 0
+    while page is not None:
+        r = await client.get("/api/attractions", params={"page": page})
+        if r.status_code != 200:
+            break
+        body = r.json()
+        attractions += [{"id": a["id"], "name": a["name"], "address": a["address"]} for a in body["data"]]
+        page = body["nextPage"]
+    if not attractions:
+        raise SystemExit("沒有景點資料，請先執行 python -m app.scripts.import_data")
+    # 以有景點的捷運站名稱作為關鍵字，確保搜尋都有結果（查無結果時 API 回傳 400）
+    mrts = (await client.get("/api/mrts")).json().get("data") or []
+    keywords = mrts[:10] or [a["name"][:2] for a in attractions[:10]]
+    return Context(attractions, max(1, (len(attractions) + 11) // 12), keywords)
+
+
+async def login(client: httpx.AsyncClient, email: str) -> str:
+    """建立（已存在則略過）壓測帳號並登入，回傳 token"""
+    await client.post("/api/user", json={"name": "bench", "email": email, "password": BENCH_PASSWORD})
+    r = await client.put("/api/user/auth", json={"email": email, "password": BENCH_PASSWORD})
+    r.raise_for_status()
+    return r.json()["token"]
+
+
+def booking_body(rng: random.Random, attraction: Dict) -> Dict:
+    day = date.today() + timedelta(days=rng.randint(7, 90))
+    time_slot, price = rng.choice([("morning", 2000), ("afternoon", 2500)])
+    return {"attractionId": attraction["id"], "date": day.isoformat(), "time": time_slot, "price": price}
+
+
+async def run_scenario(name: str, client: httpx.AsyncClient, rec: Recorder, ctx: Context,
+                       rng: random.Random, email: str, token: str):
+    auth = {"Authorization": f"Bearer {token}"}
+    attraction = rng.choice(ctx.attractions)
+    if name == "browse":
+        await rec.request(client, "GET /api/attractions", "GET", "/api/attractions",
+                          params={"page": rng.randrange(ctx.pages)})
+    elif name == "search":
+        await rec.request(client, "GET /api/attractions?keyword", "GET", "/api/attractions",
+                          params={"page": 0, "keyword": rng.choice(ctx.keywords)})
+    elif name == "detail":
+        await rec.request(client, "GET /api/attraction/{id}", "GET", f"/api/attraction/{attraction['id']}")
+    elif name == "login":
+        await rec.request(client, "PUT /api/user/auth", "PUT", "/api/user/auth",
+                          json={"email": email, "password": BENCH_PASSWORD})
+    elif name == "booking":
+        await rec.request(client, "POST /api/booking", "POST", "/api/booking",
+                          json=booking_body(rng, attraction), headers=auth)
+        await rec.request(client, "GET /api/booking", "GET", "/api/booking", headers=auth)
+    elif name == "checkout":
+        booking = booking_body(rng, attraction)
+        await rec.request(client, "POST /api/booking", "POST", "/api/booking", json=booking, headers=auth)
+        r = await rec.request(client, "POST /api/order", "POST", "/api/order", headers=auth, json={
+            "prime": "bench",
+            "order": {
+                "price": booking["price"],
+                "trip": {
+                    "attraction": {**attraction, "image": ""},
+                    "date": booking["date"],
+                    "time": booking["time"],
+                },
+                "contact": {"name": "bench", "email": email, "phone": "0900000000"},
+            },
+        })
+        if r is not None and r.status_code == 200:
+            number = r.json()["data"]["number"]
+            await rec.request(client, "GET /api/order/{number}", "GET", f"/api/order/{number}", headers=auth)
+
+
+async def virtual_user(i: int, client: httpx.AsyncClient, rec: Recorder, ctx: Context, token: str,
+                       weights: Dict[str, int], deadline: float, seed: int):
+    rng = random.Random(seed + i)
+    email = f"bench-{i}@example.com"
+    names, w = list(weights), list(weights.values())
+    while time.perf_counter() < deadline:
+        await run_scenario(rng.choices(names, w)[0], client, rec, ctx, rng, email, token)
+
+
+async def drive(client: httpx.AsyncClient, users: int, duration: float, warmup: float,
+                weights: Dict[str, int], seed: int) -> Dict:
+    ctx = await setup(client)
+    tokens = await asyncio.gather(*[login(client, f"bench-{i}@example.com") for i in range(users)])
+    rec = Recorder()
+    loop_start = time.perf_counter()
+    deadline = loop_start + warmup + duration
+
+    async def measure():
+        await asyncio.sleep(warmup)
+        rec.enabled = True
+        return time.perf_counter()
+
+    measure_task = asyncio.ensure_future(measure())
+    await asyncio.gather(*[virtual_user(i, client, rec, ctx, tokens[i], weights, deadline, seed) for i in range(users)])
+    elapsed = time.perf_counter() - await measure_task
+    routes = summarize(rec, elapsed)
+    total = sum(r["count"] for r in routes.values())
+    return {"elapsed": elapsed, "total_requests": total, "total_rps": total / elapsed, "routes": routes}
+
+
+async def run_in_process(users: int, duration: float, warmup: float, weights: Dict[str, int],
+                         seed: int, tappay_latency: float) -> Dict:
+    from app.main import app
+    from app.utils import tappay
+    from app.scripts.tappay_stub import create_app
+
+    tappay._client = tappay.TapPayClient(
+        transport=httpx.ASGITransport(app=create_app(latency_ms=tappay_latency, jitter_ms=tappay_latency / 4))
+    )
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            return await drive(client, users, duration, warmup, weights, seed)
+
+
+async def run_remote(url: str, users: int, duration: float, warmup: float, weights: Dict[str, int], seed: int) -> Dict:
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    async with httpx.AsyncClient(base_url=url, timeout=60, limits=limits) as client:
+        return await drive(client, users, duration, warmup, weights, seed)
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(result: Dict):
+    print(f"{'路由':32} {'次數':>7} {'錯誤':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for route, r in result["routes"].items():
+        print(f"{route:32} {r['count']:7d} {r['errors']:5d} {r['rps']:8.1f} "
+              f"{r['p50_ms']:8.2f} {r['p95_ms']:8.2f} {r['p99_ms']:8.2f}")
+    print(f"合計 {result['total_requests']} 個請求，{result['total_rps']:.1f} req/s（{result['elapsed']:.1f} 秒）")
+
+
+def compare(result: Dict, baseline: Dict, max_regression: float, max_error_rate: float) -> List[str]:
+    """與基準結果比較：p95 變慢或 req/s 下降超過 max_regression、錯誤率超過 max_error_rate 即視為回歸"""
+    regressions = []
+    for route, r in result["routes"].items():
+        if r["errors"] / r["count"] > max_error_rate:
+            regressions.append(f"{route}：錯誤率 {r['errors'] / r['count']:.1%}")
+        base = baseline["routes"].get(route)
+        if base is None:
+            continue
+        p95 = r["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0
+        rps = 1 - r["rps"] / base["rps"] if base["rps"] else 0
+        print(f"{route:32} p95 {base['p95_ms']:8.2f} -> {r['p95_ms']:8.2f} ms ({p95:+.1%})  "
+              f"req/s {base['rps']:8.1f} -> {r['rps']:8.1f} ({-rps:+.1%})")
+        if p95 > max_regression:
+            regressions.append(f"{route}：p95 變慢 {p95:.1%}")
+        if rps > max_regression:
+            regressions.append(f"{route}：req/s 下降 {rps:.1%}")
+    return regressions
+
+
+def parse_weights(spec: Optional[str]) -> Dict[str, int]:
+    """--mix browse=50,detail=50：只執行列出的情境"""
+    if not spec:
+        return dict(SCENARIOS)
+    weights = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise SystemExit(f"未知的情境：{name}（可用：{', '.join(SCENARIOS)}）")
+        weights[name] = int(weight or 1)
+    return weights
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API 端對端基準測試")
+    parser.add_argument("--users", type=int, default=20, help="同時執行的虛擬使用者數")
+    parser.add_argument("--duration", type=float, default=30, help="量測秒數")
+    parser.add_argument("--warmup", type=float, default=3, help="開始量測前的暖機秒數")
+    parser.add_argument("--mix", help=f"情境權重，例如 browse=50,detail=50（預設 {SCENARIOS}）")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--url", help="對已啟動的伺服器量測，不指定則在同一行程內呼叫 app")
+    parser.add_argument("--tappay-latency", type=float, default=300, help="行程內模式的 TapPay 模擬延遲（毫秒）")
+    parser.add_argument("--out", help="將結果寫入 JSON 檔")
+    parser.add_argument("--compare", help="與先前的 JSON 結果比較，回歸時以結束碼 1 結束")
+    parser.add_argument("--max-regression", type=float, default=0.10, help="p95 或 req/s 允許的退步比例")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="各路由允許的錯誤率")
+    args = parser.parse_args()
+
+    weights = parse_weights(args.mix)
+    if args.url:
+        result = asyncio.run(run_remote(args.url, args.users, args.duration, args.warmup, weights, args.seed))
+    else:
+        result = asyncio.run(run_in_process(args.users, args.duration, args.warmup, weights, args.seed,
+                                            args.tappay_latency))
+    result["meta"] = {
+        "started": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "mode": args.url or "in-process",
+        "users": args.users,
+        "duration": args.duration,
+        "mix": weights,
+        "tappay_latency_ms": None if args.url else args.tappay_latency,
+    }
+    print_report(result)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"結果已寫入 {args.out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.max_regression, args.max_error_rate)
+        for r in regressions:
+            print(f"回歸：{r}")
+        raise SystemExit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+比較 get_current_user 在有無 JWT 快取時的單次耗時：模擬 --users 位使用者輪流帶 token 發出請求。
+
+    python -m app.scripts.bench_jwt_cache --users 200 --requests 100000
+"""
+import time
+import asyncio
+import argparse
+from datetime import datetime, timedelta
+
+from starlette.requests import Request
+
+from app.api import deps
+from app.utils import security
+from app.utils.security import create_jwt, decode_jwt, decode_jwt_cached, token_cache
+
+
+def make_request(token: str) -> Request:
+    return Request({"type": "http", "headers": [(b"authorization", f"Bearer {token}".encode())]})
+
+
+async def measure(requests) -> float:
+    start = time.perf_counter()
+    for request in requests:
+        await deps.get_current_user(request)
+    return time.perf_counter() - start
+
+
+def run(users: int, total: int):
+    exp = datetime.utcnow() + timedelta(hours=1)
+    tokens = [create_jwt({"id": i, "name": f"user{i}", "email": f"user{i}@example.com", "exp": exp})
+              for i in range(users)]
+    requests = [make_request(tokens[i % users]) for i in range(total)]
+
+    results = {}
+    for label, decoder in (("未快取", decode_jwt), ("快取", decode_jwt_cached)):
+        token_cache.clear()
+        deps.decode_jwt_cached = decoder
+        try:
+            results[label] = asyncio.run(measure(requests))
+        finally:
+            deps.decode_jwt_cached = security.decode_jwt_cached
+
+    for label, elapsed in results.items():
+        print(f"{label:4}：{total} 次，{elapsed:.3f} 秒，平均 {elapsed / total * 1e6:.1f} µs/次")
+    print(f"加速 {results['未快取'] / results['快取']:.1f} 倍，快取狀態 {token_cache.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="JWT 驗證快取微基準測試")
+    parser.add_argument("--users", type=int, default=200, help="不同 token 的數量")
+    parser.add_argument("--requests", type=int, default=100000)
+    args = parser.parse_args()
+    run(args.users, args.requests)
@@ -0,0 +1,114 @@
+"""
+附近景點查詢的基準測試：比較座標網格索引（GeoIndex）與逐筆計算距離的做法，並確認結果一致。
+
+    python -m app.scripts.bench_nearby --points 50000 --queries 1000      # 台北範圍內的隨機座標，對照 NumPy 全表掃描
+    python -m app.scripts.bench_nearby --sql --queries 200                # 使用資料庫中的景點，對照 NEARBY_SQL 查詢
+"""
+import math
+import time
+import argparse
+import statistics
+
+import numpy as np
+
+from app.crud.geo import EARTH_RADIUS_M, GeoIndex, haversine
+from app.crud.attraction import NEARBY_SQL
+
+# 台北市大致範圍
+LAT_RANGE = (24.96, 25.21)
+LNG_RANGE = (121.45, 121.67)
+
+
+def random_records(n: int, rng: np.random.Generator):
+    lats = rng.uniform(*LAT_RANGE, n)
+    lngs = rng.uniform(*LNG_RANGE, n)
+    return [{"id": i + 1, "lat": float(lat), "lng": float(lng)} for i, (lat, lng) in enumerate(zip(lats, lngs))]
+
+
+def db_records():
+    from app.db.session import get_db_connection
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT id, latitude AS lat, longitude AS lng FROM attractions")
+            return cur.fetchall()
+    finally:
+        conn.close()
+
+
+def brute_force(records):
+    ids = np.array([r["id"] for r in records])
+    lats = np.radians([r["lat"] or 0.0 for r in records])
+    lngs = np.radians([r["lng"] or 0.0 for r in records])
+    valid = np.array([bool(r["lat"] and r["lng"]) for r in records])
+
+    def query(lat, lng, radius, limit):
+        dist = haversine(math.radians(lat), math.radians(lng), lats, lngs)
+        mask = valid & (dist <= radius)
+        order = np.lexsort((ids[mask], dist[mask]))[:limit]
+        return [int(i) for i in ids[mask][order]]
+    return query
+
+
+def sql_query():
+    from app.db.session import get_db_connection
+    conn = get_db_connection()
+
+    def query(lat, lng, radius, limit):
+        with conn.cursor() as cur:
+            cur.execute(NEARBY_SQL, (EARTH_RADIUS_M, lat, lat, lng, radius, limit))
+            return [r["id"] for r in cur.fetchall()]
+    return query, conn
+
+
+def report(label: str, samples):
+    samples = sorted(samples)
+    p = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] * 1e3
+    print(f"{label:10} 平均 {statistics.mean(samples) * 1e3:8.3f} ms  p50 {p(0.5):8.3f} ms  p99 {p(0.99):8.3f} ms")
+
+
+def run(points: int, queries: int, radius: float, limit: int, use_sql: bool, seed: int):
+    rng = np.random.default_rng(seed)
+    records = db_records() if use_sql else random_records(points, rng)
+    start = time.perf_counter()
+    index = GeoIndex(records)
+    print(f"建立索引：{len(index)} 個座標，{(time.perf_counter() - start) * 1e3:.1f} ms")
+
+    conn = None
+    if use_sql:
+        baseline, conn = sql_query()
+    else:
+        baseline = brute_force(records)
+
+    qs = list(zip(rng.uniform(*LAT_RANGE, queries), rng.uniform(*LNG_RANGE, queries)))
+    timings = {"index": [], "baseline": []}
+    mismatches = 0
+    try:
+        for lat, lng in qs:
+            t = time.perf_counter()
+            got = [i for i, _ in index.nearby(lat, lng, radius, limit)]
+            timings["index"].append(time.perf_counter() - t)
+            t = time.perf_counter()
+            expected = baseline(lat, lng, radius, limit)
+            timings["baseline"].append(time.perf_counter() - t)
+            mismatches += got != expected
+    finally:
+        if conn is not None:
+            conn.close()
+
+    report("GeoIndex", timings["index"])
+    report("SQL" if use_sql else "全表掃描", timings["baseline"])
+    print(f"加速 {statistics.mean(timings['baseline']) / statistics.mean(timings['index']):.1f} 倍，結果不一致 {mismatches}/{queries}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="附近景點查詢基準測試")
+    parser.add_argument("--points", type=int, default=50000, help="隨機座標數量（--sql 時忽略）")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--radius", type=float, default=1000, help="搜尋半徑（公尺）")
+    parser.add_argument("--limit", type=int, default=12)
+    parser.add_argument("--sql", action="store_true", help="使用資料庫中的景點並對照 SQL 距離查詢")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    raise SystemExit(run(args.points, args.queries, args.radius, args.limit, args.sql, args.seed))
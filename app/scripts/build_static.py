@@ -0,0 +1,108 @@
+"""
+建置前端靜態檔：將 static/ 輸出到 static_dist/，供 STATIC_DIST=true 時使用。
+
+- CSS、JS 與圖片另存一份內容雜湊檔名（例如 index.3f9a1c02de.css），可設為長期快取（immutable）
+- HTML 與 CSS 內引用的 /static/... 路徑改寫為雜湊檔名，HTML 本身維持原檔名（由頁面路由提供）
+- 文字類檔案預先產生 .gz 與 .br（需安裝 brotli，未安裝時略過）壓縮版本
+- 原檔名的檔案一併保留，部署切換期間仍引用舊路徑的頁面不會 404
+- manifest.json 記錄原路徑與雜湊路徑的對應
+
+    python -m app.scripts.build_static
+    python -m app.scripts.build_static --src static --out static_dist
+"""
+import os
+import re
+import gzip
+import json
+import shutil
+import hashlib
+import logging
+import argparse
+from typing import Dict
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logging.basicConfig(level=logging.INFO)
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+URL_PREFIX = "/static/"
+TEXT_EXTENSIONS = {".html", ".css", ".js", ".svg", ".json", ".txt"}
+HASHED_EXTENSIONS = {".css", ".js", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".ico"}
+# 引用順序：圖片不引用其他檔案，CSS 引用圖片，HTML 引用 CSS/JS/圖片，必須依序處理
+BUILD_ORDER = {".css": 1, ".js": 1, ".html": 2}
+REF_PATTERN = re.compile(r"/static/[A-Za-z0-9_./-]+")
+
+
+def hashed_name(rel_path: str, content: bytes) -> str:
+    base, ext = os.path.splitext(rel_path)
+    return f"{base}.{hashlib.sha256(content).hexdigest()[:10]}{ext}"
+
+
+def rewrite_refs(text: str, manifest: Dict[str, str]) -> str:
+    return REF_PATTERN.sub(lambda m: manifest.get(m.group(0), m.group(0)), text)
+
+
+def write_variants(path: str, content: bytes) -> int:
+    """寫入原始檔，文字類檔案另寫 .gz/.br（只在確實變小時），回傳寫入的壓縮檔數"""
+    with open(path, "wb") as f:
+        f.write(content)
+    if os.path.splitext(path)[1] not in TEXT_EXTENSIONS:
+        return 0
+    variants = {".gz": gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(content, quality=11)
+    written = 0
+    for suffix, data in variants.items():
+        if len(data) < len(content):
+            with open(path + suffix, "wb") as f:
+                f.write(data)
+            written += 1
+    return written
+
+
+def build(src: str, out: str) -> Dict[str, str]:
+    files = []
+    for dirpath, _, filenames in os.walk(src):
+        for name in filenames:
+            files.append(os.path.relpath(os.path.join(dirpath, name), src).replace(os.sep, "/"))
+    files.sort(key=lambda p: (BUILD_ORDER.get(os.path.splitext(p)[1], 0), p))
+
+    if os.path.isdir(out):
+        shutil.rmtree(out)
+    manifest: Dict[str, str] = {}
+    compressed = 0
+    for rel in files:
+        with open(os.path.join(src, rel), "rb") as f:
+            content = f.read()
+        ext = os.path.splitext(rel)[1]
+        if ext in (".css", ".html"):
+            content = rewrite_refs(content.decode("utf-8"), manifest).encode("utf-8")
+
+        targets = [rel]
+        if ext in HASHED_EXTENSIONS:
+            hashed = hashed_name(rel, content)
+            manifest[URL_PREFIX + rel] = URL_PREFIX + hashed
+            targets.append(hashed)
+        for target in targets:
+            path = os.path.join(out, target)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            compressed += write_variants(path, content)
+
+    with open(os.path.join(out, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    logging.info(
+        "靜態檔建置完成：%d 個檔案、%d 個雜湊檔名、%d 個壓縮檔%s",
+        len(files), len(manifest), compressed, "" if brotli else "（未安裝 brotli，只產生 gzip）",
+    )
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="建置預先壓縮、內容雜湊檔名的靜態檔")
+    parser.add_argument("--src", default=os.path.join(ROOT_DIR, "static"))
+    parser.add_argument("--out", default=os.path.join(ROOT_DIR, "static_dist"))
+    args = parser.parse_args()
+    build(args.src, args.out)
@@ -0,0 +1,298 @@
+"""
+CRUD 查詢計畫檢查：實際呼叫 app/crud 的各個函式並記錄它們送出的每一個 SQL，
+再對已 seed 的本機資料庫逐一 EXPLAIN，預估掃描列數超過門檻的全表掃描或 filesort 視為失敗（結束碼 1）。
+寫入類的陳述式會真的執行（才能取得實際的參數與錯誤），但一律不 commit，結束時全部 rollback。
+
+    python -m app.scripts.migrate                            # 先套用索引 migration
+    python -m app.scripts.explain_check --seed 20000         # 產生測試用使用者/訂單/預定後檢查
+    python -m app.scripts.explain_check --max-rows 500       # 只檢查，門檻為預估掃描 500 列
+"""
+import os
+os.environ["DB_ASYNC"] = "false"  # 記錄 SQL 需走同步連線池，需在載入 app 設定前指定
+
+import re
+import asyncio
+import argparse
+import logging
+from datetime import date, timedelta
+from typing import Dict, List
+
+import pymysql
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import DB_HOST, DB_USER, DB_PASSWORD, DB_NAME, DB_CHARSET
+from app.core.database import engine
+from app.db.session import ConnectionPool, set_pool
+from app.crud import attraction, booking, order, user
+from app.schemas.order import OrderRequest
+from app.schemas.user import UserCreate
+from app.scripts.import_data import get_db_connection
+
+logging.basicConfig(level=logging.WARNING)
+
+SEED_EMAIL_PREFIX = "explain-check-"
+SEED_ORDER_PREFIX = "19990101-"
+# 每位 seed 使用者約有的訂單數（模擬有大量訂單紀錄的回購客）
+ORDERS_PER_USER = 400
+PROBE_ORDER = "19990102-0001"
+
+# 已知且可接受的掃描：正式環境由記憶體索引處理，或只在啟動、重新載入時執行
+ALLOWED = {
+    "attraction.get_attractions(keyword)": "前後模糊的 LIKE 無法使用索引；正式環境以 SEARCH_INDEX 處理關鍵字",
+    "attraction.get_attractions_after(keyword)": "前後模糊的 LIKE 無法使用索引；正式環境以 SEARCH_INDEX 處理關鍵字",
+    "attraction.nearby_attractions": "SQL 後備做法需逐筆計算距離；正式環境以 GEO_INDEX 處理",
+    "attraction.fetch_mrts": "捷運站排行只在啟動與重新載入時查詢一次",
+    "attraction.fetch_all_attractions": "景點快照本來就讀取整張表，只在啟動與重新載入時執行",
+}
+
+DML_RE = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|REPLACE)\b", re.IGNORECASE)
+
+_step = ""
+_captured: Dict[str, Dict] = {}  # 正規化後的 SQL -> {"sql", "args", "steps"}
+
+
+def _record(sql: str, args):
+    if not DML_RE.match(sql):
+        return
+    entry = _captured.setdefault(" ".join(sql.split()), {"sql": sql, "args": args, "steps": []})
+    if _step not in entry["steps"]:
+        entry["steps"].append(_step)
+
+
+class _RecordingCursor(pymysql.cursors.DictCursor):
+    def execute(self, query, args=None):
+        _record(query, args)
+        return super().execute(query, args)
+
+
+class _NoCommitConnection(pymysql.connections.Connection):
+    """commit 不生效：歸還連線池時會 rollback，檢查過程不會留下任何寫入"""
+
+    def commit(self):
+        pass
+
+
+def _connect():
+    return _NoCommitConnection(
+        host=DB_HOST,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        database=DB_NAME,
+        charset=DB_CHARSET,
+        cursorclass=_RecordingCursor,
+    )
+
+
+def _record_orm(conn, cursor, statement, parameters, context, executemany):
+    _record(statement, parameters)
+
+
+def seed(cursor, rows: int, attraction_ids: List[int]):
+    """補足 rows 筆 seed 使用者、訂單與預定（可重複執行，只新增不足的部分）"""
+    cursor.execute("SELECT COUNT(*) AS n FROM users WHERE email LIKE %s", (SEED_EMAIL_PREFIX + "%",))
+    have = cursor.fetchone()["n"]
+    cursor.executemany(
+        "INSERT INTO users (name, email, password_hash) VALUES (%s, %s, %s)",
+        [(f"explain {i}", f"{SEED_EMAIL_PREFIX}{i}@example.com", "x") for i in range(have, rows)],
+    )
+    cursor.execute("SELECT id FROM users WHERE email LIKE %s ORDER BY id", (SEED_EMAIL_PREFIX + "%",))
+    user_ids = [r["id"] for r in cursor.fetchall()]
+    buyers = user_ids[:max(1, rows // ORDERS_PER_USER)]
+
+    cursor.execute("SELECT COUNT(*) AS n FROM orders WHERE order_number LIKE %s", (SEED_ORDER_PREFIX + "%",))
+    have = cursor.fetchone()["n"]
+    cursor.executemany(
+        """
+        INSERT INTO orders
+        (order_number, user_id, price, attraction_id, date, time,
+         contact_name, contact_email, contact_phone, status)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """,
+        [
+            (f"{SEED_ORDER_PREFIX}{i:06d}", buyers[i % len(buyers)], 2000, attraction_ids[i % len(attraction_ids)],
+             date(2099, 1, 1), "morning", "explain", "explain@example.com", "0900000000", i % 2)
+            for i in range(have, rows)
+        ],
+    )
+    cursor.executemany(
+        "INSERT IGNORE INTO bookings (user_id, attraction_id, date, time, price) VALUES (%s, %s, %s, %s, %s)",
+        [
+            (user_ids[i % len(user_ids)], attraction_ids[i % len(attraction_ids)],
+             date(2099, 1, 1) + timedelta(days=i // len(user_ids)), "morning", 2000)
+            for i in range(rows)
+        ],
+    )
+    cursor.execute("ANALYZE TABLE users, orders, bookings")
+    cursor.fetchall()
+
+
+def pick_probe(cursor) -> Dict:
+    """挑選查詢用的參數：訂單最多的使用者、他的一筆訂單與一個景點"""
+    cursor.execute("SELECT MIN(id) AS id FROM attractions")
+    attraction_id = cursor.fetchone()["id"] or 1
+    cursor.execute("SELECT user_id, COUNT(*) AS n FROM orders GROUP BY user_id ORDER BY n DESC LIMIT 1")
+    row = cursor.fetchone()
+    user_id = row["user_id"] if row else 1
+    cursor.execute("SELECT order_number FROM orders WHERE user_id = %s ORDER BY order_number LIMIT 1", (user_id,))
+    row = cursor.fetchone()
+    return {
+        "user_id": user_id,
+        "attraction_id": attraction_id,
+        "order_number": row["order_number"] if row else PROBE_ORDER,
+    }
+
+
+async def run_crud(probe: Dict) -> List[str]:
+    """依序呼叫各個 CRUD 函式，回傳執行失敗的步驟"""
+    global _step
+    user_id, attraction_id, order_number = probe["user_id"], probe["attraction_id"], probe["order_number"]
+    body = OrderRequest(prime="explain", order={
+        "price": 2000,
+        "trip": {
+            "attraction": {"id": attraction_id, "name": "explain", "address": "", "image": ""},
+            "date": date(2099, 1, 1),
+            "time": "morning",
+        },
+        "contact": {"name": "explain", "email": "explain@example.com", "phone": "0900000000"},
+    })
+    steps = [
+        ("attraction.get_attractions", lambda: attraction.get_attractions(0)),
+        ("attraction.get_attractions(keyword)", lambda: attraction.get_attractions(0, "公園")),
+        ("attraction.get_attractions_after", lambda: attraction.get_attractions_after("")),
+        ("attraction.get_attractions_after(cursor)",
+         lambda: attraction.get_attractions_after(attraction.encode_cursor(attraction_id))),
+        ("attraction.get_attractions_after(keyword)", lambda: attraction.get_attractions_after("", "公園")),
+        ("attraction._fetch_by_ids", lambda: attraction._fetch_by_ids([attraction_id])),
+        ("attraction.fetch_attraction_detail", lambda: attraction.fetch_attraction_detail(attraction_id)),
+        ("attraction.nearby_attractions", lambda: attraction.nearby_attractions(25.04, 121.53, 1000, 12)),
+        ("attraction.fetch_mrts", attraction._query_mrt_ranking),
+        ("attraction.fetch_all_attractions", attraction.fetch_all_attractions),
+        ("user.create_user", lambda: user.create_user(
+            UserCreate(name="explain", email="explain-probe@example.com", password="explain-probe"))),
+        ("user.authenticate_user", lambda: user.authenticate_user(f"{SEED_EMAIL_PREFIX}0@example.com", "x")),
+        ("order.generate_order_number", order.generate_order_number),
+        ("order.insert_pending_order", lambda: order.insert_pending_order(PROBE_ORDER, user_id, body)),
+        ("order.finalize_order",
+         lambda: order.finalize_order(PROBE_ORDER, user_id, body.order.trip, order.ORDER_PAID)),
+        ("order.fetch_order", lambda: order.fetch_order(order_number, user_id)),
+        ("order.fetch_orders_for_user", lambda: order.fetch_orders_for_user(user_id)),
+        ("order.fetch_orders_for_user(cursor)", lambda: order.fetch_orders_for_user(user_id, order_number)),
+    ]
+    failed = []
+    for label, fn in steps:
+        _step = label
+        try:
+            await fn()
+        except Exception as e:
+            logging.error("%s 執行失敗：%s", label, e)
+            failed.append(label)
+    return failed
+
+
+def run_orm(probe: Dict) -> List[str]:
+    """預定相關的 ORM 函式：在外層交易的 savepoint 中執行，結束時整批 rollback"""
+    global _step
+    user_id, attraction_id = probe["user_id"], probe["attraction_id"]
+    item = {"attraction_id": attraction_id, "date": date(2099, 12, 31), "time": "afternoon", "price": 2500}
+    failed = []
+    with engine.connect() as conn:
+        trans = conn.begin()
+        db = Session(bind=conn, join_transaction_mode="create_savepoint")
+        try:
+            steps = [
+                ("booking.get_booking_for_user", lambda: booking.get_booking_for_user(user_id, db=db)),
+                ("booking.get_cart_for_user", lambda: booking.get_cart_for_user(user_id, db=db)),
+                ("booking.add_cart_items", lambda: booking.add_cart_items(user_id, [item], db=db)),
+                ("booking.upsert_booking", lambda: booking.upsert_booking(
+                    user_id, attraction_id, item["date"], "morning", item["price"], db=db)),
+                ("booking.remove_cart_items", lambda: booking.remove_cart_items(user_id, [0], db=db)),
+                ("booking.delete_booking_for_user", lambda: booking.delete_booking_for_user(user_id, db=db)),
+            ]
+            for label, fn in steps:
+                _step = label
+                try:
+                    fn()
+                except Exception as e:
+                    logging.error("%s 執行失敗：%s", label, e)
+                    failed.append(label)
+        finally:
+            db.close()
+            trans.rollback()
+    return failed
+
+
+def plan_problems(plan: List[Dict], max_rows: int) -> List[str]:
+    problems = []
+    for row in plan:
+        rows = row.get("rows") or 0
+        if rows <= max_rows:
+            continue
+        if row.get("type") == "ALL":
+            problems.append(f"{row['table']}：全表掃描（預估 {rows} 列）")
+        elif row.get("type") == "index":
+            problems.append(f"{row['table']}：全索引掃描（預估 {rows} 列）")
+        if "filesort" in (row.get("Extra") or ""):
+            problems.append(f"{row['table']}：filesort（預估 {rows} 列）")
+    return problems
+
+
+def check(cursor, max_rows: int) -> int:
+    failures = 0
+    for entry in _captured.values():
+        label = ", ".join(entry["steps"])
+        try:
+            cursor.execute("EXPLAIN " + entry["sql"], entry["args"])
+            plan = cursor.fetchall()
+        except pymysql.MySQLError as e:
+            print(f"[ERROR]   {label}\n          {e}")
+            failures += 1
+            continue
+        problems = plan_problems(plan, max_rows)
+        allowed = problems and all(step in ALLOWED for step in entry["steps"])
+        verdict = "OK" if not problems else "ALLOWED" if allowed else "FAIL"
+        print(f"[{verdict}]{' ' * (8 - len(verdict))}{label}")
+        for row in plan:
+            print(f"          {row.get('table') or '-':24} {row.get('type') or '-':8} "
+                  f"{row.get('key') or '-':28} rows={row.get('rows') or 0:<8} {row.get('Extra') or ''}")
+        for p in problems:
+            print(f"          ! {p}")
+        if allowed:
+            print(f"          （{'；'.join(sorted({ALLOWED[s] for s in entry['steps']}))}）")
+        failures += verdict == "FAIL"
+    return failures
+
+
+def main(max_rows: int, seed_rows: int) -> int:
+    connection = get_db_connection()
+    try:
+        with connection.cursor() as cursor:
+            if seed_rows:
+                cursor.execute("SELECT id FROM attractions ORDER BY id")
+                attraction_ids = [r["id"] for r in cursor.fetchall()]
+                if not attraction_ids:
+                    raise SystemExit("attractions 沒有資料，請先執行 python -m app.scripts.import_data")
+                seed(cursor, seed_rows, attraction_ids)
+                connection.commit()
+            probe = pick_probe(cursor)
+
+        engine.echo = False
+        event.listen(engine, "before_cursor_execute", _record_orm)
+        set_pool(ConnectionPool(size=1, max_overflow=1, timeout=10, connect=_connect))
+        failed = asyncio.run(run_crud(probe)) + run_orm(probe)
+
+        with connection.cursor() as cursor:
+            failures = check(cursor, max_rows)
+    finally:
+        connection.close()
+
+    print(f"\n共 {len(_captured)} 個陳述式，{failures} 個超過門檻（{max_rows} 列），{len(failed)} 個步驟執行失敗")
+    return 1 if failures or failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="檢查 CRUD 查詢的 EXPLAIN 計畫")
+    parser.add_argument("--max-rows", type=int, default=1000, help="全表掃描或 filesort 的預估列數超過此值即失敗")
+    parser.add_argument("--seed", type=int, default=0, metavar="N", help="先補足 N 筆測試用使用者、訂單與預定")
+    args = parser.parse_args()
+    raise SystemExit(main(args.max_rows, args.seed))
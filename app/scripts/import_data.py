@@ -1,8 +1,13 @@
 import os
 import json
+import time
+import uuid
+import hashlib
 import logging
+import argparse
 import pymysql
 import re
+from typing import Dict, Iterator, List, Optional, Tuple
 from dotenv import load_dotenv
 
 # 載入環境變數
@@ -18,6 +23,8 @@ DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_NAME = os.getenv("DB_NAME")
 DB_CHARSET = os.getenv("DB_CHARSET", "utf8mb4")
 
+DEFAULT_SOURCE = 'data/taipei-attractions.json'
+
 def get_db_connection():
     try:
         connection = pymysql.connect(
@@ -38,9 +45,117 @@ def filter_image_urls(image_str: str):
     urls = re.findall(pattern, image_str, flags=re.IGNORECASE)
     return urls
 
-def import_data():
+def canonical_images(value) -> List[str]:
+    """
+    圖片欄位的標準形式：去除重複、保留順序的 http(s) 網址陣列（寫入時以 json.dumps 存成 JSON 陣列）。
+    可接受串列、JSON 陣列字串或直接串接網址的舊格式字串，讀取端因此不必再做任何解析或容錯。
+    """
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode('utf-8')
+    if isinstance(value, str):
+        text = value.strip()
+        parsed = None
+        if text.startswith('['):
+            try:
+                parsed = json.loads(text)
+            except json.JSONDecodeError:
+                pass
+        value = parsed if isinstance(parsed, list) else re.findall(
+            r'https?://[^\s,"\']+?\.(?:jpg|jpeg|png|gif)', text, flags=re.IGNORECASE
+        )
+    urls = []
+    for url in value or []:
+        if isinstance(url, str) and url.startswith(('http://', 'https://')) and url not in urls:
+            urls.append(url)
+    return urls
+
+def parse_item(item: Dict) -> Dict:
+    """將原始 JSON 的一筆景點轉成資料表欄位"""
+    return {
+        'name': item.get('name', ''),
+        'category': item.get('CAT', ''),
+        'description': item.get('description', ''),
+        'address': item.get('address', ''),
+        'transport': item.get('direction', ''),
+        'mrt': item.get('MRT', '') or '',
+        'latitude': float(item.get('latitude', 0)) if item.get('latitude') else None,
+        'longitude': float(item.get('longitude', 0)) if item.get('longitude') else None,
+        'images': canonical_images(filter_image_urls(item.get('file', ''))),
+    }
+
+def content_hash(row: Dict) -> str:
+    """parse_item() 結果的內容雜湊，欄位順序固定，內容相同即得到相同值"""
+    return hashlib.sha1(json.dumps(row, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+# 全新安裝時 create_tables 直接建立目前的 attractions 結構，已包含這些 migration 的變更，
+# 因此一併記為已套用，之後執行 migrate 不會重複 ADD COLUMN
+SCHEMA_BASELINE_MIGRATIONS = ("002_attraction_content_hash.sql", "003_normalize_images.py")
+
+def create_tables(cursor):
+    cursor.execute("SHOW TABLES LIKE 'attractions'")
+    fresh = cursor.fetchone() is None
+
+    # 建立 attraction_mrt 資料表
+    create_mrt_table_sql = """
+    CREATE TABLE IF NOT EXISTS attraction_mrt (
+        id INT PRIMARY KEY AUTO_INCREMENT,
+        mrt VARCHAR(255) UNIQUE
+    );
+    """
+    cursor.execute(create_mrt_table_sql)
+
+    # 建立 attractions 資料表，並加入 attraction_mrt_id 欄位；
+    # primary_image（migration 003）與 content_hash（migration 002）供 ORM、預定/訂單查詢與增量匯入使用
+    create_attractions_table_sql = """
+    CREATE TABLE IF NOT EXISTS attractions (
+        id INT PRIMARY KEY AUTO_INCREMENT,
+        name VARCHAR(255) UNIQUE,
+        category VARCHAR(255),
+        description TEXT,
+        address VARCHAR(255),
+        transport TEXT,
+        latitude DOUBLE,
+        longitude DOUBLE,
+        images JSON,
+        attraction_mrt_id INT,
+        primary_image VARCHAR(1024)
+            GENERATED ALWAYS AS (JSON_UNQUOTE(JSON_EXTRACT(images, '$[0]'))) STORED,
+        content_hash CHAR(40) NULL,
+        FOREIGN KEY (attraction_mrt_id) REFERENCES attraction_mrt(id)
+    );
+    """
+    cursor.execute(create_attractions_table_sql)
+
+    if fresh:
+        # 與 migration 002 相同的異動紀錄表
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS attraction_changes (
+            id BIGINT PRIMARY KEY AUTO_INCREMENT,
+            run_id CHAR(32) NOT NULL,
+            attraction_id INT NULL,
+            name VARCHAR(255) NOT NULL,
+            change_type ENUM('insert', 'update', 'delete') NOT NULL,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_attraction_changes_run (run_id),
+            INDEX idx_attraction_changes_time (changed_at)
+        );
+        """)
+        from app.scripts.migrate import applied_versions
+        applied_versions(cursor)
+        cursor.executemany(
+            "INSERT IGNORE INTO schema_migrations (version) VALUES (%s)",
+            [(name,) for name in SCHEMA_BASELINE_MIGRATIONS],
+        )
+
+def require_content_hash(cursor):
+    """所有匯入方式都會寫入 content_hash，增量匯入才能與完整匯入的結果比對；舊資料庫需先套用 migration 002"""
+    cursor.execute("SHOW COLUMNS FROM attractions LIKE 'content_hash'")
+    if cursor.fetchone() is None:
+        raise RuntimeError("attractions 缺少 content_hash 欄位，請先執行 python -m app.scripts.migrate")
+
+def import_data(path: str = DEFAULT_SOURCE):
     try:
-        with open('data/taipei-attractions.json', encoding='utf-8') as f:
+        with open(path, encoding='utf-8') as f:
             data = json.load(f)
     except Exception as e:
         logging.error("讀取 JSON 檔案失敗：%s", e)
@@ -55,47 +170,17 @@ def import_data():
     connection = get_db_connection()
     try:
         with connection.cursor() as cursor:
-            # 建立 attraction_mrt 資料表
-            create_mrt_table_sql = """
-            CREATE TABLE IF NOT EXISTS attraction_mrt (
-                id INT PRIMARY KEY AUTO_INCREMENT,
-                mrt VARCHAR(255) UNIQUE
-            );
-            """
-            cursor.execute(create_mrt_table_sql)
-
-            # 建立 attractions 資料表，並加入 attraction_mrt_id 欄位
-            create_attractions_table_sql = """
-            CREATE TABLE IF NOT EXISTS attractions (
-                id INT PRIMARY KEY AUTO_INCREMENT,
-                name VARCHAR(255) UNIQUE,
-                category VARCHAR(255),
-                description TEXT,
-                address VARCHAR(255),
-                transport TEXT,
-                latitude DOUBLE,
-                longitude DOUBLE,
-                images JSON,
-                attraction_mrt_id INT,
-                FOREIGN KEY (attraction_mrt_id) REFERENCES attraction_mrt(id)
-            );
-            """
-            cursor.execute(create_attractions_table_sql)
-
+            create_tables(cursor)
             connection.commit()
+            require_content_hash(cursor)
 
             # 資料匯入邏輯
             for item in results:
                 if isinstance(item, dict):
-                    name = item.get('name', '')
-                    category = item.get('CAT', '')
-                    description = item.get('description', '')
-                    address = item.get('address', '')
-                    transport = item.get('direction', '')
-                    mrt = item.get('MRT', '') or ''
-                    latitude = float(item.get('latitude', 0)) if item.get('latitude') else None
-                    longitude = float(item.get('longitude', 0)) if item.get('longitude') else None
-                    images = filter_image_urls(item.get('file', ''))
+                    row = parse_item(item)
+                    name, category, description = row['name'], row['category'], row['description']
+                    address, transport, mrt = row['address'], row['transport'], row['mrt']
+                    latitude, longitude, images = row['latitude'], row['longitude'], row['images']
 
                     # 檢查該景點是否已存在
                     check_sql = "SELECT COUNT(*) as count FROM attractions WHERE name = %s"
@@ -125,20 +210,271 @@ def import_data():
 
                         # 插入 attractions 資料表
                         insert_sql = """
-                        INSERT INTO attractions (name, category, description, address, transport, latitude, longitude, images, attraction_mrt_id)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                        INSERT INTO attractions (name, category, description, address, transport, latitude, longitude, images, attraction_mrt_id, content_hash)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                         """
                         cursor.execute(insert_sql, (
-                            name, category, description, address, transport, latitude, longitude, json.dumps(images), attraction_mrt_id
+                            name, category, description, address, transport, latitude, longitude, json.dumps(images), attraction_mrt_id,
+                            content_hash(row),
                         ))
 
             connection.commit()
             logging.info("資料匯入成功")
+            logging.info("請對服務送出 SIGHUP 以重新計算捷運站排行（及啟用時的景點快照與搜尋索引）")
     except Exception as e:
         logging.error("資料匯入失敗：%s", e)
     finally:
         connection.close()
 
 
+def iter_records(path: str, array_key: str = 'results', chunk_size: int = 1 << 16) -> Iterator[Dict]:
+    """
+    逐筆讀出 JSON 檔中 array_key 陣列的元素（例如 {"result": {"results": [...]}}），
+    以 raw_decode 增量解析，記憶體用量只和單筆資料大小有關，與檔案大小無關。
+    """
+    decoder = json.JSONDecoder()
+    marker = re.compile(r'"%s"\s*:\s*\[' % re.escape(array_key))
+    with open(path, encoding='utf-8') as f:
+        buf = ''
+        while True:
+            m = marker.search(buf)
+            if m:
+                buf = buf[m.end():]
+                break
+            chunk = f.read(chunk_size)
+            if not chunk:
+                raise ValueError(f"JSON 格式錯誤，找不到 '{array_key}' 陣列")
+            buf = buf[-(len(array_key) + 64):] + chunk
+
+        pos = 0
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buf) and buf[pos] == ']':
+                return
+            try:
+                if pos >= len(buf):
+                    raise json.JSONDecodeError("需要更多資料", buf, pos)
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    raise ValueError(f"JSON 格式錯誤，'{array_key}' 陣列不完整")
+                buf, pos = buf[pos:] + chunk, 0
+                continue
+            yield obj
+            pos = end
+            if pos > chunk_size:
+                buf, pos = buf[pos:], 0
+
+def iter_batches(records: Iterator[Dict], batch_size: int) -> Iterator[List[Dict]]:
+    batch = []
+    for item in records:
+        if isinstance(item, dict):
+            batch.append(parse_item(item))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+def resolve_mrt_ids(cursor, mrt_ids: Dict[str, int], names) -> None:
+    """將批次中尚未見過的捷運站一次寫入並查回 id，結果累積在 mrt_ids 中"""
+    missing = sorted({n for n in names if n.strip() and n not in mrt_ids})
+    if not missing:
+        return
+    cursor.executemany("INSERT IGNORE INTO attraction_mrt (mrt) VALUES (%s)", [(n,) for n in missing])
+    placeholders = ", ".join(["%s"] * len(missing))
+    cursor.execute(f"SELECT id, mrt FROM attraction_mrt WHERE mrt IN ({placeholders})", missing)
+    for r in cursor.fetchall():
+        mrt_ids[r['mrt']] = r['id']
+
+# pymysql 的 executemany 會把這種 INSERT ... VALUES 改寫成單一多列陳述式；
+# 完整匯入與增量匯入共用，content_hash 一律以 content_hash(row) 計算
+UPSERT_ATTRACTIONS_SQL = """
+INSERT INTO attractions (name, category, description, address, transport, latitude, longitude, images, attraction_mrt_id, content_hash)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE
+    category = VALUES(category),
+    description = VALUES(description),
+    address = VALUES(address),
+    transport = VALUES(transport),
+    latitude = VALUES(latitude),
+    longitude = VALUES(longitude),
+    images = VALUES(images),
+    attraction_mrt_id = VALUES(attraction_mrt_id),
+    content_hash = VALUES(content_hash)
+"""
+
+def upsert_params(row: Dict, mrt_ids: Dict[str, int], digest: str) -> tuple:
+    return (
+        row['name'], row['category'], row['description'], row['address'], row['transport'],
+        row['latitude'], row['longitude'], json.dumps(row['images']),
+        mrt_ids.get(row['mrt']) if row['mrt'].strip() else None, digest,
+    )
+
+def import_data_batched(path: str = DEFAULT_SOURCE, batch_size: int = 500) -> Tuple[int, float]:
+    """
+    串流讀取來源檔，每 batch_size 筆以一個多列 upsert 寫入並提交一次交易。
+    與 import_data() 不同，已存在的景點（依 name）會以新資料更新。回傳 (筆數, 秒數)。
+    寫入的 content_hash 與增量匯入相同，之後執行 --delta 只會處理真正變動的景點。
+    """
+    connection = get_db_connection()
+    start = time.perf_counter()
+    total = 0
+    try:
+        with connection.cursor() as cursor:
+            create_tables(cursor)
+            connection.commit()
+            require_content_hash(cursor)
+            cursor.execute("SELECT id, mrt FROM attraction_mrt")
+            mrt_ids = {r['mrt']: r['id'] for r in cursor.fetchall()}
+
+            for batch in iter_batches(iter_records(path), batch_size):
+                resolve_mrt_ids(cursor, mrt_ids, (row['mrt'] for row in batch))
+                cursor.executemany(
+                    UPSERT_ATTRACTIONS_SQL, [upsert_params(row, mrt_ids, content_hash(row)) for row in batch]
+                )
+                connection.commit()
+                total += len(batch)
+                elapsed = time.perf_counter() - start
+                logging.info("已匯入 %d 筆（%.0f 筆/秒）", total, total / elapsed if elapsed else 0)
+    except Exception as e:
+        connection.rollback()
+        logging.error("資料匯入失敗（已提交 %d 筆）：%s", total, e)
+        raise
+    finally:
+        connection.close()
+
+    elapsed = time.perf_counter() - start
+    logging.info("資料匯入成功：%d 筆，耗時 %.2f 秒（%.0f 筆/秒）", total, elapsed, total / elapsed if elapsed else 0)
+    logging.info("請對服務送出 SIGHUP 以重新計算捷運站排行（及啟用時的景點快照與搜尋索引）")
+    return total, elapsed
+
+def diff_source(path: str, existing: Dict[str, Tuple[int, Optional[str]]]) -> Dict[str, list]:
+    """
+    以名稱比對來源檔與資料庫（existing: name -> (id, content_hash)），
+    回傳 {'insert': [row...], 'update': [row...], 'delete': [(id, name)...]}；
+    來源中同名的重複資料以最後一筆為準。
+    """
+    rows: Dict[str, Dict] = {}
+    for item in iter_records(path):
+        if isinstance(item, dict):
+            row = parse_item(item)
+            rows[row['name']] = row
+    diff = {'insert': [], 'update': [], 'delete': []}
+    for name, row in rows.items():
+        digest = content_hash(row)
+        if name not in existing:
+            diff['insert'].append((row, digest))
+        elif existing[name][1] != digest:
+            diff['update'].append((row, digest))
+    diff['delete'] = [(id_, name) for name, (id_, _) in existing.items() if name not in rows]
+    return diff
+
+def import_data_delta(path: str = DEFAULT_SOURCE, batch_size: int = 500, delete: bool = True,
+                      dry_run: bool = False, changes_out: Optional[str] = None) -> Dict:
+    """
+    增量匯入：依內容雜湊找出新增、更新與（來源已移除的）刪除，只寫入這些景點，
+    並在同一個交易中寫入 attraction_changes 異動紀錄。需先套用 migration 002。
+    被訂單等資料參照而無法刪除的景點會保留並記錄在 'kept' 中。
+    """
+    connection = get_db_connection()
+    start = time.perf_counter()
+    run_id = uuid.uuid4().hex
+    try:
+        with connection.cursor() as cursor:
+            require_content_hash(cursor)
+            cursor.execute("SELECT id, name, content_hash FROM attractions")
+            existing = {r['name']: (r['id'], r['content_hash']) for r in cursor.fetchall()}
+            diff = diff_source(path, existing)
+            if not delete:
+                diff['delete'] = []
+            summary = {k: len(v) for k, v in diff.items()}
+            logging.info("差異：新增 %(insert)d、更新 %(update)d、刪除 %(delete)d", summary)
+            if dry_run:
+                return {'run_id': None, **summary, 'changes': []}
+
+            cursor.execute("SELECT id, mrt FROM attraction_mrt")
+            mrt_ids = {r['mrt']: r['id'] for r in cursor.fetchall()}
+            upserts = diff['insert'] + diff['update']
+            for i in range(0, len(upserts), batch_size):
+                batch = upserts[i:i + batch_size]
+                resolve_mrt_ids(cursor, mrt_ids, (row['mrt'] for row, _ in batch))
+                cursor.executemany(
+                    UPSERT_ATTRACTIONS_SQL, [upsert_params(row, mrt_ids, digest) for row, digest in batch]
+                )
+
+            ids = {name: id_ for name, (id_, _) in existing.items()}
+            inserted = [row['name'] for row, _ in diff['insert']]
+            for i in range(0, len(inserted), batch_size):
+                names = inserted[i:i + batch_size]
+                cursor.execute(
+                    f"SELECT id, name FROM attractions WHERE name IN ({', '.join(['%s'] * len(names))})", names
+                )
+                ids.update({r['name']: r['id'] for r in cursor.fetchall()})
+
+            kept = []
+            deleted = []
+            for id_, name in diff['delete']:
+                try:
+                    cursor.execute("DELETE FROM attractions WHERE id = %s", (id_,))
+                    deleted.append((id_, name))
+                except pymysql.err.IntegrityError:
+                    kept.append({'id': id_, 'name': name})
+
+            changes = (
+                [(ids[row['name']], row['name'], 'insert') for row, _ in diff['insert']]
+                + [(ids[row['name']], row['name'], 'update') for row, _ in diff['update']]
+                + [(id_, name, 'delete') for id_, name in deleted]
+            )
+            cursor.executemany(
+                "INSERT INTO attraction_changes (run_id, attraction_id, name, change_type) VALUES (%s, %s, %s, %s)",
+                [(run_id, id_, name, kind) for id_, name, kind in changes],
+            )
+            connection.commit()
+    except Exception as e:
+        connection.rollback()
+        logging.error("增量匯入失敗：%s", e)
+        raise
+    finally:
+        connection.close()
+
+    result = {
+        'run_id': run_id,
+        'insert': len(diff['insert']),
+        'update': len(diff['update']),
+        'delete': len(deleted),
+        'kept': kept,
+        'changes': [{'id': id_, 'name': name, 'type': kind} for id_, name, kind in changes],
+    }
+    if changes_out:
+        with open(changes_out, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    elapsed = time.perf_counter() - start
+    logging.info(
+        "增量匯入完成（run_id=%s）：新增 %d、更新 %d、刪除 %d、無法刪除 %d，耗時 %.2f 秒",
+        run_id, result['insert'], result['update'], result['delete'], len(kept), elapsed,
+    )
+    if changes:
+        logging.info("請對服務送出 SIGHUP 以重新計算捷運站排行（及啟用時的景點快照與搜尋索引）")
+    return result
+
+
 if __name__ == "__main__":
-    import_data()
+    parser = argparse.ArgumentParser(description="匯入景點資料")
+    parser.add_argument("--file", default=DEFAULT_SOURCE, help="來源 JSON 檔")
+    parser.add_argument("--batch", action="store_true", help="串流讀取並以多列 upsert 分批寫入（大型資料集用）")
+    parser.add_argument("--batch-size", type=int, default=500, help="每個交易寫入的筆數")
+    parser.add_argument("--delta", action="store_true", help="依內容雜湊只寫入新增/更新/刪除的景點（需先執行 migrate）")
+    parser.add_argument("--no-delete", action="store_true", help="增量匯入時不刪除來源已移除的景點")
+    parser.add_argument("--dry-run", action="store_true", help="增量匯入時只計算差異，不寫入")
+    parser.add_argument("--changes-out", help="增量匯入時將異動清單另存為 JSON 檔")
+    args = parser.parse_args()
+    if args.delta:
+        import_data_delta(args.file, args.batch_size, delete=not args.no_delete,
+                          dry_run=args.dry_run, changes_out=args.changes_out)
+    elif args.batch:
+        import_data_batched(args.file, args.batch_size)
+    else:
+        import_data(args.file)
@@ -0,0 +1,84 @@
+"""
+依序套用 app/db/migrations/ 中的 *.sql 與 *.py，已套用的版本記錄在 schema_migrations 資料表。
+.py migration 需提供 upgrade(cursor)，用於無法以純 SQL 表達的資料轉換。
+migrations 以既有的 users、bookings、orders 資料表為前提（001 起即會讀取 orders），請在這些資料表建立後再執行。
+
+    python -m app.scripts.migrate          # 套用所有尚未執行的 migration
+    python -m app.scripts.migrate --list   # 列出各 migration 的狀態
+"""
+import os
+import re
+import argparse
+import logging
+import importlib.util
+
+from app.scripts.import_data import get_db_connection
+
+logging.basicConfig(level=logging.INFO)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "db", "migrations")
+
+
+def list_migrations():
+    return sorted(f for f in os.listdir(MIGRATIONS_DIR) if re.match(r"^\d+_.+\.(sql|py)$", f))
+
+
+def split_statements(sql: str):
+    """以行尾的分號切分 SQL 檔，並去除 -- 註解"""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [stmt.strip() for stmt in re.split(r";\s*$", "\n".join(lines), flags=re.MULTILINE) if stmt.strip()]
+
+
+def load_module(name: str):
+    spec = importlib.util.spec_from_file_location(f"migration_{name[:-3]}", os.path.join(MIGRATIONS_DIR, name))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def applied_versions(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version VARCHAR(255) PRIMARY KEY,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row["version"] for row in cursor.fetchall()}
+
+
+def migrate(list_only: bool = False):
+    connection = get_db_connection()
+    try:
+        with connection.cursor() as cursor:
+            done = applied_versions(cursor)
+            for name in list_migrations():
+                if list_only:
+                    print(f"{'applied' if name in done else 'pending':8} {name}")
+                    continue
+                if name in done:
+                    continue
+                if name.endswith(".py"):
+                    logging.info("套用 migration %s", name)
+                    load_module(name).upgrade(cursor)
+                else:
+                    with open(os.path.join(MIGRATIONS_DIR, name), encoding="utf-8") as f:
+                        statements = split_statements(f.read())
+                    logging.info("套用 migration %s（%d 個陳述式）", name, len(statements))
+                    for stmt in statements:
+                        cursor.execute(stmt)
+                cursor.execute("INSERT INTO schema_migrations (version) VALUES (%s)", (name,))
+                connection.commit()
+    except Exception as e:
+        connection.rollback()
+        logging.error("Migration 失敗：%s", e)
+        raise
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="套用資料庫 schema migrations")
+    parser.add_argument("--list", action="store_true", help="只列出狀態，不執行")
+    args = parser.parse_args()
+    migrate(list_only=args.list)
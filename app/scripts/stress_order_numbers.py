@@ -0,0 +1,83 @@
+"""
+訂單編號配發器的併發壓力測試：在同一個事件迴圈中以多個協程同時對多個配發器實例
+（模擬多個 uvicorn worker）大量配號，確認沒有任何重複編號。
+DB_ASYNC 開啟時走 aiomysql 連線池（綁定於此事件迴圈，結束時關閉），否則查詢交由工作執行緒執行。
+
+使用假的日期鍵（預設 19990101），不會動到真實的當日流水號，結束後刪除該計數列。
+執行前需先套用 migration：python -m app.scripts.migrate
+
+    python -m app.scripts.stress_order_numbers --tasks 32 --per-task 200 --workers 4 --block-size 20
+"""
+import time
+import asyncio
+import argparse
+from collections import Counter
+
+from app.core.config import DB_ASYNC
+from app.crud.order_number import OrderNumberAllocator
+from app.db.session import get_db_connection, close_async_pool
+
+
+async def hammer_all(tasks: int, per_task: int, workers: int, block_size: int, day: str):
+    allocators = [OrderNumberAllocator(block_size) for _ in range(workers)]
+    results = [[] for _ in range(tasks)]
+    start = asyncio.Event()
+
+    async def hammer(i: int):
+        allocator = allocators[i % workers]
+        await start.wait()
+        for _ in range(per_task):
+            results[i].append(await allocator.allocate(day))
+
+    try:
+        jobs = [asyncio.create_task(hammer(i)) for i in range(tasks)]
+        began = time.perf_counter()
+        start.set()
+        outcomes = await asyncio.gather(*jobs, return_exceptions=True)
+        elapsed = time.perf_counter() - began
+    finally:
+        if DB_ASYNC:
+            await close_async_pool()
+    errors = [o for o in outcomes if isinstance(o, BaseException)]
+    return results, errors, elapsed
+
+
+def run(tasks: int, per_task: int, workers: int, block_size: int, day: str) -> int:
+    results, errors, elapsed = asyncio.run(hammer_all(tasks, per_task, workers, block_size, day))
+
+    numbers = [n for r in results for n in r]
+    duplicates = [n for n, c in Counter(numbers).items() if c > 1]
+    print(f"配發 {len(numbers)} 個編號，耗時 {elapsed:.2f} 秒（{len(numbers) / elapsed:.0f} 個/秒）")
+    print(f"重複：{len(duplicates)}，錯誤：{len(errors)}")
+    for e in errors[:5]:
+        print(f"  {e!r}")
+    for n in duplicates[:10]:
+        print(f"  重複編號 {n}")
+    return 1 if duplicates or errors or len(numbers) != tasks * per_task else 0
+
+
+def cleanup(day: str):
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM order_sequences WHERE day = %s", (day,))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="訂單編號配發器併發壓力測試")
+    parser.add_argument("--tasks", "--threads", type=int, default=32, help="同時配號的協程數")
+    parser.add_argument("--per-task", "--per-thread", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4, help="配發器實例數（模擬 worker 數）")
+    parser.add_argument("--block-size", type=int, default=1)
+    parser.add_argument("--day", default="19990101", help="測試用的日期鍵")
+    args = parser.parse_args()
+
+    cleanup(args.day)
+    try:
+        status = run(args.tasks, args.per_task, args.workers, args.block_size, args.day)
+    finally:
+        cleanup(args.day)
+    raise SystemExit(status)
@@ -0,0 +1,68 @@
+"""
+本機 TapPay pay-by-prime 模擬伺服器，用於結帳流程的壓力測試，不會呼叫真正的 sandbox。
+
+    python -m app.scripts.tappay_stub --port 9000 --latency 300 --fail-rate 0.05
+    TAPPAY_ENDPOINT=http://127.0.0.1:9000/tpc/payment/pay-by-prime uvicorn app.main:app
+"""
+import uuid
+import random
+import asyncio
+import argparse
+import logging
+
+import uvicorn
+from fastapi import FastAPI, Request
+
+logging.basicConfig(level=logging.INFO)
+
+
+def create_app(latency_ms: float = 0, jitter_ms: float = 0, fail_rate: float = 0) -> FastAPI:
+    app = FastAPI()
+    stats = {"calls": 0, "failed": 0}
+
+    @app.post("/tpc/payment/pay-by-prime")
+    async def pay_by_prime(request: Request):
+        body = await request.json()
+        stats["calls"] += 1
+        delay = max(0.0, random.gauss(latency_ms, jitter_ms)) / 1000 if jitter_ms else latency_ms / 1000
+        if delay:
+            await asyncio.sleep(delay)
+
+        if random.random() < fail_rate:
+            stats["failed"] += 1
+            return {"status": 10003, "msg": "Card Error", "order_number": body.get("order_number", "")}
+
+        return {
+            "status": 0,
+            "msg": "Success",
+            "amount": body.get("amount"),
+            "currency": "TWD",
+            "order_number": body.get("order_number", ""),
+            "rec_trade_id": f"D{uuid.uuid4().hex[:16].upper()}",
+            "bank_transaction_id": f"TP{uuid.uuid4().hex[:16].upper()}",
+            "acquirer": "TW_STUB",
+            "card_info": {"last_four": "4242", "funding": 0, "type": 1},
+        }
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TapPay pay-by-prime 模擬伺服器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", type=float, default=0, help="平均回應延遲（毫秒）")
+    parser.add_argument("--jitter", type=float, default=0, help="延遲標準差（毫秒）")
+    parser.add_argument("--fail-rate", type=float, default=0, help="回傳付款失敗的比例 0~1")
+    args = parser.parse_args()
+
+    app = create_app(args.latency, args.jitter, args.fail_rate)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
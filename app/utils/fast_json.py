@@ -0,0 +1,16 @@
+from typing import List, Optional, Union
+
+import orjson
+
+# 已編碼的回應內容直接以 Response(content, media_type=JSON_MEDIA_TYPE) 回傳，不經 response_model 驗證
+JSON_MEDIA_TYPE = "application/json"
+
+
+def list_body(next_page: Optional[Union[int, str]], items: List[bytes]) -> bytes:
+    """組出 AttractionListResponse 格式的內容：{"nextPage": ..., "data": [...]}"""
+    return b'{"nextPage":' + orjson.dumps(next_page) + b',"data":[' + b",".join(items) + b"]}"
+
+
+def data_body(item: bytes) -> bytes:
+    """組出 {"data": ...} 格式的內容（AttractionDetailResponse 等）"""
+    return b'{"data":' + item + b"}"
@@ -0,0 +1,61 @@
+import json
+import hashlib
+from typing import Any, Dict, List
+
+from fastapi import Request, Response
+from app.core.config import API_CACHE_CONTROL
+
+
+def make_etag(*parts: Any) -> str:
+    """由資料版本號與查詢參數組成強 ETag"""
+    key = "\x1f".join("" if p is None else str(p) for p in parts)
+    return '"' + hashlib.sha1(key.encode("utf-8")).hexdigest()[:20] + '"'
+
+
+def body_etag(body: Any) -> str:
+    """沒有資料版本號可用時（未啟用記憶體快照），改以回應內容雜湊作為 ETag"""
+    return make_etag(json.dumps(body, ensure_ascii=False, sort_keys=True, default=str))
+
+
+def content_etag(content: bytes) -> str:
+    """已編碼好的回應內容的 ETag"""
+    return '"' + hashlib.sha1(content).hexdigest()[:20] + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match 採弱比對（RFC 9110）：忽略 W/ 前綴，支援多個值與 *"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def cache_headers(etag: str, cache_control: str = API_CACHE_CONTROL) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": cache_control}
+
+
+def not_modified(etag: str, cache_control: str = API_CACHE_CONTROL) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag, cache_control))
+
+
+def acceptable_encodings(accept_encoding: str, available) -> List[str]:
+    """
+    依 Accept-Encoding 過濾 available（依伺服器偏好排序，例如 ("br", "gzip")），
+    q=0 視為拒絕；回傳空串列代表只能使用未壓縮版本。
+    """
+    accepted = {}
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding:
+            accepted[coding.lower()] = q
+    return [c for c in available if accepted.get(c, accepted.get("*", 0.0)) > 0]
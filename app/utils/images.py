@@ -0,0 +1,238 @@
+import io
+import os
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from PIL import Image, ImageOps, UnidentifiedImageError
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import (
+    IMAGE_PROXY, IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_MB, IMAGE_UPSTREAM_DIR, IMAGE_FETCH_TIMEOUT,
+)
+
+# 固定輸出尺寸（寬, 高），裁切置中後輸出 WebP
+IMAGE_SIZES = {
+    "thumb": (320, 240),
+    "card": (640, 480),
+}
+WEBP_QUALITY = 80
+MAX_ORIGINAL_BYTES = 20 * 1024 * 1024
+
+
+class ImageUpstreamError(Exception):
+    """無法取得或解讀原始圖片"""
+
+
+class HttpUpstream:
+    """從原始網址下載圖片（正式環境）"""
+
+    def __init__(self, timeout: float = IMAGE_FETCH_TIMEOUT):
+        self._client = httpx.AsyncClient(timeout=timeout, follow_redirects=True)
+
+    async def fetch(self, url: str) -> bytes:
+        """串流下載，超過 MAX_ORIGINAL_BYTES 立即中止，不會先把整個回應讀進記憶體"""
+        try:
+            async with self._client.stream("GET", url) as r:
+                r.raise_for_status()
+                length = r.headers.get("Content-Length")
+                if length and length.isdigit() and int(length) > MAX_ORIGINAL_BYTES:
+                    raise ImageUpstreamError("原始圖片過大")
+                chunks, total = [], 0
+                async for chunk in r.aiter_bytes():
+                    total += len(chunk)
+                    if total > MAX_ORIGINAL_BYTES:
+                        raise ImageUpstreamError("原始圖片過大")
+                    chunks.append(chunk)
+        except (httpx.HTTPError, httpx.StreamError, httpx.InvalidURL) as e:
+            # HTTPError 涵蓋逾時、連線失敗、非 2xx 與內容解壓縮失敗（DecodingError）；
+            # StreamError 與 InvalidURL 不是 HTTPError 的子類別，需另外列出，才不會變成 500
+            raise ImageUpstreamError(f"下載圖片失敗：{e!r}") from e
+        return b"".join(chunks)
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+class FixtureUpstream:
+    """以本機目錄取代遠端來源（測試與離線開發用）：依網址的檔名讀取目錄中的同名檔案"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    async def fetch(self, url: str) -> bytes:
+        path = os.path.join(self.directory, os.path.basename(urlsplit(url).path))
+        try:
+            return await run_in_threadpool(_read_file, path)
+        except OSError as e:
+            raise ImageUpstreamError(f"找不到測試圖片：{path}") from e
+
+    async def aclose(self):
+        pass
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class DiskLRUCache:
+    """
+    以檔案存放縮圖的 LRU 快取，總大小超過 max_bytes 時刪除最久未使用的檔案。
+    使用紀錄只存在本行程記憶體中，建立時依檔案修改時間重建（會走訪整個目錄，需在工作執行緒中建立）；
+    多個 worker 共用目錄時，被其他 worker 淘汰的檔案僅視為未命中。
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # key -> 檔案大小
+        self._total = 0
+        os.makedirs(directory, exist_ok=True)
+        found = []
+        for dirpath, _, filenames in os.walk(directory):
+            for name in filenames:
+                if name.endswith(".webp"):
+                    st = os.stat(os.path.join(dirpath, name))
+                    found.append((st.st_mtime, name[:-len(".webp")], st.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total += size
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".webp")
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            data = _read_file(self._path(key))
+        except OSError:
+            with self._lock:
+                self._total -= self._entries.pop(key, 0)
+            return None
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+        return data
+
+    def put(self, key: str, data: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self._total += len(data) - self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            evicted = []
+            while self._total > self.max_bytes and len(self._entries) > 1:
+                old, size = self._entries.popitem(last=False)
+                self._total -= size
+                evicted.append(old)
+        for old in evicted:
+            try:
+                os.remove(self._path(old))
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        return {"files": len(self._entries), "bytes": self._total, "max_bytes": self.max_bytes}
+
+
+def cache_key(url: str, size: str) -> str:
+    return hashlib.sha1(f"{size}|{url}".encode("utf-8")).hexdigest()
+
+
+def render_variants(original: bytes) -> Dict[str, bytes]:
+    """一次解碼原圖，產生所有 IMAGE_SIZES 尺寸的 WebP"""
+    try:
+        img = Image.open(io.BytesIO(original))
+        largest = max(IMAGE_SIZES.values())
+        img.draft("RGB", (largest[0] * 2, largest[1] * 2))
+        img = ImageOps.exif_transpose(img)
+        img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise ImageUpstreamError(f"無法解讀圖片：{e}") from e
+    variants = {}
+    for name, size in IMAGE_SIZES.items():
+        out = io.BytesIO()
+        ImageOps.fit(img, size, Image.LANCZOS).save(out, "WEBP", quality=WEBP_QUALITY, method=4)
+        variants[name] = out.getvalue()
+    return variants
+
+
+class ImageProxy:
+    """縮圖來源：先查磁碟快取，未命中時抓取原圖一次並產生所有尺寸；同一張圖的並行請求共用同一次產生"""
+
+    def __init__(self, upstream, cache: DiskLRUCache):
+        self.upstream = upstream
+        self.cache = cache
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def get(self, url: str, size: str) -> bytes:
+        data = await run_in_threadpool(self.cache.get, cache_key(url, size))
+        if data is not None:
+            return data
+        pending = self._inflight.get(url)
+        if pending is None:
+            pending = self._inflight[url] = asyncio.ensure_future(self._generate(url))
+            pending.add_done_callback(lambda _: self._inflight.pop(url, None))
+        return (await asyncio.shield(pending))[size]
+
+    async def _generate(self, url: str) -> Dict[str, bytes]:
+        original = await self.upstream.fetch(url)
+        variants = await run_in_threadpool(render_variants, original)
+        for size, data in variants.items():
+            await run_in_threadpool(self.cache.put, cache_key(url, size), data)
+        logging.info("Generated %d thumbnails for %s", len(variants), url)
+        return variants
+
+    async def aclose(self):
+        await self.upstream.aclose()
+
+
+_proxy: Optional[ImageProxy] = None
+
+
+def _create_image_proxy() -> ImageProxy:
+    upstream = FixtureUpstream(IMAGE_UPSTREAM_DIR) if IMAGE_UPSTREAM_DIR else HttpUpstream()
+    return ImageProxy(upstream, DiskLRUCache(IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_MB * 1024 * 1024))
+
+
+async def get_image_proxy() -> ImageProxy:
+    """
+    取得縮圖來源；IMAGE_PROXY 開啟時於啟動時先建立。
+    磁碟快取建立時會走訪整個快取目錄，因此在工作執行緒中建立，不阻塞事件迴圈。
+    """
+    global _proxy
+    if _proxy is None:
+        proxy = await run_in_threadpool(_create_image_proxy)
+        if _proxy is None:
+            _proxy = proxy
+        else:
+            # 並行的第一批請求各自建立了一份，只保留先完成的那份
+            await proxy.aclose()
+    return _proxy
+
+
+async def close_image_proxy():
+    global _proxy
+    proxy, _proxy = _proxy, None
+    if proxy is not None:
+        await proxy.aclose()
+
+
+def image_url(attraction_id: int, original: Optional[str], index: int = 0, size: str = "thumb") -> Optional[str]:
+    """API 回應中的圖片網址：啟用 IMAGE_PROXY 時改指向本站縮圖，否則沿用原始網址"""
+    if not original or not IMAGE_PROXY:
+        return original
+    return f"/api/image/{attraction_id}/{index}/{size}"
@@ -0,0 +1,72 @@
+import os
+import gzip
+import hashlib
+import logging
+import threading
+from typing import Dict, Iterable, Tuple
+
+from fastapi import Request, Response
+from app.utils.http_cache import acceptable_encodings, etag_matches
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+PAGE_CACHE_CONTROL = "no-cache"
+
+
+class Page:
+    """單一 HTML 頁面的記憶體副本：原始內容與各壓縮版本，每個版本各有自己的強 ETag"""
+    __slots__ = ("mtime", "variants")
+
+    def __init__(self, content: bytes, mtime: float):
+        self.mtime = mtime
+        digest = hashlib.sha256(content).hexdigest()[:20]
+        variants: Dict[str, Tuple[bytes, str]] = {"identity": (content, f'"{digest}"')}
+        if brotli is not None:
+            variants["br"] = (brotli.compress(content, quality=11), f'"{digest}-br"')
+        variants["gzip"] = (gzip.compress(content, compresslevel=9, mtime=0), f'"{digest}-gz"')
+        self.variants = variants
+
+
+class PageCache:
+    """
+    頁面路由用的 HTML 快取：啟動時一次讀入並預先壓縮，之後不再碰磁碟。
+    hot_reload 開啟時（開發用）每次請求檢查檔案修改時間，有變動才重新載入。
+    """
+
+    def __init__(self, directory: str, names: Iterable[str], hot_reload: bool = False):
+        self.directory = directory
+        self.hot_reload = hot_reload
+        self._lock = threading.Lock()
+        self._pages: Dict[str, Page] = {name: self._load(name) for name in names}
+        logging.info("Loaded %d pages from %s (hot_reload=%s)", len(self._pages), directory, hot_reload)
+
+    def _load(self, name: str) -> Page:
+        path = os.path.join(self.directory, name)
+        with open(path, "rb") as f:
+            content = f.read()
+        return Page(content, os.path.getmtime(path))
+
+    def get(self, name: str) -> Page:
+        page = self._pages[name]
+        if self.hot_reload:
+            mtime = os.path.getmtime(os.path.join(self.directory, name))
+            if mtime != page.mtime:
+                with self._lock:
+                    page = self._pages[name] = self._load(name)
+                logging.info("Reloaded page %s", name)
+        return page
+
+    def response(self, name: str, request: Request) -> Response:
+        page = self.get(name)
+        accept = request.headers.get("accept-encoding", "")
+        coding = next(iter(acceptable_encodings(accept, [c for c in page.variants if c != "identity"])), "identity")
+        body, etag = page.variants[coding]
+        headers = {"ETag": etag, "Cache-Control": PAGE_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+        if coding != "identity":
+            headers["Content-Encoding"] = coding
+        return Response(content=body, media_type="text/html", headers=headers)
@@ -0,0 +1,91 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional
+
+from app.core.config import PAYMENT_WORKERS, PAYMENT_QUEUE_SIZE, TAPPAY_READ_TIMEOUT
+
+
+class PaymentQueueFull(Exception):
+    """付款佇列已滿，暫時無法受理新的結帳"""
+
+
+class PaymentQueue:
+    """
+    有上限的付款工作佇列：固定 workers 個協程依序取出工作執行（呼叫 TapPay 並寫回結果），
+    排隊數達 maxsize 時 submit 直接拒絕，尖峰時不會無限累積等待中的請求。
+    工作與提交它的請求彼此獨立，請求中斷（例如使用者關閉頁面）不會取消進行中的付款。
+    """
+
+    def __init__(self, workers: int = PAYMENT_WORKERS, maxsize: int = PAYMENT_QUEUE_SIZE):
+        self.workers = max(1, workers)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, maxsize))
+        self._tasks: List[asyncio.Task] = []
+
+    def _start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def full(self) -> bool:
+        return self._queue.full()
+
+    def submit(self, fn: Callable[..., Awaitable], *args) -> asyncio.Future:
+        """排入一件工作，回傳完成時帶有結果（或例外）的 Future"""
+        self._start()
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((fn, args, future))
+        except asyncio.QueueFull:
+            raise PaymentQueueFull("付款處理繁忙，請稍後再試") from None
+        return future
+
+    async def _worker(self):
+        while True:
+            fn, args, future = await self._queue.get()
+            try:
+                result = await fn(*args)
+            except Exception as e:
+                if future.done():
+                    logging.error("付款工作失敗：%s", e)
+                else:
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                self._queue.task_done()
+
+    def stats(self) -> dict:
+        return {"workers": len(self._tasks), "queued": self._queue.qsize(), "maxsize": self._queue.maxsize}
+
+    async def close(self, timeout: float = TAPPAY_READ_TIMEOUT):
+        """等待已排入的付款完成（至多 timeout 秒）後停止 worker"""
+        if self._tasks:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logging.warning("關閉時仍有 %d 筆付款未完成，訂單維持處理中狀態（status=2），需人工對帳", self._queue.qsize())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+_queue: Optional[PaymentQueue] = None
+
+
+def get_payment_queue() -> PaymentQueue:
+    global _queue
+    if _queue is None:
+        _queue = PaymentQueue()
+    return _queue
+
+
+def payment_queue_stats() -> dict:
+    return _queue.stats() if _queue is not None else {}
+
+
+async def close_payment_queue():
+    global _queue
+    queue, _queue = _queue, None
+    if queue is not None:
+        await queue.close()
@@ -1,5 +1,22 @@
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from typing import Dict, Optional
+
 import bcrypt, jwt
-from app.core.config import JWT_SECRET, JWT_ALGORITHM
+from app.core.config import (
+    JWT_SECRET, JWT_ALGORITHM, JWT_CACHE_SIZE,
+    PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE,
+)
+
+# 登入/註冊發出的 token 有效期限；撤銷整個使用者時以此推算 token 的簽發時間
+JWT_TTL = timedelta(days=7)
 
 def hash_password(plain: str) -> str:
     return bcrypt.hashpw(plain.encode(), bcrypt.gensalt()).decode()
@@ -12,3 +29,192 @@ def create_jwt(payload: dict) -> str:
 
 def decode_jwt(token: str) -> dict:
     return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+
+
+class TokenCache:
+    """
+    已驗證 JWT payload 的 LRU 快取，以 token 的 SHA-256 摘要為鍵（不保存原始 token）。
+    每筆在 token 的 exp 時間到期，超過 maxsize 時淘汰最久未使用者。
+    另外維護撤銷清單，保留到被撤銷的 token 到期為止；清單只存在本行程記憶體中，
+    多個 worker 時需在每個 worker 各自撤銷（或改用共用儲存）。
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()  # digest -> (exp, payload)
+        self._revoked: Dict[bytes, float] = {}  # digest -> exp
+        self._revoked_users: Dict[int, float] = {}  # user id -> 撤銷前簽發的 token 最晚的 exp
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= time.time():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return dict(entry[1])
+
+    def put(self, token: str, payload: dict):
+        exp = payload.get("exp")
+        if self.maxsize <= 0 or not isinstance(exp, (int, float)):
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (exp, dict(payload))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def revoke(self, token: str, exp: float):
+        """撤銷單一 token（例如登出），在 exp 之前 is_revoked 都會回傳 True"""
+        key = self._key(token)
+        with self._lock:
+            self._prune_revoked()
+            self._entries.pop(key, None)
+            if exp > time.time():
+                self._revoked[key] = exp
+
+    def revoke_user(self, user_id: int):
+        """撤銷某位使用者目前為止簽發的所有 token（例如變更密碼或停權時），之後新簽發的不受影響"""
+        cutoff = time.time() + JWT_TTL.total_seconds()
+        with self._lock:
+            self._prune_revoked()
+            self._revoked_users[user_id] = cutoff
+            for key in [k for k, (_, p) in self._entries.items() if p.get("id") == user_id]:
+                del self._entries[key]
+
+    def is_revoked(self, token: str, payload: dict) -> bool:
+        with self._lock:
+            if not self._revoked and not self._revoked_users:
+                return False
+            if self._key(token) in self._revoked:
+                return True
+            cutoff = self._revoked_users.get(payload.get("id"))
+        # 所有 token 的有效期限都是 JWT_TTL，exp 不晚於 cutoff 代表是在撤銷前簽發的
+        return cutoff is not None and payload.get("exp", 0) <= cutoff
+
+    def _prune_revoked(self):
+        """移除已過期的撤銷紀錄（呼叫端需持有鎖）"""
+        now = time.time()
+        for key in [k for k, exp in self._revoked.items() if exp <= now]:
+            del self._revoked[key]
+        for user_id in [u for u, cutoff in self._revoked_users.items() if cutoff <= now]:
+            del self._revoked_users[user_id]
+
+    def clear(self):
+        """清空快取（撤銷清單保留，清空快取不會讓已撤銷的 token 重新生效）"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+token_cache = TokenCache(JWT_CACHE_SIZE)
+
+
+def decode_jwt_cached(token: str) -> dict:
+    """先查快取，沒有才做完整的簽章驗證；驗證失敗或 token 已被撤銷時拋出 PyJWTError"""
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = decode_jwt(token)
+        token_cache.put(token, payload)
+    # 命中快取時也要檢查：撤銷可能發生在其他請求驗證完、放入快取之前
+    if token_cache.is_revoked(token, payload):
+        raise jwt.InvalidTokenError("Token 已被撤銷")
+    return payload
+
+
+class HashQueueFull(Exception):
+    """等待中的密碼雜湊已達 PASSWORD_HASH_MAX_QUEUE，直接拒絕而不排隊"""
+
+
+# bcrypt 交給獨立的行程池，可用滿多核心且不與請求處理搶 GIL；
+# 以 spawn 建立子行程，避免在已有多個執行緒的伺服器行程中 fork
+_executor: Optional[ProcessPoolExecutor] = None
+_stats = {
+    "pending": 0,
+    "completed_total": 0,
+    "errors_total": 0,
+    "rejected_total": 0,
+    "seconds_total": 0.0,
+    "seconds_max": 0.0,
+}
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=PASSWORD_HASH_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+async def _run_hash(fn, *args):
+    if _stats["pending"] >= PASSWORD_HASH_MAX_QUEUE:
+        _stats["rejected_total"] += 1
+        raise HashQueueFull("登入/註冊人數過多，請稍後再試")
+    _stats["pending"] += 1
+    start = time.monotonic()
+    try:
+        result = await asyncio.get_running_loop().run_in_executor(_get_executor(), fn, *args)
+        _stats["completed_total"] += 1
+        return result
+    except BaseException:
+        # 雜湊拋出例外、worker 行程異常或請求被取消
+        _stats["errors_total"] += 1
+        raise
+    finally:
+        elapsed = time.monotonic() - start
+        _stats["pending"] -= 1
+        _stats["seconds_total"] += elapsed
+        _stats["seconds_max"] = max(_stats["seconds_max"], elapsed)
+
+
+async def hash_password_async(plain: str) -> str:
+    return await _run_hash(hash_password, plain)
+
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    return await _run_hash(verify_password, plain, hashed)
+
+
+def warm_hash_pool():
+    """
+    啟動時先建立所有 worker 行程，避免第一批登入請求承擔行程啟動時間。
+    預熱失敗只記錄警告並捨棄行程池，第一次雜湊時再重新建立，不會中止啟動。
+    """
+    try:
+        executor = _get_executor()
+        for future in [executor.submit(bcrypt.gensalt, 4) for _ in range(PASSWORD_HASH_WORKERS)]:
+            future.result()
+    except Exception as e:
+        logging.warning("密碼雜湊行程池預熱失敗，改為第一次使用時建立：%s", e)
+        shutdown_hash_pool()
+
+
+def hash_stats() -> dict:
+    """佇列長度（含執行中）與雜湊耗時（從送出到完成，含排隊時間）"""
+    return {"workers": PASSWORD_HASH_WORKERS, "max_queue": PASSWORD_HASH_MAX_QUEUE, **_stats}
+
+
+def shutdown_hash_pool():
+    global _executor
+    executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,47 @@
+import re
+import stat
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import Response, guess_type
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+from app.utils.http_cache import acceptable_encodings
+
+ENCODING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+HASHED_FILE = re.compile(r"\.[0-9a-f]{10}\.[A-Za-z0-9]+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    提供 app/scripts/build_static.py 的輸出：依 Accept-Encoding 回傳預先壓縮的 .br/.gz 版本，
+    內容雜湊檔名的檔案標記為 immutable 長期快取，其餘檔案每次以 ETag 重新驗證。
+    """
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = None
+        if scope["method"] in ("GET", "HEAD"):
+            accept = Headers(scope=scope).get("accept-encoding", "")
+            for coding in acceptable_encodings(accept, ENCODING_SUFFIXES):
+                full_path, stat_result = await anyio.to_thread.run_sync(
+                    self.lookup_path, path + ENCODING_SUFFIXES[coding]
+                )
+                if stat_result and stat.S_ISREG(stat_result.st_mode):
+                    response = self.file_response(full_path, stat_result, scope)
+                    response.headers["Content-Encoding"] = coding
+                    response.headers["Content-Type"] = _content_type(path)
+                    break
+        if response is None:
+            response = await super().get_response(path, scope)
+        response.headers["Vary"] = "Accept-Encoding"
+        response.headers["Cache-Control"] = IMMUTABLE if HASHED_FILE.search(path) else "no-cache"
+        return response
+
+
+def _content_type(path: str) -> str:
+    media_type = guess_type(path)[0] or "application/octet-stream"
+    if media_type.startswith("text/") or media_type.endswith("javascript"):
+        media_type += "; charset=utf-8"
+    return media_type
@@ -0,0 +1,104 @@
+import time
+import random
+import asyncio
+import logging
+from typing import Optional
+
+import httpx
+from app.core.config import (
+    TAPPAY_PARTNER_KEY, TAPPAY_ENDPOINT,
+    TAPPAY_CONNECT_TIMEOUT, TAPPAY_READ_TIMEOUT,
+    TAPPAY_MAX_CONNECTIONS, TAPPAY_MAX_CONCURRENCY, TAPPAY_MAX_RETRIES, METRICS,
+)
+from app.core.metrics import TAPPAY_DURATION, TAPPAY_ERRORS, TAPPAY_RESULTS
+
+# 只重試「請求確定沒有送達 TapPay」的錯誤；讀取逾時等情況可能已扣款，重試會造成重複刷卡
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class TapPayError(Exception):
+    """呼叫 TapPay 失敗（連線錯誤、逾時或回應格式不正確）"""
+
+
+class TapPayConnectError(TapPayError):
+    """請求確定沒有送達 TapPay（連線失敗且重試用盡），可視為未扣款；其餘 TapPayError 無法確定是否已扣款"""
+
+
+class TapPayClient:
+    """
+    TapPay pay-by-prime 非同步用戶端：共用 keep-alive 連線、連線/讀取皆有逾時、
+    以 semaphore 限制同時進行的付款數量，連線失敗時以指數退避重試。
+    """
+
+    def __init__(self, endpoint: str = TAPPAY_ENDPOINT, partner_key: str = TAPPAY_PARTNER_KEY,
+                 connect_timeout: float = TAPPAY_CONNECT_TIMEOUT, read_timeout: float = TAPPAY_READ_TIMEOUT,
+                 max_connections: int = TAPPAY_MAX_CONNECTIONS, max_concurrency: int = TAPPAY_MAX_CONCURRENCY,
+                 max_retries: int = TAPPAY_MAX_RETRIES, backoff: float = 0.2,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.endpoint = endpoint
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = httpx.AsyncClient(
+            headers={"Content-Type": "application/json", "x-api-key": partner_key},
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            transport=transport,
+        )
+
+    async def pay_by_prime(self, payload: dict) -> dict:
+        async with self._semaphore:
+            attempt = 0
+            while True:
+                start = time.monotonic()
+                try:
+                    r = await self._client.post(self.endpoint, json=payload)
+                    result = r.json()
+                    if METRICS:
+                        TAPPAY_RESULTS.inc("success" if result.get("status") == 0 else "declined")
+                    return result
+                except RETRYABLE_ERRORS as e:
+                    if METRICS:
+                        TAPPAY_ERRORS.inc("connect")
+                    if attempt >= self.max_retries:
+                        raise TapPayConnectError(f"無法連線至 TapPay：{e!r}") from e
+                    delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+                    attempt += 1
+                    logging.warning("TapPay 連線失敗（%s），%.2f 秒後第 %d 次重試", e, delay, attempt)
+                    await asyncio.sleep(delay)
+                except httpx.HTTPError as e:
+                    if METRICS:
+                        TAPPAY_ERRORS.inc("http")
+                    raise TapPayError(f"TapPay 呼叫失敗：{e!r}") from e
+                except ValueError as e:
+                    if METRICS:
+                        TAPPAY_ERRORS.inc("invalid_response")
+                    raise TapPayError("TapPay 回應不是合法的 JSON") from e
+                finally:
+                    elapsed = time.monotonic() - start
+                    if METRICS:
+                        TAPPAY_DURATION.observe(elapsed)
+                    logging.debug("TapPay call took %.3fs", elapsed)
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+_client: Optional[TapPayClient] = None
+
+
+def get_tappay_client() -> TapPayClient:
+    global _client
+    if _client is None:
+        _client = TapPayClient()
+    return _client
+
+
+async def close_tappay_client():
+    global _client
+    client, _client = _client, None
+    if client is not None:
+        await client.aclose()
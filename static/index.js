@@ -9,7 +9,7 @@ document.addEventListener("DOMContentLoaded", () => {
     const mrtListContainer = document.querySelector(".list");
 
     let observer;
-    let nextPage = 0;
+    let nextPage = "";
     let isLoading = false;
 
     // --------------------- Pop-up 訊息顯示工具 ---------------------
@@ -278,7 +278,7 @@ document.addEventListener("DOMContentLoaded", () => {
     });
 
     function searchAttractions(keyword, isMRTSearch = false) {
-        nextPage = 0;
+        nextPage = "";
         gridContainer.innerHTML = '';
         loadAttractions(keyword, isMRTSearch);
     }
@@ -287,7 +287,7 @@ document.addEventListener("DOMContentLoaded", () => {
         if (isLoading || nextPage === null) return;
         isLoading = true;
 
-        fetchData(`/api/attractions?page=${nextPage}&keyword=${keyword}`).then(data => {
+        fetchData(`/api/attractions?cursor=${encodeURIComponent(nextPage)}&keyword=${keyword}`).then(data => {
             if (!data.data || data.data.length === 0) {
                 isLoading = false;
                 return;
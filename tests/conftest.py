@@ -0,0 +1,11 @@
+import os
+import sys
+
+# app.core.config 在匯入時就讀取環境變數，缺少 TapPay 設定會直接中止；測試只需要假值
+os.environ.setdefault("JWT_SECRET", "test-secret")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+os.environ.setdefault("TAPPAY_PARTNER_KEY", "test-partner-key")
+os.environ.setdefault("TAPPAY_MERCHANT_ID", "test-merchant")
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "1")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,64 @@
+import pytest
+from sqlalchemy.dialects import mysql
+from sqlalchemy.exc import OperationalError
+
+from app.crud import booking
+
+
+class FakeResult:
+    rowcount = 1
+
+
+class FakeSession:
+    """依序丟出 errors 中的例外，之後的 execute 成功；記錄執行的陳述式與 commit/rollback 次數"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.statements = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def execute(self, stmt):
+        self.statements.append(str(stmt.compile(dialect=mysql.dialect())))
+        if self.errors:
+            raise self.errors.pop(0)
+        return FakeResult()
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+def _mysql_error(code):
+    return OperationalError("INSERT", {}, Exception(code, "error"))
+
+
+def test_upsert_booking_is_a_single_upsert_on_the_booking_slot():
+    db = FakeSession()
+    assert booking.upsert_booking(1, 2, "2025-01-01", "morning", 2000, db=db) == 1
+    assert len(db.statements) == 1 and db.commits == 1
+    sql = db.statements[0]
+    assert sql.startswith("INSERT INTO bookings") and "slot" in sql
+    assert "ON DUPLICATE KEY UPDATE date = VALUES(date), time = VALUES(time), price = VALUES(price)" in sql
+    assert "DELETE" not in sql
+
+
+def test_deadlock_is_retried():
+    db = FakeSession(_mysql_error(booking.MYSQL_DEADLOCK))
+    assert booking.upsert_booking(1, 2, "2025-01-01", "morning", 2000, db=db) == 1
+    assert len(db.statements) == 2
+    assert db.rollbacks == 1 and db.commits == 1
+
+
+def test_deadlock_retries_are_bounded_and_other_errors_are_not_retried():
+    db = FakeSession(*[_mysql_error(booking.MYSQL_DEADLOCK)] * booking.DEADLOCK_RETRIES)
+    with pytest.raises(OperationalError):
+        booking.add_cart_items(1, [{"attraction_id": 2, "date": "2025-01-01", "time": "morning", "price": 2000}], db=db)
+    assert len(db.statements) == booking.DEADLOCK_RETRIES
+
+    db = FakeSession(_mysql_error(2013))
+    with pytest.raises(OperationalError):
+        booking.upsert_booking(1, 2, "2025-01-01", "morning", 2000, db=db)
+    assert len(db.statements) == 1
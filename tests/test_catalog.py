@@ -0,0 +1,23 @@
+from app.crud import catalog as catalog_module
+from app.crud.attraction import data_version, entry_version
+from app.crud.catalog import Catalog
+
+
+def _record(i, name):
+    return {"id": i, "name": name, "category": "c", "description": "d", "address": "a",
+            "transport": "t", "mrt": "m", "lat": 25.0, "lng": 121.5, "images": []}
+
+
+def test_versions_only_come_from_the_in_memory_catalog(monkeypatch):
+    monkeypatch.setattr(catalog_module, "_catalog", None)
+    # 只有搜尋或座標索引時回應內容仍讀自資料庫，不能用快照的版本號作為 ETag
+    assert data_version() is None
+    assert entry_version(1) is None
+
+    before = Catalog([_record(1, "a"), _record(2, "b")])
+    after = Catalog([_record(1, "a"), _record(2, "changed")])
+    monkeypatch.setattr(catalog_module, "_catalog", before)
+    assert data_version() == before.version
+    assert entry_version(1) == after.entry_versions[1]
+    assert entry_version(2) != after.entry_versions[2]
+    assert before.version != after.version
@@ -0,0 +1,23 @@
+import pytest
+
+from app.crud.attraction import decode_cursor, encode_cursor
+
+
+def test_round_trip():
+    assert decode_cursor(encode_cursor(42)) == (42,)
+    assert decode_cursor(encode_cursor(-7, 13, kind="r"), kind="r") == (-7, 13)
+
+
+def test_empty_cursor_is_first_page():
+    assert decode_cursor("") == ()
+
+
+def test_cursor_is_url_safe_without_padding():
+    cursor = encode_cursor(123456789, kind="r")
+    assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+
+
+@pytest.mark.parametrize("cursor", ["!!!", "abc", encode_cursor(1, kind="r"), encode_cursor(kind="a")])
+def test_invalid_or_wrong_kind_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, kind="a")
@@ -0,0 +1,51 @@
+import math
+
+import numpy as np
+
+from app.crud.geo import GeoIndex, haversine, EARTH_RADIUS_M
+
+
+def _distance(a, b):
+    return float(haversine(math.radians(a[0]), math.radians(a[1]),
+                           np.radians([b[0]]), np.radians([b[1]]))[0])
+
+
+def test_nearby_orders_by_distance_and_respects_limit():
+    index = GeoIndex([
+        {"id": 1, "lat": 25.0330, "lng": 121.5654},
+        {"id": 2, "lat": 25.0340, "lng": 121.5654},
+        {"id": 3, "lat": 25.0478, "lng": 121.5170},
+        {"id": 4, "lat": 0, "lng": 0},  # 沒有座標的景點不列入
+    ])
+    assert len(index) == 3
+    result = index.nearby(25.0330, 121.5654, 1000, 10)
+    assert [i for i, _ in result] == [1, 2]
+    assert result[0][1] == 0
+    assert [i for i, _ in index.nearby(25.0330, 121.5654, 10000, 1)] == [1]
+
+
+def test_nearby_across_the_dateline():
+    east, west = (10.0, 179.999), (10.0, -179.999)
+    index = GeoIndex([{"id": 1, "lat": east[0], "lng": east[1]}, {"id": 2, "lat": west[0], "lng": west[1]}])
+    gap = _distance(east, west)
+    assert gap < 500
+    assert [i for i, _ in index.nearby(*east, 500, 10)] == [1, 2]
+    assert [i for i, _ in index.nearby(*west, 500, 10)] == [2, 1]
+
+
+def test_nearby_at_the_poles_covers_all_longitudes():
+    points = [(89.995, lng) for lng in (-170, -90, 1, 90, 170)]
+    index = GeoIndex([{"id": i, "lat": lat, "lng": lng} for i, (lat, lng) in enumerate(points, 1)])
+    # 北極點到所有點距離相同（約 556 公尺），不論經度都應找到
+    result = index.nearby(90.0, 0.0, 1000, 10)
+    assert sorted(i for i, _ in result) == [1, 2, 3, 4, 5]
+    expected = math.radians(90 - 89.995) * EARTH_RADIUS_M
+    assert all(abs(d - expected) < 1 for _, d in result)
+    # 緯度接近極區時，半徑換算的經度範圍會超過 180 度
+    assert {i for i, _ in index.nearby(89.995, 0.0, 1200, 10)} == {1, 2, 3, 4, 5}
+
+
+def test_empty_index():
+    index = GeoIndex([])
+    assert len(index) == 0
+    assert index.nearby(25.0, 121.5, 1000, 10) == []
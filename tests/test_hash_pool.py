@@ -0,0 +1,25 @@
+from concurrent.futures import Future
+
+from app.utils import security
+
+
+class BrokenExecutor:
+    def __init__(self):
+        self.shutdown_called = False
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_exception(OSError("cannot spawn"))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shutdown_called = True
+
+
+def test_warm_failure_is_logged_and_pool_recreated_lazily(monkeypatch, caplog):
+    broken = BrokenExecutor()
+    monkeypatch.setattr(security, "_executor", broken)
+    security.warm_hash_pool()
+    assert broken.shutdown_called
+    assert security._executor is None
+    assert "預熱失敗" in caplog.text
@@ -0,0 +1,47 @@
+import pytest
+from starlette.requests import Request
+
+from app.utils.http_cache import acceptable_encodings, etag_matches, make_etag
+
+
+def _request(if_none_match=None):
+    headers = [] if if_none_match is None else [(b"if-none-match", if_none_match.encode())]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+ETAG = make_etag(1, "keyword")
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False),
+    ("", False),
+    (ETAG, True),
+    (f"W/{ETAG}", True),
+    (f'"other", {ETAG}', True),
+    ('"other"', False),
+    ("*", True),
+    (ETAG[:-1], False),
+])
+def test_etag_matches(header, expected):
+    assert etag_matches(_request(header), ETAG) is expected
+
+
+def test_make_etag_depends_on_all_parts():
+    assert make_etag(1, "a") != make_etag(1, "b")
+    assert make_etag(1, None) == make_etag(1, "")
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br", ["br", "gzip"]),
+    ("gzip", ["gzip"]),
+    ("br;q=0, gzip;q=0.5", ["gzip"]),
+    ("GZIP", ["gzip"]),
+    ("*", ["br", "gzip"]),
+    ("*;q=0, gzip", ["gzip"]),
+    ("identity", []),
+    ("", []),
+    (None, []),
+    ("gzip;q=abc", []),
+])
+def test_acceptable_encodings(header, expected):
+    assert acceptable_encodings(header, ("br", "gzip")) == expected
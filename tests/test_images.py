@@ -0,0 +1,59 @@
+import asyncio
+import os
+
+import httpx
+import pytest
+
+from app.utils.images import DiskLRUCache, HttpUpstream, ImageUpstreamError
+
+
+def _upstream(handler):
+    upstream = HttpUpstream()
+    upstream._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return upstream
+
+
+def _raise(exc):
+    def handler(request):
+        raise exc(f"{exc.__name__}", request=request)
+    return handler
+
+
+@pytest.mark.parametrize("handler", [
+    lambda request: httpx.Response(404),
+    _raise(httpx.ConnectError),
+    _raise(httpx.ReadTimeout),
+    lambda request: httpx.Response(200, headers={"Content-Encoding": "gzip"}, content=b"not gzip"),
+])
+def test_fetch_errors_map_to_upstream_error(handler):
+    with pytest.raises(ImageUpstreamError):
+        asyncio.run(_upstream(handler).fetch("http://example.com/a.jpg"))
+
+
+def test_fetch_invalid_url_maps_to_upstream_error():
+    upstream = _upstream(lambda request: httpx.Response(200))
+    with pytest.raises(ImageUpstreamError):
+        asyncio.run(upstream.fetch("http://\x00/a.jpg"))
+
+
+def test_fetch_returns_body():
+    upstream = _upstream(lambda request: httpx.Response(200, content=b"image"))
+    assert asyncio.run(upstream.fetch("http://example.com/a.jpg")) == b"image"
+
+
+def test_disk_cache_evicts_lru_and_rebuilds_index(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=10)
+    cache.put("aa1", b"1234")
+    cache.put("bb2", b"5678")
+    assert cache.get("aa1") == b"1234"  # aa1 變成最近使用
+    cache.put("cc3", b"9012")
+    assert cache.get("bb2") is None
+    assert cache.stats() == {"files": 2, "bytes": 8, "max_bytes": 10}
+
+    os.utime(cache._path("aa1"), (1, 1))
+    rebuilt = DiskLRUCache(str(tmp_path), max_bytes=10)
+    assert rebuilt.stats()["bytes"] == 8
+    # 依修改時間重建使用紀錄：aa1 最舊，最先被淘汰
+    rebuilt.put("dd4", b"3456")
+    assert rebuilt.get("aa1") is None
+    assert rebuilt.get("cc3") == b"9012"
@@ -0,0 +1,87 @@
+import json
+
+from app.scripts import import_data
+from app.scripts.import_data import UPSERT_ATTRACTIONS_SQL, content_hash, diff_source, parse_item
+
+SOURCE = {"result": {"results": [
+    {"name": "士林夜市", "CAT": "購物", "description": "d", "address": "a", "direction": "t", "MRT": "劍潭",
+     "latitude": "25.08", "longitude": "121.52", "file": "https://x/a.jpg https://x/b.png"},
+    {"name": "陽明山", "CAT": "自然", "description": "d", "address": "a", "direction": "t", "MRT": None,
+     "latitude": "25.15", "longitude": "121.55", "file": "https://x/c.jpg"},
+]}}
+
+
+class FakeCursor:
+    """只記錄寫入的參數；查詢一律視為資料表已存在且沒有資料"""
+
+    def __init__(self, writes):
+        self.writes = writes
+        self.lastrowid = 1
+        self._last = None
+
+    def execute(self, sql, args=None):
+        self._last = sql
+        if "INSERT INTO attractions" in sql:
+            self.writes.append(args)
+
+    def executemany(self, sql, rows):
+        if sql == UPSERT_ATTRACTIONS_SQL:
+            self.writes.extend(rows)
+
+    def fetchone(self):
+        if "SHOW" in self._last:
+            return {"Field": "x"}
+        if "COUNT(*)" in self._last:
+            return {"count": 0}
+        return None
+
+    def fetchall(self):
+        return []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.writes = []
+
+    def cursor(self):
+        return FakeCursor(self.writes)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def _write_source(tmp_path):
+    path = tmp_path / "attractions.json"
+    path.write_text(json.dumps(SOURCE, ensure_ascii=False), encoding="utf-8")
+    return str(path)
+
+
+def _expected_hashes():
+    rows = [parse_item(item) for item in SOURCE["result"]["results"]]
+    return {row["name"]: content_hash(row) for row in rows}
+
+
+def test_full_imports_store_the_same_hash_as_delta(tmp_path, monkeypatch):
+    path = _write_source(tmp_path)
+    for importer in (import_data.import_data, import_data.import_data_batched):
+        connection = FakeConnection()
+        monkeypatch.setattr(import_data, "get_db_connection", lambda: connection)
+        importer(path)
+        assert {args[0]: args[-1] for args in connection.writes} == _expected_hashes()
+
+    # 完整匯入後緊接著做增量匯入，不應有任何需要更新的景點
+    existing = {name: (i, digest) for i, (name, digest) in enumerate(_expected_hashes().items(), 1)}
+    diff = diff_source(path, existing)
+    assert diff == {"insert": [], "update": [], "delete": []}
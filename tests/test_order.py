@@ -0,0 +1,128 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.api.deps import get_current_user
+from app.api.routers.order import router
+from app.crud import order
+from app.schemas.order import OrderRequest
+from app.utils.payment_queue import PaymentQueue
+from app.utils.tappay import TapPayConnectError, TapPayError
+
+BODY = {
+    "prime": "prime",
+    "order": {
+        "price": 2000,
+        "trip": {"attraction": {"id": 1, "name": "n", "address": "a", "image": "i"},
+                 "date": "2026-01-01", "time": "morning"},
+        "contact": {"name": "x", "email": "e@example.com", "phone": "0912"},
+    },
+}
+
+
+class FakeTapPay:
+    def __init__(self, outcome):
+        self.outcome = outcome
+
+    async def pay_by_prime(self, payload):
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return self.outcome
+
+
+@pytest.fixture
+def checkout(monkeypatch):
+    """以假的配號、訂單寫入與 TapPay 執行 create_order；statuses 記錄寫回的付款結果"""
+    state = {"statuses": [], "finalize_error": None, "insert_error": None}
+
+    async def generate_order_number():
+        return "20260101-0001"
+
+    async def insert_pending_order(order_no, user_id, body):
+        if state["insert_error"]:
+            raise state["insert_error"]
+
+    async def finalize_order(order_no, user_id, trip, status):
+        if state["finalize_error"]:
+            raise state["finalize_error"]
+        state["statuses"].append(status)
+
+    monkeypatch.setattr(order, "generate_order_number", generate_order_number)
+    monkeypatch.setattr(order, "insert_pending_order", insert_pending_order)
+    monkeypatch.setattr(order, "finalize_order", finalize_order)
+
+    def run(outcome, **overrides):
+        state.update(overrides)
+        monkeypatch.setattr(order, "get_tappay_client", lambda: FakeTapPay(outcome))
+
+        async def main():
+            queue = PaymentQueue(workers=1, maxsize=4)
+            monkeypatch.setattr(order, "get_payment_queue", lambda: queue)
+            try:
+                return await order.create_order(7, OrderRequest(**BODY), wait=True)
+            finally:
+                await queue.close()
+        return asyncio.run(main())
+
+    run.state = state
+    return run
+
+
+def test_paid_and_declined(checkout):
+    assert checkout({"status": 0}) == ("20260101-0001", {"status": 0})
+    assert checkout({"status": 10003})[1] == {"status": 10003}
+    assert checkout.state["statuses"] == [order.ORDER_PAID, order.ORDER_UNPAID]
+
+
+def test_ambiguous_tappay_error_returns_unknown(checkout):
+    assert checkout(TapPayError("read timeout")) == ("20260101-0001", {"unknown": True})
+    assert checkout.state["statuses"] == [order.ORDER_UNKNOWN]
+
+
+def test_connect_error_is_raised_and_marked_unpaid(checkout):
+    with pytest.raises(TapPayConnectError):
+        checkout(TapPayConnectError("refused"))
+    assert checkout.state["statuses"] == [order.ORDER_UNPAID]
+
+
+def test_finalize_failure_after_charge_returns_order_number(checkout):
+    # 已扣款但寫回結果失敗：回傳訂單編號讓前端前往結果頁，不能讓使用者以為失敗而重新付款
+    result = checkout({"status": 0}, finalize_error=RuntimeError("db down"))
+    assert result == ("20260101-0001", {"unknown": True})
+
+
+def _post_order(monkeypatch, create_order):
+    monkeypatch.setattr("app.api.routers.order.create_order", create_order)
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    app.dependency_overrides[get_current_user] = lambda: {"id": 7}
+
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/api/order", json=BODY)
+    return asyncio.run(main())
+
+
+@pytest.mark.parametrize("error, status", [
+    (TapPayConnectError("refused"), 502),
+    (RuntimeError("db down"), 500),
+])
+def test_endpoint_maps_errors_to_json(monkeypatch, error, status):
+    async def create_order(user_id, body):
+        raise error
+
+    r = _post_order(monkeypatch, create_order)
+    assert r.status_code == status
+    assert r.json()["error"] is True and r.json()["message"]
+
+
+def test_endpoint_returns_unknown_result_with_number(monkeypatch):
+    async def create_order(user_id, body):
+        return "20260101-0001", {"unknown": True}
+
+    r = _post_order(monkeypatch, create_order)
+    assert r.status_code == 200
+    assert r.json() == {"data": {"number": "20260101-0001", "payment": {"unknown": True}}}
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.crud import order_number
+from app.crud.order_number import OrderNumberAllocator
+
+DAY = "20250101"
+
+
+class FakeSequence:
+    """取代 reserve_sequence：以鎖保護的計數器模擬 order_sequences 的原子遞增，並記錄每次預留的區段"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seq = {}
+        self.blocks = []
+
+    async def __call__(self, day: str, count: int) -> int:
+        await asyncio.sleep(0)
+        with self._lock:
+            end = self._seq[day] = self._seq.get(day, 0) + count
+            self.blocks.append((end - count + 1, end))
+            return end
+
+
+def _seq(number: str) -> int:
+    day, seq = number.split("-")
+    assert day == DAY
+    return int(seq)
+
+
+def _block_of(seq: int, blocks):
+    return next(b for b in blocks if b[0] <= seq <= b[1])
+
+
+@pytest.mark.parametrize("block_size", [1, 5, 32])
+def test_allocate_from_threads_is_unique_and_monotonic_per_block(monkeypatch, block_size):
+    fake = FakeSequence()
+    monkeypatch.setattr(order_number, "reserve_sequence", fake)
+    allocator = OrderNumberAllocator(block_size)
+
+    def worker(n):
+        async def run():
+            return [_seq(await allocator.allocate(DAY)) for _ in range(n)]
+        return asyncio.run(run())
+
+    threads, per_thread = 8, 200
+    with ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(worker, [per_thread] * threads))
+
+    allocated = [seq for seqs in results for seq in seqs]
+    assert len(allocated) == threads * per_thread
+    assert len(set(allocated)) == len(allocated)
+    # 每個號碼都來自某次預留的區段，且同一執行緒從同一區段取得的號碼嚴格遞增
+    for seqs in results:
+        last = {}
+        for seq in seqs:
+            block = _block_of(seq, fake.blocks)
+            assert seq > last.get(block, 0)
+            last[block] = seq
+    if block_size == 1:
+        assert sorted(allocated) == list(range(1, threads * per_thread + 1))
+
+
+def test_allocate_formats_and_restarts_block_on_new_day(monkeypatch):
+    fake = FakeSequence()
+    monkeypatch.setattr(order_number, "reserve_sequence", fake)
+    allocator = OrderNumberAllocator(3)
+
+    async def run():
+        first = [await allocator.allocate(DAY) for _ in range(2)]
+        return first, await allocator.allocate("20250102")
+
+    first, next_day = asyncio.run(run())
+    assert first == [f"{DAY}-0001", f"{DAY}-0002"]
+    # 換日後不沿用前一天剩下的號碼，而是從新的一天重新預留
+    assert next_day == "20250102-0001"
+    assert fake.blocks == [(1, 3), (1, 3)]
@@ -0,0 +1,101 @@
+import threading
+
+import pytest
+
+from app.db import session
+from app.db.session import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self, n):
+        self.n = n
+        self.open = True
+        self.pings = 0
+
+    def rollback(self):
+        pass
+
+    def ping(self, reconnect=False):
+        self.pings += 1
+        if not self.open:
+            raise RuntimeError("gone")
+
+    def close(self):
+        self.open = False
+
+
+class Connector:
+    def __init__(self):
+        self.made = []
+
+    def __call__(self):
+        conn = FakeConnection(len(self.made) + 1)
+        self.made.append(conn)
+        return conn
+
+
+def test_overflow_connections_are_closed_on_release():
+    connect = Connector()
+    pool = ConnectionPool(size=1, max_overflow=1, timeout=0.05, connect=connect)
+    a, b = pool.acquire(), pool.acquire()
+    assert pool.stats()["overflow"] == 1
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    assert pool.stats()["timeouts_total"] == 1
+    b.close()
+    a.close()
+    stats = pool.stats()
+    # 超過常駐數量的那條連線歸還時直接關閉
+    assert stats["open"] == 1 and stats["idle"] == 1
+    assert sum(not c.open for c in connect.made) == 1
+
+
+def test_waiter_gets_released_connection():
+    pool = ConnectionPool(size=1, max_overflow=0, timeout=2, connect=Connector())
+    held = pool.acquire()
+    raw = held._raw
+    got = []
+    t = threading.Thread(target=lambda: got.append(pool.acquire()))
+    t.start()
+    held.close()
+    t.join(2)
+    assert got and got[0]._raw is raw
+
+
+def test_returned_connection_cannot_be_used():
+    pool = ConnectionPool(size=1, max_overflow=0, timeout=1, connect=Connector())
+    conn = pool.acquire()
+    conn.close()
+    with pytest.raises(Exception):
+        conn.cursor()
+
+
+def test_recycle_and_ping(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(session.time, "monotonic", lambda: now[0])
+    connect = Connector()
+    pool = ConnectionPool(size=1, max_overflow=0, timeout=1, recycle=100, ping_interval=10, connect=connect)
+
+    pool.acquire().close()
+    now[0] += 5
+    conn = pool.acquire()  # 剛歸還的連線直接重用，不 ping
+    assert conn._raw is connect.made[0] and connect.made[0].pings == 0
+    conn.close()
+
+    now[0] += 20
+    conn = pool.acquire()  # 閒置超過 ping_interval：先 ping
+    assert conn._raw is connect.made[0] and connect.made[0].pings == 1
+    conn.close()
+
+    now[0] += 20
+    connect.made[0].open = False  # 閒置期間被伺服器斷線
+    conn = pool.acquire()  # ping 失敗：換新連線
+    assert conn._raw is connect.made[1]
+    conn.close()
+
+    now[0] += 200
+    conn = pool.acquire()  # 存活超過 recycle：汰換
+    assert conn._raw is connect.made[2]
+    assert not connect.made[1].open
+    conn.close()
+    assert pool.stats()["open"] == 1
@@ -0,0 +1,52 @@
+from app.crud.search import SearchIndex, normalize
+
+RECORDS = [
+    {"id": 1, "name": "士林夜市", "mrt": "劍潭", "category": "購物", "description": "夜市小吃"},
+    {"id": 2, "name": "北投溫泉博物館", "mrt": "新北投", "category": "藝文館所", "description": ""},
+    {"id": 3, "name": "新北投溫泉區", "mrt": "新北投", "category": "養生溫泉", "description": ""},
+    {"id": 4, "name": "陽明山", "mrt": None, "category": "自然風景", "description": "溫泉與花季"},
+    {"id": 5, "name": "ＴＡＩＰＥＩ 101", "mrt": "台北101/世貿", "category": "購物", "description": ""},
+]
+
+
+def test_normalize_folds_width_case_and_spaces():
+    assert normalize("ＴＡＩＰＥＩ 101") == "taipei101"
+    assert normalize(None) == ""
+
+
+def test_search_ranks_by_field_weight_then_id():
+    index = SearchIndex(RECORDS)
+    # 名稱以「新北投」開頭 > 名稱包含 + 捷運站完全相符 > 只有捷運站相符
+    assert [i for _, i in index.search("新北投")] == [3, 2]
+    assert [i for _, i in index.search("溫泉")] == [3, 2]  # 名稱與分類都包含
+    assert index.search("taipei 101") == index.search("ＴＡＩＰＥＩ１０１")
+    assert index.search("不存在") == ()
+    assert index.search("  ") == ()
+
+
+def test_description_is_only_indexed_when_requested():
+    assert [i for _, i in SearchIndex(RECORDS).search("花季")] == []
+    assert [i for _, i in SearchIndex(RECORDS, include_description=True).search("花季")] == [4]
+
+
+def test_page_and_negative_offset():
+    index = SearchIndex(RECORDS)
+    assert index.page("購物", 0, 1) == ([1], True)
+    assert index.page("購物", 1, 1) == ([5], False)
+    assert index.page("購物", 2, 1) == ([], False)
+    assert index.page("購物", -1, 1) == ([], False)
+
+
+def test_page_after_walks_all_results_without_gaps():
+    records = [{"id": i, "name": f"公園{i}", "mrt": "公館" if i % 3 == 0 else None, "category": "公園"}
+               for i in range(1, 30)]
+    index = SearchIndex(records)
+    expected = [i for _, i in index.search("公")]
+    seen, after = [], None
+    while True:
+        ids, after = index.page_after("公", after, 4)
+        seen.extend(ids)
+        if after is None:
+            break
+    assert seen == expected
+    assert len(seen) == 29
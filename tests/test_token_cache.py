@@ -0,0 +1,87 @@
+import time
+
+import jwt
+import pytest
+
+from app.utils import security
+from app.utils.security import TokenCache
+
+
+def test_get_returns_copy_until_exp():
+    cache = TokenCache(10)
+    cache.put("t", {"id": 1, "exp": time.time() + 60})
+    payload = cache.get("t")
+    assert payload["id"] == 1
+    payload["id"] = 2
+    assert cache.get("t")["id"] == 1
+    assert cache.stats()["hits"] == 2
+
+
+def test_expired_entry_is_a_miss_and_evicted():
+    cache = TokenCache(10)
+    cache.put("t", {"id": 1, "exp": time.time() - 1})
+    assert cache.get("t") is None
+    assert cache.stats()["size"] == 0
+    assert cache.stats()["misses"] == 1
+
+
+def test_lru_evicts_least_recently_used():
+    cache = TokenCache(2)
+    exp = time.time() + 60
+    cache.put("a", {"id": 1, "exp": exp})
+    cache.put("b", {"id": 2, "exp": exp})
+    assert cache.get("a") is not None  # a 變成最近使用
+    cache.put("c", {"id": 3, "exp": exp})
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+def test_payload_without_exp_or_disabled_cache_is_not_stored():
+    cache = TokenCache(10)
+    cache.put("t", {"id": 1})
+    assert cache.get("t") is None
+    disabled = TokenCache(0)
+    disabled.put("t", {"id": 1, "exp": time.time() + 60})
+    assert disabled.get("t") is None
+
+
+def test_revoked_token_is_rejected_until_exp(monkeypatch):
+    cache = TokenCache(10)
+    monkeypatch.setattr(security, "token_cache", cache)
+    token = security.create_jwt({"id": 1, "exp": int(time.time()) + 60})
+    assert security.decode_jwt_cached(token)["id"] == 1
+    cache.revoke(token, time.time() + 60)
+    with pytest.raises(jwt.PyJWTError):
+        security.decode_jwt_cached(token)
+    cache.clear()
+    with pytest.raises(jwt.PyJWTError):
+        security.decode_jwt_cached(token)
+
+
+def test_revoke_user_rejects_earlier_tokens_only(monkeypatch):
+    cache = TokenCache(10)
+    monkeypatch.setattr(security, "token_cache", cache)
+    now = time.time()
+    old = security.create_jwt({"id": 1, "exp": int(now + security.JWT_TTL.total_seconds()) - 5})
+    other = security.create_jwt({"id": 2, "exp": int(now) + 60})
+    security.decode_jwt_cached(old)
+    cache.revoke_user(1)
+    with pytest.raises(jwt.PyJWTError):
+        security.decode_jwt_cached(old)
+    assert security.decode_jwt_cached(other)["id"] == 2
+    # 撤銷之後才簽發的 token 有效期限晚於撤銷時間 + JWT_TTL
+    monkeypatch.setattr(time, "time", lambda: now + 10)
+    fresh = security.create_jwt({"id": 1, "exp": int(now + 10 + security.JWT_TTL.total_seconds()) + 1})
+    assert security.decode_jwt_cached(fresh)["id"] == 1
+
+
+def test_expired_revocations_are_pruned(monkeypatch):
+    cache = TokenCache(10)
+    cache.revoke("a", time.time() + 1)
+    cache.revoke("b", time.time() - 1)  # 已過期的 token 不需記錄
+    assert list(cache._revoked) == [cache._key("a")]
+    later = time.time() + 2
+    monkeypatch.setattr(time, "time", lambda: later)
+    cache.revoke("c", later + 1)
+    assert list(cache._revoked) == [cache._key("c")]
@@ -0,0 +1,64 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pymysql
+
+from app.crud import user as user_crud
+from app.schemas.user import UserCreate
+
+
+class FakeCursor:
+    lastrowid = 1
+
+    def __init__(self, insert_error):
+        self.insert_error = insert_error
+
+    async def execute(self, sql, args=None):
+        if sql.startswith("INSERT") and self.insert_error:
+            raise self.insert_error
+
+    async def fetchone(self):
+        return None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, insert_error=None):
+        self.insert_error = insert_error
+        self.commits = 0
+
+    def cursor(self):
+        return FakeCursor(self.insert_error)
+
+    async def commit(self):
+        self.commits += 1
+
+
+def _signup(monkeypatch, conn):
+    @asynccontextmanager
+    async def db_connection():
+        yield conn
+
+    async def hash_password_async(plain):
+        return "hashed"
+
+    monkeypatch.setattr(user_crud, "db_connection", db_connection)
+    monkeypatch.setattr(user_crud, "hash_password_async", hash_password_async)
+    return asyncio.run(user_crud.create_user(UserCreate(name="n", email="a@example.com", password="secret")))
+
+
+def test_create_user_returns_token(monkeypatch):
+    ok, msg, token = _signup(monkeypatch, FakeConnection())
+    assert ok and msg is None and token
+
+
+def test_concurrent_duplicate_email_maps_to_duplicate_error(monkeypatch):
+    # 檢查時 email 尚未存在，但寫入時已被另一個請求註冊，由唯一鍵擋下
+    conn = FakeConnection(pymysql.err.IntegrityError(1062, "Duplicate entry 'a@example.com' for key 'idx_users_email'"))
+    assert _signup(monkeypatch, conn) == (False, "Email 已重複註冊", None)
+    assert conn.commits == 0